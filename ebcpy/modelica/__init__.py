@@ -12,6 +12,9 @@ def get_expressions(filepath_model: str,
                     excludes: List = None):
     """
     This function extracts specific expressions out of modelica models.
+    To extract the declarations of whole libraries, use the
+    ModelicaLibraryIndex of ebcpy.modelica.library_index, which
+    respects comments and only parses files changed since the last scan.
 
     :param str,os.path.normpath filepath_model:
         Full path of modelica model on the given os
@@ -0,0 +1,492 @@
+"""
+Module to index the declarations of Modelica libraries. Contrary to
+get_expressions, each file is tokenised once, comments and strings are
+respected and whole package trees are scanned in parallel. The
+declarations of each file are cached together with its size, the time
+of its last modification and its hash. Scanning a library again
+only parses the files changed since the last scan.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import multiprocessing as mp
+from typing import Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Increase if the parsed declarations change, invalidating existing caches
+_CACHE_VERSION = 1
+
+_TOKEN_PATTERN = re.compile(r"""
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+    |(?P<string>"(?:[^"\\]|\\.)*")
+    |(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    |(?P<ident>[A-Za-z_]\w*|'(?:[^'\\]|\\.)*')
+    |(?P<operator>:=|==|<>|<=|>=|\S)
+""", re.VERBOSE | re.DOTALL)
+
+_CLASS_KEYWORDS = {"class", "model", "block", "connector", "record",
+                   "package", "function", "type", "operator"}
+_CLASS_PREFIXES = {"encapsulated", "partial", "final", "inner", "outer", "replaceable",
+                   "redeclare", "expandable", "pure", "impure"}
+_COMPONENT_PREFIXES = {"redeclare", "final", "inner", "outer", "replaceable", "each",
+                       "flow", "stream", "discrete", "parameter", "constant",
+                       "input", "output"}
+_SECTION_KEYWORDS = {"public", "protected", "equation", "algorithm"}
+_OPENING = {"(": ")", "[": "]", "{": "}"}
+_MODELICA_TYPES = {"parameters": "parameter", "constants": "constant", "variables": None}
+
+
+def tokenize(script: str) -> List[Tuple[str, str, int, int]]:
+    """
+    Split a Modelica script into its tokens, dropping comments.
+
+    :param str script:
+        Content of a .mo file
+    :return: list
+        Tuples of the kind of each token ('string', 'number',
+        'ident' or 'operator'), its text and its start and
+        end position in the script.
+    """
+    return [(match.lastgroup, match.group(), match.start(), match.end())
+            for match in _TOKEN_PATTERN.finditer(script)
+            if match.lastgroup != "comment"]
+
+
+def parse_declarations(script: str) -> List[dict]:
+    """
+    Extract all component declarations, e.g. parameters and variables,
+    of all classes in the given Modelica script.
+
+    :param str script:
+        Content of a .mo file
+    :return: list
+        One dict for each declaration with the keys:
+        - class_name: Full name of the declaring class, including the within-clause
+        - name: Name of the component
+        - type: Name of the type of the component
+        - prefixes: List of prefixes, e.g. ['final', 'parameter']
+        - variability: 'parameter', 'constant' or None
+        - protected: True if declared in a protected section
+        - dimensions: Array dimensions, e.g. 'nthOrder', or None
+        - modification: Modification of the component, e.g. 'displayUnit="l"', or None
+        - expression: Binding equation, e.g. 'QCon_nominal/dTPinchCon', or None
+        - value: Value of the binding equation if it is a literal
+          Boolean or number, else None
+        - description: Description string of the component
+    """
+    tokens = tokenize(script)
+    declarations = []
+    within = ""
+    # Names and current sections of the classes enclosing the current token
+    classes = []
+    idx = 0
+    while idx < len(tokens):
+        text = tokens[idx][1]
+        if tokens[idx][0] == "string":
+            # Description of a class
+            idx += 1
+        elif text == "within":
+            end = _find_end(tokens, idx)
+            within = "".join(token[1] for token in tokens[idx + 1:end])
+            idx = end + 1
+        elif text == "end" and idx + 1 < len(tokens) and tokens[idx + 1][0] == "ident":
+            if classes and classes[-1][0] == tokens[idx + 1][1]:
+                classes.pop()
+            idx = _find_end(tokens, idx) + 1
+        elif text in _SECTION_KEYWORDS and classes:
+            classes[-1][1] = text
+            idx += 1
+        elif text == "initial" and idx + 1 < len(tokens) and \
+                tokens[idx + 1][1] in ("equation", "algorithm"):
+            if classes:
+                classes[-1][1] = tokens[idx + 1][1]
+            idx += 2
+        elif classes and classes[-1][1] in ("equation", "algorithm"):
+            idx = _find_end(tokens, idx) + 1
+        else:
+            class_header = _parse_class_header(tokens, idx)
+            if class_header is not None:
+                name, idx = class_header
+                if name is not None:
+                    classes.append([name, "public"])
+                continue
+            end = _find_end(tokens, idx)
+            if classes and text not in ("extends", "import", "annotation"):
+                class_name = ".".join(([within] if within else []) +
+                                      [_class[0] for _class in classes])
+                declarations.extend(_parse_component_clause(
+                    tokens=tokens[idx:end],
+                    script=script,
+                    class_name=class_name,
+                    protected=classes[-1][1] == "protected"
+                ))
+            idx = end + 1
+    return declarations
+
+
+def _find_end(tokens: list, idx: int) -> int:
+    """Return the index of the next ';' outside of brackets"""
+    depth = 0
+    while idx < len(tokens):
+        text = tokens[idx][1]
+        if text in _OPENING:
+            depth += 1
+        elif text in (")", "]", "}"):
+            depth -= 1
+        elif text == ";" and depth <= 0:
+            return idx
+        idx += 1
+    return idx
+
+
+def _find_closing(tokens: list, idx: int) -> int:
+    """Return the index of the bracket closing the bracket at idx"""
+    depth = 0
+    while idx < len(tokens):
+        text = tokens[idx][1]
+        if text in _OPENING:
+            depth += 1
+        elif text in (")", "]", "}"):
+            depth -= 1
+            if depth == 0:
+                return idx
+        idx += 1
+    return idx
+
+
+def _parse_class_header(tokens: list, idx: int) -> Optional[Tuple[Optional[str], int]]:
+    """
+    Check if a class definition starts at idx. Returns None if not.
+    Else, returns the name of the class and the index after its header.
+    For short class definitions, e.g. 'type Angle = Real', the name is None
+    and the index is the one after the whole definition.
+    """
+    start = idx
+    while idx < len(tokens) and tokens[idx][1] in _CLASS_PREFIXES:
+        idx += 1
+    if idx >= len(tokens) or tokens[idx][1] not in _CLASS_KEYWORDS:
+        return None
+    idx += 1
+    # Skip the second keyword, e.g. 'operator record'
+    while idx < len(tokens) and tokens[idx][1] in _CLASS_KEYWORDS:
+        idx += 1
+    if idx < len(tokens) and tokens[idx][1] == "extends":
+        idx += 1
+    if idx >= len(tokens) or tokens[idx][0] != "ident":
+        # Not a valid class, skip the statement
+        return None, _find_end(tokens, start) + 1
+    name = tokens[idx][1]
+    if idx + 1 < len(tokens) and tokens[idx + 1][1] == "=":
+        return None, _find_end(tokens, idx) + 1
+    return name, idx + 1
+
+
+def _parse_component_clause(tokens: list, script: str,
+                            class_name: str, protected: bool) -> List[dict]:
+    """Parse the tokens of a component clause, without its ';'"""
+    idx = 0
+    prefixes = []
+    while idx < len(tokens) and tokens[idx][1] in _COMPONENT_PREFIXES:
+        prefixes.append(tokens[idx][1])
+        idx += 1
+    # Type specifier, e.g. Modelica.SIunits.Temperature
+    type_start = idx
+    if idx < len(tokens) and tokens[idx][1] == ".":
+        idx += 1
+    while idx < len(tokens) and tokens[idx][0] == "ident":
+        if idx + 1 < len(tokens) and tokens[idx + 1][1] == ".":
+            idx += 2
+        else:
+            idx += 1
+            break
+    else:
+        return []
+    type_name = _join_tokens(tokens[type_start:idx], script)
+    type_dimensions = None
+    if idx < len(tokens) and tokens[idx][1] == "[":
+        end = _find_closing(tokens, idx)
+        type_dimensions = _join_tokens(tokens[idx + 1:end], script)
+        idx = end + 1
+    variability = "parameter" if "parameter" in prefixes else \
+        "constant" if "constant" in prefixes else None
+
+    declarations = []
+    while idx < len(tokens) and tokens[idx][0] == "ident":
+        declaration = {
+            "class_name": class_name,
+            "name": tokens[idx][1],
+            "type": type_name,
+            "prefixes": prefixes,
+            "variability": variability,
+            "protected": protected,
+            "dimensions": type_dimensions,
+            "modification": None,
+            "expression": None,
+            "value": None,
+            "description": ""
+        }
+        idx += 1
+        if idx < len(tokens) and tokens[idx][1] == "[":
+            end = _find_closing(tokens, idx)
+            declaration["dimensions"] = _join_tokens(tokens[idx + 1:end], script)
+            idx = end + 1
+        if idx < len(tokens) and tokens[idx][1] == "(":
+            end = _find_closing(tokens, idx)
+            declaration["modification"] = _join_tokens(tokens[idx + 1:end], script)
+            idx = end + 1
+        if idx < len(tokens) and tokens[idx][1] in ("=", ":="):
+            end = idx + 1
+            depth = 0
+            while end < len(tokens):
+                kind, text = tokens[end][:2]
+                if text in _OPENING:
+                    depth += 1
+                elif text in (")", "]", "}"):
+                    depth -= 1
+                elif depth == 0 and text in (",", "annotation", "constrainedby"):
+                    break
+                elif depth == 0 and kind == "string" and end > idx + 1 and (
+                        tokens[end - 1][0] != "operator" or tokens[end - 1][1] in (")", "]", "}")):
+                    # The string follows a complete expression, hence it is the description
+                    break
+                end += 1
+            declaration["expression"] = _join_tokens(tokens[idx + 1:end], script)
+            declaration["value"] = _convert_value(declaration["expression"])
+            idx = end
+        # Skip condition, description and annotation until the next component
+        depth = 0
+        while idx < len(tokens):
+            kind, text = tokens[idx][:2]
+            if text in _OPENING:
+                depth += 1
+            elif text in (")", "]", "}"):
+                depth -= 1
+            elif depth == 0 and text == ",":
+                idx += 1
+                break
+            elif depth == 0 and kind == "string" and not declaration["description"]:
+                declaration["description"] = text[1:-1]
+            idx += 1
+        declarations.append(declaration)
+    return declarations
+
+
+def _join_tokens(tokens: list, script: str) -> str:
+    """Join the tokens as in the script, replacing whitespace and comments by one space"""
+    if not tokens:
+        return ""
+    parts = [tokens[0][1]]
+    for previous, token in zip(tokens[:-1], tokens[1:]):
+        if token[2] > previous[3]:
+            parts.append(" ")
+        parts.append(token[1])
+    return "".join(parts)
+
+
+def _convert_value(expression: str) -> Union[bool, float, None]:
+    """Convert the expression to a Boolean or float, if it is a literal"""
+    expression = expression.replace(" ", "")
+    if expression in ["true", "false"]:
+        return expression == "true"
+    try:
+        return float(expression)
+    except ValueError:
+        return None
+
+
+def index_file(filepath: str, known_hash: str = None) -> dict:
+    """
+    Hash the given file and parse its declarations.
+
+    :param str,os.path.normpath filepath:
+        Path of the .mo file
+    :param str known_hash:
+        Hash of the file when it was last parsed. If the hash did not
+        change, the file is not parsed again. Default is None.
+    :return: dict
+        Entry of the file with its size, time of last modification, hash
+        and declarations, see parse_declarations. Declarations are None
+        if the hash equals the known_hash.
+    """
+    stat = os.stat(filepath)
+    with open(filepath, "rb") as file:
+        content = file.read()
+    file_hash = hashlib.sha1(content).hexdigest()
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": file_hash,
+             "declarations": None}
+    if file_hash != known_hash:
+        entry["declarations"] = parse_declarations(content.decode("utf-8-sig", errors="replace"))
+    return entry
+
+
+def _index_file(args: tuple) -> Tuple[str, Optional[dict]]:
+    """Index the file in a worker, returning None for deleted files"""
+    filepath, known_hash = args
+    try:
+        return filepath, index_file(filepath, known_hash)
+    except FileNotFoundError:
+        return filepath, None
+
+
+class ModelicaLibraryIndex:
+    """
+    Index of the declarations in Modelica libraries, updated
+    incrementally by scanning the libraries. Files are only parsed
+    again if their size or time of last modification changed and
+    the hash of their content differs.
+
+    :param str,os.path.normpath cache_path:
+        Path of a .json file to store the index between sessions.
+        Default is None, keeping the index only in memory.
+    :param int n_cpu:
+        Number of processes to parse the files. Default is 1.
+
+    Example:
+
+    >>> index = ModelicaLibraryIndex(cache_path="AixLib_index.json", n_cpu=4)
+    >>> index.scan("AixLib/package.mo")
+    >>> params = index.get_declarations(
+    >>>     class_name="AixLib.Systems.HeatPumpSystems.HeatPumpSystem",
+    >>>     modelica_type="parameters")
+    """
+
+    def __init__(self, cache_path: str = None, n_cpu: int = 1):
+        self.cache_path = cache_path
+        self.n_cpu = n_cpu
+        self._entries: Dict[str, dict] = {}
+        if cache_path is not None and os.path.isfile(cache_path):
+            with open(cache_path, "r") as file:
+                cache = json.load(file)
+            if cache.get("version") == _CACHE_VERSION:
+                self._entries = cache["entries"]
+            else:
+                logger.info("Ignoring index in %s created by another version", cache_path)
+
+    @property
+    def filepaths(self) -> List[str]:
+        """Paths of all indexed files"""
+        return list(self._entries)
+
+    def scan(self, paths: Union[str, List[str]]) -> List[str]:
+        """
+        Update the index with the given files and directories. Directories
+        are walked recursively for .mo files, a package.mo represents
+        its whole directory. Files which were deleted since the last scan
+        are removed from the index.
+
+        :param str,list paths:
+            Paths of the libraries to scan, e.g. the package.mo of each library
+        :return: list
+            Paths of the files parsed in this scan
+        """
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        filepaths = []
+        roots = []
+        for path in paths:
+            path = os.path.abspath(path)
+            if os.path.basename(path) == "package.mo":
+                path = os.path.dirname(path)
+            if os.path.isdir(path):
+                roots.append(path)
+                for dirpath, _, filenames in os.walk(path):
+                    filepaths.extend(os.path.join(dirpath, filename)
+                                     for filename in sorted(filenames)
+                                     if filename.endswith(".mo"))
+            else:
+                roots.append(path)
+                filepaths.append(path)
+        # Remove deleted files
+        found = set(filepaths)
+        for filepath in list(self._entries):
+            if filepath not in found and any(filepath == root or
+                                             filepath.startswith(root + os.sep)
+                                             for root in roots):
+                del self._entries[filepath]
+        # Only hash files which changed their size or time of modification
+        tasks = []
+        for filepath in filepaths:
+            entry = self._entries.get(filepath)
+            if entry is not None:
+                try:
+                    stat = os.stat(filepath)
+                except FileNotFoundError:
+                    del self._entries[filepath]
+                    continue
+                if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                    continue
+            tasks.append((filepath, None if entry is None else entry["hash"]))
+
+        parsed = []
+        for filepath, entry in self._map(tasks):
+            if entry is None:
+                self._entries.pop(filepath, None)
+                continue
+            if entry["declarations"] is None:
+                entry["declarations"] = self._entries[filepath]["declarations"]
+            else:
+                parsed.append(filepath)
+            self._entries[filepath] = entry
+        logger.info("Scanned %s files, parsed %s of them", len(filepaths), len(parsed))
+        if tasks:
+            self.save()
+        return parsed
+
+    def _map(self, tasks: List[tuple]):
+        """Index the files of the tasks, in parallel if n_cpu > 1"""
+        if self.n_cpu > 1 and len(tasks) > 1:
+            with mp.Pool(min(self.n_cpu, len(tasks))) as pool:
+                return pool.map(_index_file, tasks,
+                                chunksize=max(1, len(tasks) // (4 * self.n_cpu)))
+        return [_index_file(task) for task in tasks]
+
+    def save(self):
+        """Store the index in the cache_path, if given"""
+        if self.cache_path is None:
+            return
+        cache_dir = os.path.dirname(os.path.abspath(self.cache_path))
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"version": _CACHE_VERSION, "entries": self._entries}, file)
+        os.replace(tmp_path, self.cache_path)
+
+    def get_declarations(self,
+                         class_name: str = None,
+                         modelica_type: str = None,
+                         get_protected: bool = True) -> List[dict]:
+        """
+        Return the indexed declarations, see parse_declarations.
+
+        :param str class_name:
+            Full name of the declaring class, e.g.
+            'AixLib.Systems.HeatPumpSystems.HeatPumpSystem'.
+            Default is None, returning the declarations of all classes.
+        :param str modelica_type:
+            'parameters', 'constants' or 'variables', the latter
+            being all components without parameter or constant prefix.
+            Default is None, returning all declarations.
+        :param Boolean get_protected:
+            Whether to return protected declarations. Default is True.
+        :return: list
+            Declarations matching the filters
+        """
+        if modelica_type is not None and modelica_type not in _MODELICA_TYPES:
+            raise ValueError(f"Given modelica_type {modelica_type} is not supported, "
+                             f"options are: {', '.join(_MODELICA_TYPES)}")
+        declarations = []
+        for entry in self._entries.values():
+            for declaration in entry["declarations"]:
+                if class_name is not None and declaration["class_name"] != class_name:
+                    continue
+                if (modelica_type is not None and
+                        declaration["variability"] != _MODELICA_TYPES[modelica_type]):
+                    continue
+                if not get_protected and declaration["protected"]:
+                    continue
+                declarations.append(declaration)
+        return declarations
@@ -1,9 +1,88 @@
 """Functions to manipulate (or extract information of) the
 dsfinal.txt and dsin.txt files created by Modelica."""
 
-from io import StringIO
+import re
+from typing import List, Tuple
+import numpy as np
 import pandas as pd
 
+# Second column of a row of the matrix initialValue
+_SECOND_COLUMN = re.compile(rb"^\s*\S+\s+(\S+)")
+# Name of a row of the matrix initialValue, stated as comment
+_ROW_NAME = re.compile(rb"#([^\n]*)")
+_HEADER_INITIAL_NAME = b"char initialName("
+_HEADER_INITIAL_VALUE = b"double initialValue("
+
+
+def _find_header(buffer: bytes, header: bytes) -> int:
+    """Return the offset of the line starting with the given header"""
+    if buffer.startswith(header):
+        return 0
+    offset = buffer.find(b"\n" + header)
+    if offset == -1:
+        raise ValueError(f"The given file contains no matrix '{header.decode()}...)'. "
+                         f"Is it a valid dsin or dsfinal file?")
+    return offset + 1
+
+
+def _parse_ds_buffer(buffer: bytes, as_float: bool = True) -> dict:
+    """
+    Parse the matrix initialValue of the given content of a dsin or
+    dsfinal file. The matrix is found by its header, not by its
+    line number, and all values are parsed at once.
+
+    :return: dict
+        'names': Names of the rows, without spaces.
+        'values': Array of shape (rows, 6) with the values as
+        float, or as str if not as_float.
+        'spans': Array of shape (rows, 2) with the start and
+        end offset of the first line of each row in the buffer.
+    """
+    start = _find_header(buffer, _HEADER_INITIAL_VALUE)
+    header_end = buffer.index(b"\n", start)
+    n_rows = int(buffer[start:header_end].split(b"(")[-1].split(b",")[0])
+    body_start = header_end + 1
+    line_ends = np.flatnonzero(np.frombuffer(buffer, dtype=np.uint8, offset=body_start) ==
+                               ord("\n")) + body_start
+    line_ends = np.append(line_ends, len(buffer))
+    # Check if two or on-line dsfinal / dsin
+    step_size = 1 if b"#" in buffer[body_start:line_ends[0]] else 2
+    if n_rows * step_size > len(line_ends):
+        raise ValueError("The matrix initialValue is incomplete.")
+    line_ends = line_ends[:n_rows * step_size]
+    line_starts = np.concatenate([[body_start], line_ends[:-1] + 1])
+    block = buffer[body_start:line_ends[-1]] if n_rows else b""
+    names = [name.strip().replace(b" ", b"").decode() for name in _ROW_NAME.findall(block)]
+    block = _ROW_NAME.sub(b"", block).decode()
+    if as_float:
+        values = np.fromstring(block, sep=" ")
+    else:
+        values = np.array(block.split(), dtype=object)
+    if len(names) != n_rows or values.size != 6 * n_rows:
+        raise ValueError("Could not parse the matrix initialValue, "
+                         "each row has to contain six values and a name.")
+    return {"names": names,
+            "values": values.reshape(n_rows, 6),
+            "spans": np.column_stack([line_starts[::step_size], line_ends[::step_size]])}
+
+
+def convert_ds_file_to_array(filename) -> Tuple[List[str], np.ndarray]:
+    """
+    Function to read the matrix initialValue of a given dsfinal or
+    dsin file as float array. Faster than convert_ds_file_to_dataframe
+    for large models. See convert_ds_file_to_dataframe for
+    the meaning of the columns.
+
+    :param str,os.path.normpath filename:
+        Filepath to the dsfinal or dsin to be loaded.
+    :return: tuple
+        The names of the variables and the array of
+        shape (len(names), 6) with the values.
+    """
+    with open(filename, "rb") as file:
+        parsed = _parse_ds_buffer(file.read())
+    return parsed["names"], parsed["values"]
+
 
 def convert_ds_file_to_dataframe(filename):
     """
@@ -37,51 +116,11 @@ def convert_ds_file_to_dataframe(filename):
     :return: pd.DataFrame
         Converted DataFrame
     """
-    # Define relevant parameters
-    number_line_initial_name = 104  # Line where the string char initialName(,) is always stored
-
-    # Open file and get relevant content by splitting the lines.
-    with open(filename, "r") as file:
-        content = file.read().split("\n")
-
-    # Gets the X out of 'char initialName(X,Y)'
-    size_initial_names = int(content[number_line_initial_name].split("(")[-1].split(",")[0])
-    # Number of line below line "double initialValue(X,Y)"
-    number_line_initial_value = number_line_initial_name + size_initial_names + 3
-
-    # Check if two or on-line dsfinal / dsin
-    if "#" in content[number_line_initial_value]:
-        step_size = 1
-    else:
-        step_size = 2
-
-    # trim content:
-    ini_val_list = content[number_line_initial_value: (number_line_initial_value +
-                                                       step_size * size_initial_names)]
-    # Alter list to create one-lined list.
-    if step_size == 2:
-        ini_val_list_one_line = []
-        for i in range(0, len(ini_val_list), 2):
-            # Concat two line into one line
-            ini_val_list_one_line.append(ini_val_list[i] + ini_val_list[i + 1])
-    else:
-        ini_val_list_one_line = ini_val_list
-
-    # Convert to DataFrame. Use a csv-method as it is much faster.
-    out = StringIO()
-    # csv_writer = writer(out)
-    out.write("1;2;3;4;5;6;initialName\n")
-    # df = pd.DataFrame({1:[], 2:[], 3:[], 4:[], 5:[], 6:[], "initialName":[]})
-    for line in ini_val_list_one_line:
-        # Get only the string of the initialName
-        ini_name = line.split("#")[-1].replace(" ", "").replace("\n", "")
-        vals = line.split("#")[0].split()
-        vals.append(ini_name)
-        out.write(";".join(vals) + "\n")
-    out.seek(0)
-    df = pd.read_csv(out, header=0, sep=";", dtype=object)
-    df = df.set_index("initialName")
-    return df
+    with open(filename, "rb") as file:
+        parsed = _parse_ds_buffer(file.read(), as_float=False)
+    return pd.DataFrame(parsed["values"],
+                        columns=["1", "2", "3", "4", "5", "6"],
+                        index=pd.Index(parsed["names"], name="initialName"))
 
 
 def eliminate_parameters_from_ds_file(filename, savepath, exclude_paras, del_aux_paras=True):
@@ -130,9 +169,10 @@ def eliminate_parameters_from_ds_file(filename, savepath, exclude_paras, del_aux
     string_new_ds_final = char_initial_name + "\n\n" + double_initial_value
 
     # Reuses the experiment, tuning parameters etc. settings
-    number_line_initial_name = 104  # Line where the string char initialName(,) is always stored
     with open(filename, "r") as file:
         content = file.read().split("\n")
+    number_line_initial_name = next(idx for idx, line in enumerate(content)
+                                    if line.startswith(_HEADER_INITIAL_NAME.decode()))
 
     new_content = "\n".join(content[:number_line_initial_name])
     new_content += "\n" + string_new_ds_final
@@ -141,3 +181,125 @@ def eliminate_parameters_from_ds_file(filename, savepath, exclude_paras, del_aux
         file.seek(0)
         file.truncate()  # Delete all content of the given file
         file.write(new_content)
+
+
+def update_ds_file(filename, savepath, initial_values=None, settings=None):
+    """
+    Create a new dsin file out of the given dsin.txt or dsfinal.txt
+    with updated values. Used to simulate a translated model with
+    different parameters without translating it again. To write many
+    files based on the same dsin, use a DsinTemplate instead.
+
+    :param str,os.path.normpath filename:
+        Filepath to the dsin or dsfinal file
+    :param str,os.path.normpath savepath:
+        .txt-file for storing the updated file
+    :param dict initial_values:
+        New values (column 2 of the matrix initialValue)
+        of the given variables, e.g. parameters.
+    :param dict settings:
+        New values of the experiment, method tuning and output
+        parameters, e.g. {"StartTime": 0, "StopTime": 3600}.
+        The names are the ones stated in the comments of the file.
+    """
+    DsinTemplate(filename).write(savepath=savepath,
+                                 initial_values=initial_values,
+                                 settings=settings)
+
+
+class DsinTemplate:
+    """
+    Template to write many dsin files with modified values, e.g. for
+    sweeps over the parameters of a translated model. The file is parsed
+    once into the matrix ``initial_values`` and the index of the row of
+    each name. Writing a new file only formats the changed rows and
+    patches them into the unchanged bytes of the template.
+
+    :param str,os.path.normpath filename:
+        Filepath to the dsin or dsfinal file
+
+    Example:
+
+    >>> template = DsinTemplate("dsin.txt")
+    >>> for idx, parameters in enumerate(parameter_sets):
+    >>>     template.write(f"dsin_{idx}.txt", initial_values=parameters)
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as file:
+            self._buffer = file.read()
+        self.filename = str(filename)
+        parsed = _parse_ds_buffer(self._buffer)
+        self.names: List[str] = parsed["names"]
+        self.initial_values = parsed["values"]
+        self.index = {name: row for row, name in enumerate(self.names)}
+        # Spans (start, end) of the lines to patch in the buffer
+        self._row_spans = parsed["spans"].tolist()
+        self._setting_spans = {}
+        # Settings are only stated prior to the names of the variables
+        offset = 0
+        settings_end = _find_header(self._buffer, _HEADER_INITIAL_NAME)
+        for line in self._buffer[:settings_end].split(b"\n"):
+            if b"#" in line and not line.startswith(b"#"):
+                value, comment = line.split(b"#", 1)
+                if value.strip() and comment.split():
+                    self._setting_spans[comment.split()[0].decode()] = (offset,
+                                                                        offset + len(line))
+            offset += len(line) + 1
+
+    @property
+    def settings(self) -> list:
+        """Names of the experiment, method tuning and output parameters"""
+        return list(self._setting_spans.keys())
+
+    def write(self, savepath, initial_values=None, settings=None):
+        """
+        Write a new dsin file with the given values.
+
+        :param str,os.path.normpath savepath:
+            .txt-file for storing the updated file
+        :param dict initial_values:
+            New values (column 2 of the matrix initialValue)
+            of the given variables, e.g. parameters.
+        :param dict settings:
+            New values of the experiment, method tuning and output
+            parameters, e.g. {"StartTime": 0, "StopTime": 3600}.
+        """
+        patches = []
+        missing = []
+        for name, value in (initial_values or {}).items():
+            if name not in self.index:
+                missing.append(name)
+                continue
+            start, end = self._row_spans[self.index[name]]
+            line = self._buffer[start:end]
+            # Replace the second column, the value, and keep all other bytes
+            match = _SECOND_COLUMN.match(line)
+            patches.append((start, end, line[:match.start(1)] +
+                            _format_ds_value(value).encode() + line[match.end(1):]))
+        for name, value in (settings or {}).items():
+            if name not in self._setting_spans:
+                missing.append(name)
+                continue
+            start, end = self._setting_spans[name]
+            comment = self._buffer[start:end].split(b"#", 1)[1]
+            patches.append((start, end, f"{_format_ds_value(value):>24}   #".encode() + comment))
+        if missing:
+            raise KeyError(f"The following names are not part of the file '{self.filename}': "
+                           f"{', '.join(sorted(missing))}")
+        patches.sort()
+        buffer = memoryview(self._buffer)
+        with open(savepath, "wb") as file:
+            position = 0
+            for start, end, patch in patches:
+                file.write(buffer[position:start])
+                file.write(patch)
+                position = end
+            file.write(buffer[position:])
+
+
+def _format_ds_value(value):
+    """Format the given value as readable by dymosim without loss of precision"""
+    if isinstance(value, (bool, int)):
+        return str(int(value))
+    return repr(float(value))
@@ -50,8 +50,10 @@ necessary functions from modelicares to still be able and use loadsim functions.
 
 .. versionadded:: 0.1.7
 """
+import mmap
 from itertools import count
 from collections import namedtuple
+from typing import List, Tuple
 from scipy.io import loadmat
 from scipy.io.matlab.mio_utils import chars_to_strings
 import pandas as pd
@@ -332,3 +334,101 @@ def mat_to_pandas(fname='dsres.mat',
     else:
         time_key = 'Time'
     return pd.DataFrame(data).set_index(time_key)
+
+
+# Precision of the MATLAB v4 format, the digit P of the type MOPT
+_MAT_V4_DTYPES = {0: "f8", 1: "f4", 2: "i4", 3: "i2", 4: "u2", 5: "u1"}
+
+
+def _read_mat_v4_headers(buffer) -> dict:
+    """
+    Return the offset of the data, the dtype and the shape
+    of each matrix in the buffer of a MATLAB v4 file.
+    """
+    headers = {}
+    offset = 0
+    while offset < len(buffer):
+        header = np.frombuffer(buffer, dtype="<i4", count=5, offset=offset)
+        byteorder = "<"
+        if not 0 <= header[0] < 5000:  # Big endian
+            header = header.byteswap()
+            byteorder = ">"
+        mopt, mrows, ncols, imagf, namlen = header.tolist()
+        if mopt % 10 == 2 or mopt // 10 % 10 not in _MAT_V4_DTYPES:
+            raise TypeError("Only full MATLAB v4 matrices are supported.")
+        dtype = np.dtype(byteorder + _MAT_V4_DTYPES[mopt // 10 % 10])
+        name = bytes(buffer[offset + 20:offset + 20 + namlen]).rstrip(b"\0").decode("ascii")
+        offset += 20 + namlen
+        headers[name] = (offset, dtype, (mrows, ncols))
+        offset += mrows * ncols * dtype.itemsize * (2 if imagf else 1)
+    return headers
+
+
+def _matrix_to_strings(matrix) -> List[str]:
+    """Return the rows of a character matrix as stripped strings"""
+    rows = np.ascontiguousarray(matrix, dtype=np.uint8)
+    return [row.tobytes().rstrip(b" \0").decode("latin-1") for row in rows]
+
+
+def mat_to_array(fname, names: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the time and the values of the given variables of a Dymola
+    result file. Contrary to mat_to_pandas, the file is memory mapped and
+    only the columns of the given variables are read and copied.
+
+    :param str fname:
+        The mat file to load.
+    :param list names:
+        Names of the variables to load
+    :return: tuple
+        The time of shape (n,) and the values
+        of shape (n, len(names)) as float arrays.
+    """
+    with open(fname, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return _select_from_mat_buffer(buffer, names)
+
+
+def _select_from_mat_buffer(buffer, names: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the variables from the buffer of a result file.
+    Only copies leave this function, so that the buffer may be closed.
+    """
+    headers = _read_mat_v4_headers(buffer)
+
+    def load(matrix: str) -> np.ndarray:
+        offset, dtype, shape = headers[matrix]
+        return np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset, order="F")
+
+    aclass = _matrix_to_strings(load("Aclass"))
+    if aclass[:2] != ["Atrajectory", "1.1"]:
+        raise TypeError(f"Only result files of version 1.1 are supported, not {aclass[:2]}.")
+    transposed = len(aclass) > 3 and aclass[3] == "binTrans"
+    all_names = _matrix_to_strings(load("name").T if transposed else load("name"))
+    data_info = load("dataInfo") if transposed else load("dataInfo").T
+    indexes = {name: idx for idx, name in enumerate(all_names)}
+    missing = [name for name in names if name not in indexes and name != "Time"]
+    if missing:
+        raise KeyError(f"Variables not found in the result file: {', '.join(missing)}")
+    data_sets = {}
+    for i in count(1):
+        if f"data_{i}" not in headers:
+            break
+        data_sets[i] = load(f"data_{i}").T if transposed else load(f"data_{i}")
+    # Time is from the last data set
+    times = np.array(data_sets[len(data_sets)][:, 0], dtype=np.float64)
+    values = np.empty((len(times), len(names)), dtype=np.float64)
+    for col, name in enumerate(names):
+        if name == "Time":
+            values[:, col] = times
+            continue
+        data_set, sign_col = data_info[:2, indexes[name]].tolist()
+        data = data_sets[data_set]
+        if len(data) != len(times):
+            # Constants, e.g. parameters, are only stored at start and stop
+            values[:, col] = data[0, abs(sign_col) - 1]
+        else:
+            values[:, col] = data[:, abs(sign_col) - 1]
+        if sign_col < 0:
+            values[:, col] *= -1
+    return times, values
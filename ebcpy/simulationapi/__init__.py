@@ -7,12 +7,68 @@ much more user-friendly than the provided APIs by Dymola or fmpy.
 
 import os
 import itertools
+import pickle
+import threading
+import time
+import uuid
 from typing import Dict, Union, TypeVar, Any, List
 from abc import abstractmethod
 import multiprocessing as mp
+from multiprocessing.pool import ThreadPool
 from pydantic import BaseModel, Field, validator
 import numpy as np
+from ebcpy.data_types import TimeSeriesData
 from ebcpy.utils import setup_logger
+from ebcpy.simulationapi.shared_memory import SHARED_MEMORY_AVAILABLE, \
+    SharedArray, SharedBlock, SharedDataFrame, ensure_resource_tracker
+from ebcpy.simulationapi.supervised_pool import SupervisedPool
+from ebcpy.simulationapi import telemetry
+
+# Index of the worker threads of a thread pool, see SimulationAPI.worker_idx
+_THREAD_WORKER = threading.local()
+_THREAD_WORKER_COUNTER = itertools.count(1)
+# Apis registered in the worker processes of a process pool
+_WORKER_APIS = {}
+# Barriers of the pools, letting each worker run exactly one task of a broadcast
+_WORKER_BARRIERS = {}
+
+
+def _init_thread_worker(api):
+    """Assign a unique index to the current thread of a thread pool"""
+    _THREAD_WORKER.idx = next(_THREAD_WORKER_COUNTER)
+    api._setup_worker_safe()
+
+
+def _init_process_worker(token: str, api_state: bytes, barrier=None):
+    """Register the api once in the current process of a process pool"""
+    api = pickle.loads(api_state)
+    _WORKER_APIS[token] = api
+    _WORKER_BARRIERS[token] = barrier
+    api._setup_worker_safe()
+
+
+def _run_worker_task(task: tuple):
+    """
+    Run a task on the api registered in the current worker process.
+    The task consists of the token of the api, the name of the method,
+    the attributes of the api which may have changed since the
+    registration and the argument of the method.
+    """
+    token, method, context, argument = task
+    api = _WORKER_APIS[token]
+    api.__dict__.update(context)
+    return getattr(api, method)(argument)
+
+
+def _run_worker_broadcast(task: tuple):
+    """
+    Run a task of a broadcast on the api registered in the current worker
+    process. The worker waits until all workers received a task of the
+    broadcast, so that each worker runs exactly one of them.
+    """
+    token, method, argument = task
+    _WORKER_BARRIERS[token].wait()
+    return getattr(_WORKER_APIS[token], method)(argument)
 
 
 class Variable(BaseModel):
@@ -110,12 +166,72 @@ class SimulationAPI:
         Maximum number equals the cpu count of the device.
         **Warning**: Logging is not yet fully working on multiple processes.
         Output will be written to the stream handler, but not to the created .log files.
+    :keyword str executor:
+        Executor used if n_cpu is greater than one. Options are:
+        - 'process': Use a pool of processes (the default).
+        - 'thread': Use a pool of threads in the current process.
+        This avoids pickling the api and all inputs and results.
+        Beneficial if the simulation mainly runs in native code which releases
+        the GIL, e.g. fmu's. Check ``ebcpy.simulationapi.benchmark`` to compare
+        both executors for your model.
+    :keyword bool use_shared_memory:
+        If True (default), large inputs and the results are exchanged with
+        the processes of the pool using shared memory instead of pickling them.
+        Requires python >= 3.8.
+    :keyword bool supervise:
+        If True, the pool of processes supervises its workers, see
+        ``ebcpy.simulationapi.supervised_pool``. A simulation crashing its
+        worker or exceeding the task_timeout does not stall or abort the
+        batch. The worker is killed and respawned, including a new instance
+        of the simulation program, and the simulation is retried. If all
+        attempts fail, None is returned for the parameter set, which is
+        listed in ``failed_simulations``. Default is False, unless a
+        task_timeout or max_retries is given. Only supported for the
+        executor 'process'.
+    :keyword float task_timeout:
+        Maximal wall-clock time of a single simulation on the pool
+        in seconds. Default is None, no limit.
+    :keyword int max_retries:
+        Number of times a failed simulation is retried on a supervised
+        pool. Default is 0.
+    :keyword bool telemetry:
+        If True, the wall time of each phase of each simulation, the worker,
+        the time waiting in the queue of the pool and counters like the number
+        of steps are recorded in the attribute ``telemetry``, see
+        ``ebcpy.simulationapi.telemetry``. Export them using
+        ``telemetry.to_df()`` or ``telemetry.to_json()``. Default is False.
+    :keyword callable telemetry_callback:
+        Function called with the telemetry record of each simulation
+        as dict. Enables the telemetry, if given.
 
     """
     _sim_setup_class: SimulationSetupClass = SimulationSetup
     _items_to_drop = [
         'pool',
+        'telemetry'
+    ]
+    _supported_executors = ["process", "thread"]
+    # Attributes sent once to the processes of a pool. All other attributes
+    # may change and are sent with each task, see _map_on_workers.
+    _worker_static_items = [
+        'logger',
+        'inputs',
+        'outputs',
+        'parameters',
+        'states',
+        'failed_simulations'
+    ]
+    # Static items depending on the model, sent again to the running
+    # workers when the model changes, see _update_workers
+    _worker_model_items = [
+        'inputs',
+        'outputs',
+        'parameters',
+        'states'
     ]
+    # If True, the workers are restarted when the model changes instead,
+    # e.g. as they hold instances of the old model
+    _restart_workers_on_model_change = False
 
     def __init__(self, cd, model_name, **kwargs):
         # Setup the logger
@@ -127,13 +243,33 @@ class SimulationAPI:
             raise ValueError(f"Given n_cpu '{self.n_cpu}' is greater "
                              "than the available number of "
                              f"cpus on your machine '{mp.cpu_count()}'")
-        if self.n_cpu > 1:
-            # pylint: disable=consider-using-with
-            self.pool = mp.Pool(processes=self.n_cpu)
-            self.use_mp = True
+        self.executor = kwargs.get("executor", "process")
+        if self.executor not in self._supported_executors:
+            raise ValueError(f"Given executor '{self.executor}' is not supported "
+                             f"by {self.__class__.__name__}. Supported are "
+                             f"{', '.join(self._supported_executors)}.")
+        self.use_shared_memory = (kwargs.get("use_shared_memory", True) and
+                                  SHARED_MEMORY_AVAILABLE)
+        self.task_timeout = kwargs.get("task_timeout", None)
+        self.max_retries = kwargs.get("max_retries", 0)
+        self.supervise = (kwargs.get("supervise", False) or
+                          self.task_timeout is not None or
+                          self.max_retries > 0)
+        if self.supervise and self.executor != "process":
+            raise ValueError("Supervising the workers is only "
+                             "supported for the executor 'process'.")
+        # Parameter sets of the last call of simulate which failed on a supervised pool
+        self.failed_simulations: List[dict] = []
+        if kwargs.get("telemetry", False) or kwargs.get("telemetry_callback", None):
+            self.telemetry = telemetry.SimulationTelemetry(
+                callback=kwargs.get("telemetry_callback", None)
+            )
         else:
-            self.pool = None
-            self.use_mp = False
+            self.telemetry = None
+        # The pool is started on first use, after the model is set up
+        self.pool = None
+        self._worker_token = None
+        self.use_mp = self.n_cpu > 1
         # Setup the model
         self._sim_setup = self._sim_setup_class()
         self.cd = cd
@@ -145,13 +281,113 @@ class SimulationAPI:
         self.model_name = model_name
 
     # MP-Functions
+    def _create_pool(self):
+        """
+        Create the pool of workers for the chosen executor. Workers of a
+        process pool receive the api once through the initializer.
+        """
+        # pylint: disable=consider-using-with
+        if self.executor == "thread":
+            return ThreadPool(processes=self.n_cpu,
+                              initializer=_init_thread_worker,
+                              initargs=(self, ))
+        if self.use_shared_memory:
+            ensure_resource_tracker()
+        self._worker_token = uuid.uuid4().hex
+        initargs = (self._worker_token, pickle.dumps(self), mp.Barrier(self.n_cpu))
+        if self.supervise:
+            return SupervisedPool(processes=self.n_cpu,
+                                  initializer=_init_process_worker,
+                                  initargs=initargs,
+                                  task_timeout=self.task_timeout,
+                                  max_retries=self.max_retries,
+                                  logger=self.logger)
+        return mp.Pool(processes=self.n_cpu,
+                       initializer=_init_process_worker,
+                       initargs=initargs)
+
+    def _map_on_workers(self, method: str, arguments: list) -> list:
+        """
+        Call the given method for each argument on the pool of workers.
+        Starts the pool if not yet running. Tasks for a process pool only
+        contain the name of the method, the argument and the attributes
+        of the api which are not part of _worker_static_items.
+        """
+        if self.pool is None:
+            self.pool = self._create_pool()
+        if self.executor == "thread":
+            return self.pool.map(getattr(self, method), arguments)
+        context = self._get_worker_context()
+        return self.pool.map(_run_worker_task, [
+            (self._worker_token, method, context, argument) for argument in arguments
+        ])
+
+    def _get_worker_context(self) -> dict:
+        """Return the attributes of the api sent with each task"""
+        return {key: value for key, value in self.__getstate__().items()
+                if key not in self._worker_static_items}
+
+    def _update_workers(self):
+        """
+        Send the static items of the current model, see _worker_model_items,
+        to each running worker of a process pool. If not all workers
+        could be updated, they are restarted on next use instead.
+        """
+        if self.pool is None or self.executor == "thread":
+            return  # Threads share the api
+        model_items = {key: getattr(self, key) for key in self._worker_model_items}
+        task = (self._worker_token, "_set_worker_items", model_items)
+        try:
+            results = self.pool.map(_run_worker_broadcast, [task] * self.n_cpu)
+        except Exception as err:  # pylint: disable=broad-except
+            results = [err]
+        if not all(result is True for result in results):
+            self.logger.warning("Could not update the workers, restarting them: %s", results)
+            self._close_pool()
+
+    def _set_worker_items(self, items: dict) -> bool:
+        """Set the given items in the current worker, see _update_workers"""
+        self.__dict__.update(items)
+        return True
+
+    def _setup_worker(self):
+        """
+        Called once in each worker after the start of the pool.
+        Reimplement this to e.g. start the simulation program of the worker.
+        """
+
+    def _setup_worker_safe(self):
+        """Set up the worker, but never raise to avoid restarting the worker endlessly"""
+        try:
+            self._setup_worker()
+        except Exception as err:  # pylint: disable=broad-except
+            self.logger.error("Could not set up worker %s: %s", self.worker_idx, err)
+
+    def _worker_noop(self, argument):
+        """Empty task, used to measure the overhead of each task"""
+        # pylint: disable=no-self-use
+        return argument
+
+    def _close_pool(self):
+        """Close the workers and the pool, if started"""
+        if self.pool is None:
+            return
+        try:
+            self._map_on_workers("_close_multiprocessing",
+                                 list(range(self.n_cpu)))
+            self.pool.close()
+            self.pool.join()
+        except ValueError:
+            pass  # Already closed prior to atexit
+        self.pool = None
+
     @property
     def worker_idx(self):
         """Index of the current worker"""
         _id = mp.current_process()._identity
         if _id:
             return _id[0]
-        return None
+        return getattr(_THREAD_WORKER, "idx", None)
 
     def __getstate__(self):
         """Overwrite magic method to allow pickling the api object"""
@@ -167,14 +403,7 @@ class SimulationAPI:
 
     def close(self):
         """Base function for closing the simulation-program."""
-        if self.use_mp:
-            try:
-                self.pool.map(self._close_multiprocessing,
-                              list(range(self.n_cpu)))
-                self.pool.close()
-                self.pool.join()
-            except ValueError:
-                pass  # Already closed prior to atexit
+        self._close_pool()
 
     @abstractmethod
     def _close_multiprocessing(self, _):
@@ -215,6 +444,12 @@ class SimulationAPI:
         :keyword str result_file_name:
             Name of the result file. Default is 'resultFile'.
             Only relevant if return_option equals 'savepath'.
+        :keyword SweepResultStore result_store:
+            Opened store to write the results of all parameter sets into
+            consolidated files instead of one file per set, see
+            ebcpy.simulationapi.result_store. Only relevant if return_option
+            equals 'savepath'. The run ids in the store are returned instead
+            of the filepaths. Currently only supported by the FMU_API.
         :keyword (TimeSeriesData, pd.DataFrame) inputs:
             Pandas.Dataframe of the input data for simulating the FMU with fmpy
         :keyword Boolean fail_on_error:
@@ -224,6 +459,8 @@ class SimulationAPI:
         :return: str,os.path.normpath filepath:
             Only if return_option equals 'savepath'.
             Filepath of the result file.
+        :return: int run_id:
+            Only if return_option equals 'savepath' and a result_store is given.
         :return: dict:
             Only if return_option equals 'last_point'.
         :return: Union[List[pd.DataFrame],pd.DataFrame]:
@@ -241,7 +478,9 @@ class SimulationAPI:
         new_kwargs = {}
         kwargs["return_option"] = return_option  # Update with arg
         # Handle special case for saving files:
-        if return_option == "savepath" and len(parameters) > 1:
+        if return_option == "savepath" and kwargs.get("result_store", None) is not None:
+            kwargs["run_id"] = kwargs["result_store"].reserve(len(parameters))
+        elif return_option == "savepath" and len(parameters) > 1:
             savepath = kwargs.get("savepath", [])
             result_file_name = kwargs.get("result_file_name", [])
             if (len(set(savepath)) != len(parameters) and
@@ -270,18 +509,164 @@ class SimulationAPI:
                  }
             )
         # Decide between mp and single core
-        if self.use_mp:
-            results = self.pool.map(self._single_simulation, kwargs)
+        if self.use_mp and self.executor == "process" and self.use_shared_memory:
+            results = self._shared_memory_map(kwargs)
         else:
-            results = [self._single_simulation(kwargs={
-                "parameters": _single_kwargs["parameters"],
-                "return_option": _single_kwargs["return_option"],
-                **_single_kwargs
-            }) for _single_kwargs in kwargs]
+            results = self._map_simulations("_single_simulation", kwargs)
+        self.failed_simulations = [
+            {"parameters": kwargs[idx]["parameters"], "reason": reason}
+            for idx, reason in getattr(self.pool, "failures", {}).items()
+        ] if self.use_mp else []
         if len(results) == 1:
             return results[0]
         return results
 
+    def _shared_memory_map(self, kwargs: List[dict]) -> list:
+        """
+        Run the simulations on the pool of processes and exchange inputs
+        and results using one block of shared memory per batch. Each input
+        object, a numeric DataFrame or a numpy array, is copied once into
+        the block, regardless of the number of
+        simulations using it. Workers write their results into preallocated
+        buffers and only return small handles, which the main process
+        converts back by copying the values out of the block once.
+        """
+        shared_inputs = {}
+        result_shapes = []
+        arrays = []
+        for _kwargs in kwargs:
+            inputs = _kwargs.get("inputs", None)
+            if id(inputs) in shared_inputs:
+                pass
+            elif isinstance(inputs, np.ndarray):
+                shared_inputs[id(inputs)] = inputs
+                arrays.append(inputs)
+            elif SharedDataFrame.is_supported(inputs):
+                shared_inputs[id(inputs)] = inputs
+                arrays.extend([inputs.to_numpy(), inputs.index.to_numpy()])
+            result_shape = self._get_shared_result_shape(_kwargs)
+            result_shapes.append(result_shape)
+            if result_shape is not None:
+                arrays.extend([SharedArray(name=None, shape=result_shape, dtype=np.double),
+                               SharedArray(name=None, shape=result_shape[:1], dtype=np.double)])
+        if not arrays:
+            return self._map_simulations("_single_simulation", kwargs)
+        block = SharedBlock(SharedBlock.required_bytes(arrays))
+        try:
+            shared_inputs = {
+                _id: block.put(inputs) if isinstance(inputs, np.ndarray)
+                else SharedDataFrame.from_frame(df=inputs, block=block)
+                for _id, inputs in shared_inputs.items()
+            }
+            tasks = []
+            for _kwargs, result_shape in zip(kwargs, result_shapes):
+                _kwargs = _kwargs.copy()
+                if id(_kwargs.get("inputs", None)) in shared_inputs:
+                    _kwargs["inputs"] = shared_inputs[id(_kwargs["inputs"])]
+                if result_shape is not None:
+                    _kwargs["_shared_result"] = (
+                        block.allocate(shape=result_shape, dtype=np.double),
+                        block.allocate(shape=result_shape[:1], dtype=np.double)
+                    )
+                tasks.append(_kwargs)
+            results = self._map_simulations("_single_simulation_shared_memory", tasks)
+            return [
+                result.to_frame(values=block.read(result.values),
+                                index=block.read(result.index))
+                if isinstance(result, SharedDataFrame) else result
+                for result in results
+            ]
+        finally:
+            block.close()
+
+    def _map_simulations(self, method: str, tasks: List[dict]) -> list:
+        """
+        Run the given simulation method for each task, on the pool of
+        workers if n_cpu > 1. If the telemetry is enabled, each simulation
+        is wrapped by _single_simulation_telemetry and the records are
+        added to the telemetry of this api.
+        """
+        if self.telemetry is None:
+            if self.use_mp:
+                return self._map_on_workers(method, tasks)
+            return [getattr(self, method)(dict(task)) for task in tasks]
+        batch = self.telemetry.new_batch()
+        submitted = time.time()
+        if self.use_mp:
+            outputs = self._map_on_workers("_single_simulation_telemetry", [
+                (method, task, run, submitted) for run, task in enumerate(tasks)
+            ])
+        else:
+            outputs = [self._single_simulation_telemetry((method, dict(task), run, submitted))
+                       for run, task in enumerate(tasks)]
+        results = []
+        for output in outputs:
+            if output is None:
+                results.append(None)  # Failed on a supervised pool
+                continue
+            result, record, pickled = output
+            if pickled:
+                _start = time.perf_counter()
+                result = pickle.loads(result)
+                record["transfer"] += time.perf_counter() - _start
+            self.telemetry.add(record, batch=batch)
+            results.append(result)
+        return results
+
+    def _single_simulation_telemetry(self, task: tuple):
+        """
+        Worker side of _map_simulations. Records the telemetry of the given
+        simulation. Results of worker processes are pickled here
+        to record the time required for the transfer.
+        """
+        method, kwargs, run, submitted = task
+        with telemetry.record_run(run=run, worker=self.worker_idx,
+                                  submitted=submitted) as run_telemetry:
+            result = getattr(self, method)(kwargs)
+            pickled = self.use_mp and self.executor == "process"
+            if pickled:
+                with run_telemetry.phase("transfer"):
+                    result = pickle.dumps(result)
+                run_telemetry.count("result_bytes", len(result))
+        return result, run_telemetry.to_dict(), pickled
+
+    def _single_simulation_shared_memory(self, kwargs):
+        """
+        Worker side of _shared_memory_map. Reads the inputs from and
+        writes the result into the shared memory, if possible.
+        """
+        shared_result = kwargs.pop("_shared_result", None)
+        with telemetry.phase("transfer"):
+            if isinstance(kwargs.get("inputs", None), SharedDataFrame):
+                kwargs["inputs"] = kwargs["inputs"].to_frame()
+            elif isinstance(kwargs.get("inputs", None), SharedArray):
+                kwargs["inputs"] = kwargs["inputs"].read()
+        result = self._single_simulation(kwargs)
+        if (shared_result is None or
+                not SharedDataFrame.is_supported(result) or
+                result.shape != shared_result[0].shape or
+                result.dtypes.iloc[0] != np.double):
+            return result  # Use pickle
+        values, index = shared_result
+        with telemetry.phase("transfer"):
+            values.write(result.to_numpy())
+            index.write(result.index.to_numpy())
+        return SharedDataFrame(values=values, index=index,
+                               columns=result.columns,
+                               index_name=result.index.name,
+                               is_tsd=isinstance(result, TimeSeriesData),
+                               attrs=dict(result.attrs))
+
+    def _get_shared_result_shape(self, kwargs: dict) -> Union[tuple, None]:
+        """
+        Return the shape (rows, columns) of the result of a simulation
+        with the given kwargs, if the result is a DataFrame which can
+        be exchanged using shared memory. Else, return None.
+        Results of other shapes are pickled.
+        """
+        # pylint: disable=unused-argument
+        return None
+
     @abstractmethod
     def _single_simulation(self, kwargs):
         """
@@ -323,6 +708,9 @@ class SimulationAPI:
         # Empty all variables again.
         if self.worker_idx:
             return
+        if self._restart_workers_on_model_change:
+            # Restart the workers on next use
+            self._close_pool()
         self.outputs = {}
         self.parameters = {}
         self.states = {}
@@ -330,6 +718,7 @@ class SimulationAPI:
         self._update_model()
         # Set all outputs to result_names:
         self.result_names = list(self.outputs.keys())
+        self._update_workers()
 
     @abstractmethod
     def _update_model(self):
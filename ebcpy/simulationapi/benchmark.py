@@ -0,0 +1,118 @@
+"""
+Module with functions to benchmark the executors of the
+simulation APIs. Use them to decide whether a pool of
+threads or a pool of processes is faster for your model.
+"""
+
+import pickle
+import time
+from typing import List, Type
+import pandas as pd
+from ebcpy.simulationapi import SimulationAPI
+
+
+def benchmark_executors(api_class: Type[SimulationAPI],
+                        cd: str,
+                        model_name: str,
+                        parameters: List[dict],
+                        n_cpu: int,
+                        executors: List[str] = None,
+                        n_repeat: int = 3,
+                        simulation_setup: dict = None,
+                        **kwargs) -> pd.DataFrame:
+    """
+    Simulate the given parameter sets with every executor and
+    compare the required time with a simulation on a single core.
+
+    A pool of threads avoids pickling the api, the inputs and the results
+    of each simulation. It beats a pool of processes if the simulations are
+    short or the results large, as long as the simulation itself releases
+    the GIL. For long simulations spending time in python, e.g. while
+    interpolating inputs or on each step, a pool of processes is faster.
+
+    :param SimulationAPI api_class:
+        Class of the api to benchmark, e.g. FMU_API
+    :param str,os.path.normpath cd:
+        Working directory of the api
+    :param str model_name:
+        Name of the model to simulate
+    :param list parameters:
+        List with the parameter sets to simulate
+    :param int n_cpu:
+        Number of workers of the pools
+    :param list executors:
+        Executors to benchmark. Default are all
+        executors supported by the given api_class.
+    :param int n_repeat:
+        Number of repetitions of the simulation of all parameter sets.
+        The minimal time of all repetitions is reported. Default is 3.
+    :param dict simulation_setup:
+        Simulation setup to use
+    :keyword:
+        All further keyword arguments are passed to the
+        simulate function of the api, e.g. the inputs.
+
+    :return: pd.DataFrame
+        One row per executor. Columns are the time to set up the api,
+        the time to simulate all parameter sets, the time per simulation
+        and the speedup compared to a single core.
+    """
+    if executors is None:
+        executors = api_class._supported_executors
+    _configurations = [("serial", 1)] + [(executor, n_cpu) for executor in executors]
+    benchmark = {}
+    for executor, _n_cpu in _configurations:
+        _start = time.perf_counter()
+        sim_api = api_class(cd=cd,
+                            model_name=model_name,
+                            n_cpu=_n_cpu,
+                            executor="process" if executor == "serial" else executor)
+        setup_time = time.perf_counter() - _start
+        try:
+            if simulation_setup is not None:
+                sim_api.set_sim_setup(simulation_setup)
+            simulation_time = float("inf")
+            for _ in range(n_repeat):
+                _start = time.perf_counter()
+                sim_api.simulate(parameters=parameters, **kwargs)
+                simulation_time = min(simulation_time, time.perf_counter() - _start)
+        finally:
+            sim_api.close()
+        benchmark[executor] = {"n_cpu": _n_cpu,
+                               "setup_time": setup_time,
+                               "simulation_time": simulation_time,
+                               "time_per_simulation": simulation_time / len(parameters)}
+    df = pd.DataFrame(benchmark).transpose()
+    df["speedup"] = df.loc["serial", "simulation_time"] / df["simulation_time"]
+    return df
+
+
+def benchmark_task_overhead(sim_api: SimulationAPI, n_tasks: int = 1000) -> pd.Series:
+    """
+    Measure the overhead of each task sent to the pool of workers
+    of the given api, without simulating anything.
+
+    :param SimulationAPI sim_api:
+        Instance of an api with n_cpu > 1
+    :param int n_tasks:
+        Number of empty tasks to send to the workers. Default is 1000.
+
+    :return: pd.Series
+        Time to start the pool, time per task and the size in bytes of the
+        api sent once to each worker and of the context sent with each task.
+    """
+    # pylint: disable=protected-access
+    if not sim_api.use_mp:
+        raise ValueError("Task overhead can only be measured for n_cpu > 1")
+    _start = time.perf_counter()
+    sim_api._map_on_workers("_worker_noop", list(range(sim_api.n_cpu)))
+    startup_time = time.perf_counter() - _start
+    _start = time.perf_counter()
+    sim_api._map_on_workers("_worker_noop", list(range(n_tasks)))
+    time_per_task = (time.perf_counter() - _start) / n_tasks
+    return pd.Series({"executor": sim_api.executor,
+                      "n_cpu": sim_api.n_cpu,
+                      "startup_time": startup_time,
+                      "time_per_task": time_per_task,
+                      "api_bytes": len(pickle.dumps(sim_api)),
+                      "context_bytes": len(pickle.dumps(sim_api._get_worker_context()))})
@@ -3,18 +3,22 @@ of Modelica-Models."""
 
 import sys
 import os
-import shutil
 import pathlib
 import warnings
 import atexit
 from typing import Union, List
 from pydantic import Field
+import numpy as np
 import pandas as pd
 from ebcpy import TimeSeriesData
-from ebcpy.modelica import manipulate_ds
 from ebcpy.simulationapi import SimulationSetup, SimulationAPI, \
-    SimulationSetupClass, Variable
-from ebcpy.utils.conversion import convert_tsd_to_modelica_txt
+    SimulationSetupClass, telemetry
+from ebcpy.simulationapi.translation_cache import TranslationCache
+from ebcpy.simulationapi.input_tables import InputTableWriter
+from ebcpy.simulationapi.dymola_pool import DymolaInstancePool
+from ebcpy.simulationapi.dymosim import read_dsin_variables, get_ds_settings, run_dymosim
+from ebcpy.modelica import manipulate_ds, simres
+from ebcpy.utils import move_file
 
 
 class DymolaSimulationSetup(SimulationSetup):
@@ -63,6 +67,16 @@ class DymolaAPI(SimulationAPI):
         Number of iterations after which Dymola should restart.
         This is done to free memory. Default value -1. For values
         below 1 Dymola does not restart.
+    :keyword float max_rss_growth:
+        Maximal growth of the memory (resident set size) of a Dymola
+        process in MB. If exceeded, Dymola restarts to free memory.
+        Requires psutil. Default is None, not restarting due to memory.
+    :keyword int n_spare_instances:
+        Number of spare Dymola instances per worker, started in the
+        background with all packages loaded, see ``DymolaInstancePool``.
+        A spare replaces a restarting instance without delay and holds
+        a licence during restarts. Default is 1, if n_restart or
+        max_rss_growth are given, else 0.
     :keyword bool extract_variables:
         If True (the default), all variables of the model will be extracted
         on init of this class.
@@ -94,6 +108,33 @@ class DymolaAPI(SimulationAPI):
         ``dymola_version='Dymola 2020x'``.
 
         This parameter is overwritten if ``dymola_path`` is specified.
+    :keyword float task_timeout:
+        Maximal wall-clock time of a single simulation if n_cpu > 1,
+        see ``SimulationAPI``. The worker is killed and a new Dymola
+        instance started. Dymola instances of killed workers may keep
+        running and have to be closed manually.
+    :keyword str translation_cache_dir:
+        Directory to cache the translations of the model in, see
+        ``TranslationCache``. Switching back to a model name restores the
+        artefacts and variables of its translation instead of translating
+        again. Parameter sets with the values of structural parameters of
+        a cached translation are simulated by running its dymosim, see
+        ``DymosimAPI``, unless show_eventlog is set or dymosim does not
+        support the sim_setup. Default is the folder 'translation_cache' in
+        the cd. Pass False to disable the cache.
+    :keyword int translation_cache_size:
+        Maximal number of cached translations. Default is 10.
+    :keyword bool distribute_translation:
+        If True and n_cpu > 1, the model is only translated by the main
+        instance of Dymola. Its dymosim and dsin.txt are copied from the
+        translation cache into the folder 'translation_<key>' in the directory
+        of each worker, which runs dymosim directly instead of translating
+        the model again. The
+        workers start, i.e. load all packages, while the main instance
+        translates. Workers still translate models with modified
+        structural parameters or simulate with solvers not supported by
+        dymosim in their own Dymola instance. Requires the translation
+        cache. Default is False.
 
     Example:
 
@@ -112,18 +153,29 @@ class DymolaAPI(SimulationAPI):
 
     """
     _sim_setup_class: SimulationSetupClass = DymolaSimulationSetup
-    _dymola_instances: dict = {}
-    _items_to_drop = ["pool", "dymola", "_dummy_dymola_instance"]
+    _dymola_pools: dict = {}
+    _items_to_drop = ["pool", "dymola", "_dymola_pool", "telemetry"]
+    # The writer and the restored translations are static to keep
+    # the hashes of the written tables and the translations in each worker
+    _worker_static_items = SimulationAPI._worker_static_items + [
+        '_input_table_writer',
+        '_worker_translations'
+    ]
     # Default simulation setup
     _supported_kwargs = ["show_window",
                          "modify_structural_parameters",
                          "dymola_path",
                          "equidistant_output",
                          "n_restart",
+                         "max_rss_growth",
+                         "n_spare_instances",
                          "debug",
                          "mos_script_pre",
                          "mos_script_post",
-                         "dymola_version"]
+                         "dymola_version",
+                         "translation_cache_dir",
+                         "translation_cache_size",
+                         "distribute_translation"]
 
     def __init__(self, cd, model_name, packages=None, **kwargs):
         """Instantiate class objects."""
@@ -138,6 +190,11 @@ class DymolaAPI(SimulationAPI):
         self.mos_script_pre = kwargs.pop("mos_script_pre", None)
         self.mos_script_post = kwargs.pop("mos_script_post", None)
         self.dymola_version = kwargs.pop("dymola_version", None)
+        self.translation_cache_dir = kwargs.pop("translation_cache_dir", None)
+        self.translation_cache_size = kwargs.pop("translation_cache_size", 10)
+        self.distribute_translation = kwargs.pop("distribute_translation", False)
+        # Key of the translation in the cache used by the workers
+        self._translation_key = None
         for mos_script in [self.mos_script_pre, self.mos_script_post]:
             if mos_script is not None:
                 if not os.path.isfile(mos_script):
@@ -158,10 +215,18 @@ class DymolaAPI(SimulationAPI):
             self.mos_script_post = self._make_modelica_normpath(self.mos_script_post)
         # Set empty dymola attribute
         self.dymola = None
+        self._input_table_writer = InputTableWriter()
+        # Translations restored by _get_translation, keyed by the worker and the key
+        self._worker_translations = {}
 
         super().__init__(cd=cd,
                          model_name=model_name,
-                         n_cpu=kwargs.pop("n_cpu", 1))
+                         n_cpu=kwargs.pop("n_cpu", 1),
+                         supervise=kwargs.pop("supervise", False),
+                         task_timeout=kwargs.pop("task_timeout", None),
+                         max_retries=kwargs.pop("max_retries", 0),
+                         telemetry=kwargs.pop("telemetry", False),
+                         telemetry_callback=kwargs.pop("telemetry_callback", None))
 
         # First import the dymola-interface
         dymola_path = kwargs.pop("dymola_path", None)
@@ -210,28 +275,34 @@ class DymolaAPI(SimulationAPI):
                     raise TypeError(f"Given package is of type {type(package)}"
                                     f" but should be any valid path.")
 
+        self.translation_cache = None
+        if self.translation_cache_dir is not False:
+            self.translation_cache = TranslationCache(
+                cache_dir=os.path.join(self.cd, "translation_cache")
+                if self.translation_cache_dir is None else self.translation_cache_dir,
+                max_entries=self.translation_cache_size
+            )
+
         # Import n_restart
-        self.sim_counter = 0
         self.n_restart = kwargs.pop("n_restart", -1)
         if not isinstance(self.n_restart, int):
             raise TypeError(f"n_restart has to be type int but "
                             f"is of type {type(self.n_restart)}")
-
-        self._dummy_dymola_instance = None  # Ensure self._close_dummy gets the attribute.
-        if self.n_restart > 0:
-            self.logger.info("Open blank placeholder Dymola instance to ensure"
-                             " a licence during Dymola restarts")
-            self._dummy_dymola_instance = self._open_dymola_interface()
-            atexit.register(self._close_dummy)
+        self.max_rss_growth = kwargs.pop("max_rss_growth", None)
+        self.n_spare_instances = kwargs.pop(
+            "n_spare_instances",
+            int(self.n_restart > 0 or self.max_rss_growth is not None)
+        )
+        self._dymola_pool = None
 
         # List storing structural parameters for later modifying the simulation-name.
         # Parameter for raising a warning if to many dymola-instances are running
-        self._critical_number_instances = 10 + self.n_cpu
+        self._critical_number_instances = 10 + self.n_cpu * (1 + self.n_spare_instances)
         # Register the function now in case of an error.
         if not self.debug:
             atexit.register(self.close)
-        if self.use_mp:
-            self.pool.map(self._setup_dymola_interface, [True for _ in range(self.n_cpu)])
+        # With multiprocessing, each worker starts its
+        # own dymola instance in _setup_worker.
         # For translation etc. always setup a default dymola instance
         self.dymola = self._setup_dymola_interface(use_mp=False)
         self.fully_initialized = True
@@ -246,10 +317,19 @@ class DymolaAPI(SimulationAPI):
                 "are not part of the supported kwargs and "
                 "have thus no effect: %s.", " ,".join(list(kwargs.keys())))
 
+    def _setup_worker(self):
+        self._setup_dymola_interface(use_mp=True)
+
     def _update_model(self):
         # Translate the model and extract all variables,
         # if the user wants to:
         if self.extract_variables and self.fully_initialized:
+            if (self.use_mp and self.distribute_translation and
+                    self.translation_cache is not None and self.pool is None):
+                # Start the workers and their Dymola instances while
+                # the main instance translates. The workers restore
+                # the variables along with the translation.
+                self.pool = self._create_pool()
             self.extract_model_variables()
 
     def simulate(self,
@@ -261,6 +341,11 @@ class DymolaAPI(SimulationAPI):
 
         Additional settings:
 
+        :param str return_option:
+            Additionally to the options of ``SimulationAPI.simulate``,
+            'array' returns a numpy array with the time in the first and
+            the result_names in the further columns. The worker loads only
+            these columns from its result file, see ``simres.mat_to_array``.
         :keyword Boolean show_eventlog:
             Default False. True to show evenlog of simulation (advanced)
         :keyword Boolean squeeze:
@@ -274,6 +359,11 @@ class DymolaAPI(SimulationAPI):
             If inputs are given, you have to specify the file_name of the table
             in the instance of CombiTimeTable. In order for the inputs to
             work the value should be equal to the value of 'fileName' in Modelica.
+            Files ending with .mat are written as binary MATLAB v4 file, others
+            as text file. Relative file names are resolved in the working
+            directory of the simulation, which is a separate directory for each worker.
+            The file is only written, if the inputs changed since the last
+            simulation of the worker.
         :keyword List[str] structural_parameters:
             A list containing all parameter names which are structural in Modelica.
             This means a modifier has to be created in order to change
@@ -288,8 +378,18 @@ class DymolaAPI(SimulationAPI):
             >>> sim_api.simulate(
             >>>     parameters={"parameterPipe": "AixLib.DataBase.Pipes.PE_X.DIN_16893_SDR11_d160()"},
             >>>     structural_parameters=["parameterPipe"])
+        :keyword int batch_size:
+            Maximal number of parameter sets simulated in one call of
+            Dymola's simulateMultiResultsModel. Parameter sets with the same
+            names and values of structural parameters are grouped into
+            batches of this size, so each worker simulates a whole batch
+            at once. Reduces the overhead per simulation. Only used for the
+            return_options 'time_series' and 'last_point'. Default is 1.
 
         """
+        if kwargs.get("result_store", None) is not None:
+            raise TypeError("The DymolaAPI does not support a result_store, "
+                            "Dymola writes the result files itself.")
         # Handle special case for structural_parameters
         if "structural_parameters" in kwargs:
             _struc_params = kwargs["structural_parameters"]
@@ -298,8 +398,59 @@ class DymolaAPI(SimulationAPI):
             # the super method.
             if not isinstance(_struc_params[0], list):
                 kwargs["structural_parameters"] = [_struc_params]
+        batch_size = kwargs.pop("batch_size", 1)
+        if (batch_size > 1 and isinstance(parameters, list) and len(parameters) > 1 and
+                return_option in ["time_series", "last_point"]):
+            return self._simulate_batches(parameters=parameters,
+                                          return_option=return_option,
+                                          batch_size=batch_size,
+                                          **kwargs)
         return super().simulate(parameters=parameters, return_option=return_option, **kwargs)
 
+    def _simulate_batches(self, parameters: List[dict], return_option: str,
+                          batch_size: int, **kwargs):
+        """
+        Simulate the parameter sets in batches, one call of
+        simulateMultiResultsModel per batch. All sets of a batch
+        have the same names and values of structural parameters.
+        """
+        per_set_kwargs = [key for key, value in kwargs.items()
+                          if isinstance(value, list) and key != "structural_parameters"]
+        if per_set_kwargs or len(kwargs.get("structural_parameters", [[]])) > 1:
+            self.logger.info("Can't batch simulations with different %s per parameter set, "
+                             "simulating each set separately.",
+                             ", ".join(per_set_kwargs) or "structural_parameters")
+            return super().simulate(parameters=parameters, return_option=return_option,
+                                    **kwargs)
+        groups = {}
+        for idx, _parameters in enumerate(parameters):
+            # Parameters unknown to the translated model are structural
+            key = (tuple(_parameters.keys()),
+                   tuple(str(value) for name, value in _parameters.items()
+                         if name not in self.parameters))
+            groups.setdefault(key, []).append(idx)
+        batches = [indices[start:start + batch_size] for indices in groups.values()
+                   for start in range(0, len(indices), batch_size)]
+        if "structural_parameters" in kwargs:
+            kwargs["structural_parameters"] = kwargs["structural_parameters"] * len(batches)
+        results = super().simulate(parameters=[[parameters[idx] for idx in batch]
+                                               for batch in batches],
+                                   return_option=return_option, **kwargs)
+        if len(batches) == 1:
+            results = [results]
+        # Restore the order of the given parameter sets
+        ordered_results = [None] * len(parameters)
+        for batch, batch_results in zip(batches, results):
+            if batch_results is None:  # Failed batch
+                batch_results = [None] * len(batch)
+            for idx, result in zip(batch, batch_results):
+                ordered_results[idx] = result
+        self.failed_simulations = [
+            {"parameters": _parameters, "reason": failed["reason"]}
+            for failed in self.failed_simulations for _parameters in failed["parameters"]
+        ]
+        return ordered_results
+
     def _single_simulation(self, kwargs):
         # Unpack kwargs
         show_eventlog = kwargs.get("show_eventlog", False)
@@ -314,11 +465,15 @@ class DymolaAPI(SimulationAPI):
         # Handle multiprocessing
         if self.use_mp:
             idx_worker = self.worker_idx
-            if idx_worker not in self._dymola_instances:
+            if idx_worker not in self._dymola_pools:
                 self._setup_dymola_interface(use_mp=True)
-            dymola = self._dymola_instances[idx_worker]
+            dymola_pool = self._dymola_pools[idx_worker]
         else:
-            dymola = self.dymola
+            dymola_pool = self._dymola_pool
+        # Restart Dymola after n_restart iterations or on memory growth
+        dymola = dymola_pool.acquire()
+        if not self.use_mp:
+            self.dymola = dymola
 
         # Handle eventlog
         if show_eventlog:
@@ -326,8 +481,23 @@ class DymolaAPI(SimulationAPI):
             dymola.ExecuteCommand("Advanced.Debug.LogEvents = true")
             dymola.ExecuteCommand("Advanced.Debug.LogEventsInitialization = true")
 
-        # Restart Dymola after n_restart iterations
-        self._check_restart()
+        # A list of parameter sets is a batch, see _simulate_batches.
+        # All sets share the names and the structural parameters
+        # of the first set, which is used to set up the model.
+        parameter_sets = None
+        if isinstance(parameters, list):
+            parameter_sets = parameters
+            parameters = parameter_sets[0]
+
+        # Use the translation of the main instance, see distribute_translation
+        translation = None
+        if self.use_mp and self._translation_key is not None:
+            # Always restore, as the variables of the workers may
+            # be sent before the main instance translated the model.
+            translation = self._get_translation(key=self._translation_key,
+                                                set_variables=True)
+            if show_eventlog or not self._dymosim_supports_setup():
+                translation = None
 
         # Handle parameters:
         if parameters is None:
@@ -340,7 +510,8 @@ class DymolaAPI(SimulationAPI):
             )
 
         # Handle structural parameters
-
+        # Key to cache the translation of Dymola for the modified model
+        store_key = None
         if (unsupported_parameters and
                 (self.modify_structural_parameters or
                  structural_parameters)):
@@ -350,30 +521,53 @@ class DymolaAPI(SimulationAPI):
                 model_name=self.model_name,
                 structural_params=list(self.states.keys()) + structural_parameters
             )
-            # Trigger translation only if something changed
-            if model_name != self.model_name:
-                _res_names = self.result_names.copy()
-                self.model_name = model_name
-                self.result_names = _res_names  # Restore previous result names
-            self.logger.warning(
-                "Warning: Currently, the model is re-translating "
-                "for each simulation. You should add to your Modelica "
-                "parameters \"annotation(Evaluate=false)\".\n "
-                "Check for these parameters: %s",
-                ', '.join(set(parameters.keys()).difference(parameters_new.keys()))
-            )
+            translation = None
+            if self.translation_cache is not None:
+                store_key = self._get_translation_key(model_name=model_name)
+                if (store_key in self.translation_cache and not show_eventlog and
+                        self._dymosim_supports_setup()):
+                    try:
+                        translation = self._get_translation(key=store_key)
+                    except KeyError:  # Evicted meanwhile
+                        translation = None
+            if translation is not None:
+                store_key = None
+                self.logger.info("Simulating cached translation of model '%s'", model_name)
+            else:
+                # Trigger translation only if something changed
+                if model_name != self.model_name:
+                    _res_names = self.result_names.copy()
+                    self.model_name = model_name
+                    self.result_names = _res_names  # Restore previous result names
+                self.logger.warning(
+                    "Warning: Currently, the model is re-translating "
+                    "for each new combination of structural parameters. "
+                    "You should add to your Modelica "
+                    "parameters \"annotation(Evaluate=false)\".\n "
+                    "Check for these parameters: %s",
+                    ', '.join(set(parameters.keys()).difference(parameters_new.keys()))
+                )
             parameters = parameters_new
+            if parameter_sets is not None:
+                parameter_sets = [{name: _parameters[name] for name in parameters}
+                                  for _parameters in parameter_sets]
             # Check again
             unsupported_parameters = self.check_unsupported_variables(
                 variables=list(parameters.keys()),
                 type_of_var="parameters"
             )
 
+        if unsupported_parameters:
+            translation = None
+
         initial_names = list(parameters.keys())
-        initial_values = list(parameters.values())
         # Convert to float for Boolean and integer types:
         try:
-            initial_values = [float(v) for v in initial_values]
+            if parameter_sets is None:
+                initial_values = [float(v) for v in parameters.values()]
+            else:
+                initial_values = [[float(_parameters[name]) for name in initial_names]
+                                  for _parameters in parameter_sets]
         except (ValueError, TypeError) as err:
             raise TypeError("Dymola only accepts float values. "
                             "Could bot automatically convert the given "
@@ -392,32 +586,49 @@ class DymolaAPI(SimulationAPI):
                                " model in your modelica code.") from err
             # Generate the input in the correct format
             offset = self.sim_setup.start_time - inputs.index[0]
-            filepath = convert_tsd_to_modelica_txt(
-                tsd=inputs,
-                table_name=table_name,
-                save_path_file=file_name,
-                offset=offset
-            )
+            with telemetry.phase("input_conversion"):
+                # Relative file names are read from the cd of the simulation
+                filepath = self._input_table_writer.write(
+                    inputs=inputs,
+                    table_name=table_name,
+                    file_name=file_name,
+                    cd=self._get_dymola_cd() if translation is None else translation["cd"],
+                    offset=offset
+                )
             self.logger.info("Successfully created Dymola input file at %s", filepath)
 
-        if return_option == "savepath":
+        if translation is not None:
+            results = self._simulate_translation(
+                translation=translation,
+                parameter_sets=[parameters] if parameter_sets is None else parameter_sets,
+                return_option=return_option,
+                result_file_name=result_file_name,
+                savepath=kwargs.get("savepath", None),
+                fail_on_error=fail_on_error
+            )
+            if parameter_sets is None and (squeeze or return_option in ["savepath", "array"]):
+                return results[0]
+            return results
+
+        if return_option in ["savepath", "array"]:
             if unsupported_parameters:
                 raise KeyError("Dymola does not accept invalid parameter "
                                "names for option return_type='savepath'. "
                                "To use this option, delete unsupported "
                                "parameters from your setup.")
-            res = dymola.simulateExtendedModel(
-                self.model_name,
-                startTime=self.sim_setup.start_time,
-                stopTime=self.sim_setup.stop_time,
-                numberOfIntervals=0,
-                outputInterval=self.sim_setup.output_interval,
-                method=self.sim_setup.solver,
-                tolerance=self.sim_setup.tolerance,
-                fixedstepsize=self.sim_setup.fixedstepsize,
-                resultFile=result_file_name,
-                initialNames=initial_names,
-                initialValues=initial_values)
+            with telemetry.phase("solve"):
+                res = dymola.simulateExtendedModel(
+                    self.model_name,
+                    startTime=self.sim_setup.start_time,
+                    stopTime=self.sim_setup.stop_time,
+                    numberOfIntervals=0,
+                    outputInterval=self.sim_setup.output_interval,
+                    method=self.sim_setup.solver,
+                    tolerance=self.sim_setup.tolerance,
+                    fixedstepsize=self.sim_setup.fixedstepsize,
+                    resultFile=result_file_name,
+                    initialNames=initial_names,
+                    initialValues=initial_values)
         else:
             if not parameters and not self.parameters:
                 raise ValueError(
@@ -429,6 +640,8 @@ class DymolaAPI(SimulationAPI):
                 random_name = list(self.parameters.keys())[0]
                 initial_values = [self.parameters[random_name].value]
                 initial_names = [random_name]
+                if parameter_sets is not None:
+                    initial_values = [initial_values] * len(parameter_sets)
 
             # Handle 1 and 2 D initial names:
             # Convert a 1D list to 2D list
@@ -452,18 +665,19 @@ class DymolaAPI(SimulationAPI):
                     "numberOfIntervals or a value for output_interval "
                     "which can be converted to numberOfIntervals.")
 
-            res = dymola.simulateMultiResultsModel(
-                self.model_name,
-                startTime=self.sim_setup.start_time,
-                stopTime=self.sim_setup.stop_time,
-                numberOfIntervals=int(number_of_intervals),
-                method=self.sim_setup.solver,
-                tolerance=self.sim_setup.tolerance,
-                fixedstepsize=self.sim_setup.fixedstepsize,
-                resultFile=None,
-                initialNames=initial_names,
-                initialValues=initial_values,
-                resultNames=res_names)
+            with telemetry.phase("solve"):
+                res = dymola.simulateMultiResultsModel(
+                    self.model_name,
+                    startTime=self.sim_setup.start_time,
+                    stopTime=self.sim_setup.stop_time,
+                    numberOfIntervals=int(number_of_intervals),
+                    method=self.sim_setup.solver,
+                    tolerance=self.sim_setup.tolerance,
+                    fixedstepsize=self.sim_setup.fixedstepsize,
+                    resultFile=None,
+                    initialNames=initial_names,
+                    initialValues=initial_values,
+                    resultNames=res_names)
 
         if not res[0]:
             self.logger.error("Simulation failed!")
@@ -471,7 +685,7 @@ class DymolaAPI(SimulationAPI):
             log = dymola.getLastErrorLog()
             # Only print first part as output is sometimes to verbose.
             self.logger.error(log[:10000])
-            dslog_path = os.path.join(self.cd, 'dslog.txt')
+            dslog_path = os.path.join(self._get_dymola_cd(), 'dslog.txt')
             try:
                 with open(dslog_path, "r") as dslog_file:
                     dslog_content = dslog_file.read()
@@ -486,52 +700,181 @@ class DymolaAPI(SimulationAPI):
             self.logger.error(msg)
             return None
 
+        if store_key is not None and store_key not in self.translation_cache:
+            # Dymola translated the modified model in its cd
+            self._store_translation(key=store_key, model_name=self.model_name)
+
+        if return_option == "array":
+            with telemetry.phase("result_conversion"):
+                _, values = simres.mat_to_array(
+                    fname=os.path.join(self._get_dymola_cd(), f"{result_file_name}.mat"),
+                    names=["Time"] + self.result_names
+                )
+            return values
         if return_option == "savepath":
             _save_name_dsres = f"{result_file_name}.mat"
             savepath = kwargs.pop("savepath", None)
-            # Get the cd of the current dymola instance
-            dymola.cd()
-            # Get the value and convert it to a 100 % fitting str-path
-            dymola_cd = str(pathlib.Path(dymola.getLastErrorLog().replace("\n", "")))
+            dymola_cd = self._get_dymola_cd()
             if savepath is None or str(savepath) == dymola_cd:
                 return os.path.join(dymola_cd, _save_name_dsres)
             os.makedirs(savepath, exist_ok=True)
             for filename in [_save_name_dsres, "dslog.txt", "dsfinal.txt"]:
-                # Delete existing files
-                try:
-                    os.remove(os.path.join(savepath, filename))
-                except OSError:
-                    pass
-                # Move files
-                shutil.copy(os.path.join(dymola_cd, filename),
-                            os.path.join(savepath, filename))
-                os.remove(os.path.join(dymola_cd, filename))
+                move_file(os.path.join(dymola_cd, filename),
+                          os.path.join(savepath, filename))
             return os.path.join(savepath, _save_name_dsres)
 
-        data = res[1]  # Get data
+        # Get data, one array of shape (len(res_names), n_time) per set
+        data = [np.asarray(ini_val_set, dtype=np.float64) for ini_val_set in res[1]]
+        squeeze = squeeze and parameter_sets is None
         if return_option == "last_point":
-            results = []
-            for ini_val_set in data:
-                results.append({result_name: ini_val_set[idx][-1] for idx, result_name
-                                in enumerate(res_names)})
+            results = [dict(zip(res_names, ini_val_set[:, -1].tolist()))
+                       for ini_val_set in data]
             if len(results) == 1 and squeeze:
                 return results[0]
             return results
         # Else return as dataframe.
-        dfs = []
-        for ini_val_set in data:
-            df = pd.DataFrame({result_name: ini_val_set[idx] for idx, result_name
-                               in enumerate(res_names)})
-            # Set time index
-            df = df.set_index("Time")
-            # Convert it to float
-            df.index = df.index.astype("float64")
-            dfs.append(df)
+        with telemetry.phase("result_conversion"):
+            idx_time = res_names.index("Time")
+            columns = res_names[:idx_time] + res_names[idx_time + 1:]
+            dfs = [pd.DataFrame(np.delete(ini_val_set, idx_time, axis=0).T,
+                                columns=columns,
+                                index=pd.Index(ini_val_set[idx_time], name="Time"))
+                   for ini_val_set in data]
         # Most of the cases, only one set is provided. In that case, avoid
         if len(dfs) == 1 and squeeze:
             return TimeSeriesData(dfs[0], default_tag="sim")
         return [TimeSeriesData(df, default_tag="sim") for df in dfs]
 
+    def _get_dymola_cd(self) -> str:
+        """Return the working directory of the dymola instance simulating in this worker"""
+        if self.use_mp:
+            return os.path.join(self.cd, f"worker_{self.worker_idx}")
+        return self.cd
+
+    def _get_translation_key(self, model_name: str) -> str:
+        """Return the key of the given model in the translation cache"""
+        return self.translation_cache.get_key(model_name=model_name,
+                                              packages=self.packages,
+                                              dymola_path=self.dymola_exe_path,
+                                              mos_script_pre=self.mos_script_pre)
+
+    def _store_translation(self, key: str, model_name: str):
+        """Store the translation of Dymola in its cd, e.g. of a modified model"""
+        dymola_cd = self._get_dymola_cd()
+        dsin_path = os.path.join(dymola_cd, "dsin.txt")
+        if not os.path.isfile(dsin_path):
+            return
+        try:
+            self.translation_cache.store(key=key, model_name=model_name, cd=dymola_cd,
+                                         variables=read_dsin_variables(dsin_path))
+        except OSError as err:
+            # The simulation succeeded, only the cache is not updated
+            self.logger.warning("Could not cache the translation of model '%s': %s",
+                                model_name, err)
+
+    def _dymosim_supports_setup(self) -> bool:
+        """Check if dymosim can simulate the current sim_setup, see get_ds_settings"""
+        try:
+            get_ds_settings(self.sim_setup)
+        except ValueError as err:
+            self.logger.info("Simulating with Dymola, as %s", err)
+            return False
+        return True
+
+    def _get_translation(self, key: str, set_variables: bool = False):
+        """
+        Restore the cached translation with the given key into a directory
+        of its own in the cd of the current worker. The translation is not
+        restored into the cd of Dymola, as Dymola overwrites the artefacts
+        when translating another model. Return the dsin template and the
+        dymosim executable, None if the translation has no executable.
+
+        :param str key:
+            Key of the translation, see TranslationCache.get_key
+        :param bool set_variables:
+            If True, set the variables of the api to the ones of the translation.
+        """
+        if (self.worker_idx, key) in self._worker_translations:
+            return self._worker_translations[(self.worker_idx, key)]
+        translation_dir = os.path.join(self._get_dymola_cd(), f"translation_{key}")
+        variables = self.translation_cache.restore(key=key, cd=translation_dir)
+        if variables is None:
+            raise KeyError(f"Translation of model '{self.model_name}' is not in the "
+                           f"translation cache anymore. Increase the translation_cache_size.")
+        if set_variables:
+            for name, _variables in variables.items():
+                setattr(self, name, dict(_variables))
+        translation = None
+        for executable in ["dymosim.exe", "dymosim"]:
+            if translation is None and os.path.isfile(os.path.join(translation_dir, executable)):
+                translation = {
+                    "key": key,
+                    "cd": translation_dir,
+                    "executable": os.path.join(translation_dir, executable),
+                    "template": manipulate_ds.DsinTemplate(
+                        os.path.join(translation_dir, "dsin.txt"))
+                }
+        self._worker_translations[(self.worker_idx, key)] = translation
+        return translation
+
+    def _simulate_translation(self, translation: dict, parameter_sets: List[dict],
+                              return_option: str, result_file_name: str,
+                              savepath: str, fail_on_error: bool) -> list:
+        """
+        Simulate the given parameter sets by running the dymosim of the
+        translation restored by _get_translation, see DymosimAPI.
+        """
+        worker_dir = translation["cd"]
+        dsin_path = os.path.join(worker_dir, "dsin.txt")
+        if return_option == "savepath":
+            result_path = os.path.join(worker_dir, f"{result_file_name}.mat")
+        else:
+            result_path = os.path.join(worker_dir, "dsres.mat")
+        settings = get_ds_settings(sim_setup=self.sim_setup,
+                                   equidistant_output=self.equidistant_output)
+        results = []
+        for parameters in parameter_sets:
+            with telemetry.phase("set_parameters"):
+                translation["template"].write(savepath=dsin_path,
+                                              initial_values=parameters,
+                                              settings=settings)
+            with telemetry.phase("solve"):
+                error = run_dymosim(executable=translation["executable"], cd=worker_dir,
+                                    dsin_path=dsin_path, result_path=result_path)
+            if error is not None:
+                if fail_on_error:
+                    raise Exception(error)
+                # Don't raise and return None
+                self.logger.error(error)
+                results.append(None)
+                continue
+            if return_option == "array":
+                with telemetry.phase("result_conversion"):
+                    results.append(simres.mat_to_array(
+                        fname=result_path, names=["Time"] + self.result_names)[1])
+                continue
+            if return_option == "savepath":
+                if savepath is None or str(savepath) == worker_dir:
+                    results.append(result_path)
+                    continue
+                os.makedirs(savepath, exist_ok=True)
+                for filename in [os.path.basename(result_path), "dslog.txt", "dsfinal.txt"]:
+                    if os.path.isfile(os.path.join(worker_dir, filename)):
+                        move_file(os.path.join(worker_dir, filename),
+                                  os.path.join(savepath, filename))
+                results.append(os.path.join(savepath, os.path.basename(result_path)))
+                continue
+            with telemetry.phase("result_conversion"):
+                df = simres.mat_to_pandas(fname=result_path,
+                                          names=list(self.result_names),
+                                          with_unit=False)
+                df.index = pd.Index(df.index.astype("float64"), name="Time")
+            if return_option == "last_point":
+                results.append({**df.iloc[-1].to_dict(), "Time": df.index[-1]})
+            else:
+                results.append(TimeSeriesData(df, default_tag="sim"))
+        return results
+
     def translate(self):
         """
         Translates the current model using dymola.translateModel()
@@ -615,14 +958,17 @@ class DymolaAPI(SimulationAPI):
     def cd(self, cd):
         """Set the working directory to the given path"""
         self._cd = cd
+        # Translations are restored into the old cd
+        self._worker_translations = {}
         if self.dymola is None:  # Not yet started
             return
         # Also set the cd in the dymola api
         self.set_dymola_cd(dymola=self.dymola,
                            cd=cd)
-        if self.use_mp:
-            self.logger.warning("Won't set the cd for all workers, "
-                                "not yet implemented.")
+        self._dymola_pool.reset_spares()
+        # Workers and their Dymola instances use the old cd, see
+        # _get_dymola_cd. Restart them in the new cd on next use.
+        self._close_pool()
 
     def set_dymola_cd(self, dymola, cd):
         """
@@ -640,14 +986,17 @@ class DymolaAPI(SimulationAPI):
         """Closes dymola."""
         # Close MP of super class
         super().close()
-        # Always close main instance
-        self._single_close(dymola=self.dymola)
+        self._worker_translations = {}
+        # Always close main instances
+        if self._dymola_pool is not None:
+            self._dymola_pool.close()
+            self._dymola_pool = None
         self.dymola = None
 
     def _close_multiprocessing(self, _):
         wrk_idx = self.worker_idx
-        if wrk_idx in self._dymola_instances:
-            self._single_close(dymola=self._dymola_instances.pop(wrk_idx))
+        if wrk_idx in self._dymola_pools:
+            self._dymola_pools.pop(wrk_idx).close()
 
     def _single_close(self, **kwargs):
         """Closes a single dymola instance"""
@@ -664,51 +1013,66 @@ class DymolaAPI(SimulationAPI):
         dymola.close()
         self.logger.info('Successfully closed Dymola')
 
-    def _close_dummy(self):
-        """
-        Closes dummy instance at the end of the execution
-        """
-        if self._dummy_dymola_instance is not None:
-            self.logger.info('Closing dummy Dymola instance')
-            self._dummy_dymola_instance.close()
-            self.logger.info('Successfully closed dummy Dymola instance')
-
     def extract_model_variables(self):
         """
         Extract all variables of the model by
-        translating it and then processing the dsin
-        using the manipulate_ds module.
+        translating it and then processing the dsin,
+        see ``read_dsin_variables``. If the model was
+        translated before, its cached translation is restored.
         """
+        key = None
+        self._translation_key = None
+        if self.translation_cache is not None:
+            key = self._get_translation_key(model_name=self.model_name)
+            variables = self.translation_cache.restore(key=key, cd=self.cd)
+            if variables is not None:
+                self.logger.info("Restored cached translation of model '%s'",
+                                 self.model_name)
+                for name, _variables in variables.items():
+                    setattr(self, name, dict(_variables))
+                if self.distribute_translation:
+                    self._translation_key = key
+                return
         # Translate model
         self.logger.info("Translating model '%s' to extract model variables ",
                          self.model_name)
         self.translate()
-        # Get path to dsin:
-        dsin_path = os.path.join(self.cd, "dsin.txt")
-        df = manipulate_ds.convert_ds_file_to_dataframe(dsin_path)
-        # Convert and return all parameters of dsin to initial values and names
-        for idx, row in df.iterrows():
-            _max = float(row["4"])
-            _min = float(row["3"])
-            if _min >= _max:
-                _var_ebcpy = Variable(value=float(row["2"]))
-            else:
-                _var_ebcpy = Variable(
-                    min=_min,
-                    max=_max,
-                    value=float(row["2"])
-                )
-            if row["5"] == "1":
-                self.parameters[idx] = _var_ebcpy
-            elif row["5"] == "5":
-                self.inputs[idx] = _var_ebcpy
-            elif row["5"] == "4":
-                self.outputs[idx] = _var_ebcpy
-            else:
-                self.states[idx] = _var_ebcpy
+        variables = read_dsin_variables(os.path.join(self.cd, "dsin.txt"))
+        for name, _variables in variables.items():
+            setattr(self, name, _variables)
+        if key is not None:
+            try:
+                self.translation_cache.store(key=key, model_name=self.model_name,
+                                             cd=self.cd, variables=variables)
+            except OSError as err:
+                self.logger.warning("Could not cache the translation of model '%s': %s",
+                                    self.model_name, err)
+        if self.distribute_translation:
+            self._translation_key = key
 
     def _setup_dymola_interface(self, use_mp):
-        """Load all packages and change the current working directory"""
+        """
+        Create the pool of dymola instances of the main process or of
+        the current worker. Spares are only warmed for the instances
+        running the simulations.
+        """
+        pool = DymolaInstancePool(
+            setup_instance=lambda: self._start_dymola_instance(use_mp=use_mp),
+            close_instance=lambda dymola: self._single_close(dymola=dymola),
+            n_spares=self.n_spare_instances if use_mp == self.use_mp else 0,
+            max_simulations=self.n_restart if self.n_restart > 0 else None,
+            max_rss_growth=self.max_rss_growth,
+            logger=self.logger
+        )
+        if use_mp:
+            self._dymola_pools[self.worker_idx] = pool
+            pool.start()
+            return True
+        self._dymola_pool = pool
+        return pool.start()
+
+    def _start_dymola_instance(self, use_mp):
+        """Start dymola, load all packages and change the current working directory"""
         dymola = self._open_dymola_interface()
         self._check_dymola_instances()
         if use_mp:
@@ -740,9 +1104,6 @@ class DymolaAPI(SimulationAPI):
         if not dymola.RequestOption("Standard"):
             warnings.warn("You have no licence to use Dymola. "
                           "Hence you can only simulate models with 8 or less equations.")
-        if use_mp:
-            self._dymola_instances[self.worker_idx] = dymola
-            return True
         return dymola
 
     def _open_dymola_interface(self):
@@ -971,14 +1332,3 @@ class DymolaAPI(SimulationAPI):
                 new_parameters.pop(var_name)
         altered_model_name = f"{model_name}({','.join(all_modifiers)})"
         return altered_model_name, new_parameters
-
-    def _check_restart(self):
-        """Restart Dymola every n_restart iterations in order to free memory"""
-
-        if self.sim_counter == self.n_restart:
-            self.logger.info("Closing and restarting Dymola to free memory")
-            self.close()
-            self.dymola = self._setup_dymola_interface(use_mp=False)
-            self.sim_counter = 1
-        else:
-            self.sim_counter += 1
@@ -0,0 +1,203 @@
+"""
+Module with a pool of Dymola instances for one process. Dymola slowly
+accumulates memory over many simulations and restarting it stalls the
+simulations while the packages are loaded again. The pool keeps spare
+instances warmed in the background, i.e. with all packages loaded.
+Once the active instance exceeds its number of simulations or its
+growth of memory, a spare takes over and the old instance is closed
+in the background. As the spare is started before the old instance
+is closed, the process holds a licence at all times.
+"""
+
+import queue
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+
+def get_dymola_rss(dymola) -> Optional[int]:
+    """
+    Return the resident set size of the process of the given Dymola instance.
+
+    :param DymolaInterface dymola:
+        Instance of the DymolaInterface
+    :return: int
+        Resident set size in bytes, None if psutil is not
+        installed or the process of the instance is unknown.
+    """
+    # pylint: disable=import-outside-toplevel
+    try:
+        import psutil
+    except ImportError:
+        return None
+    process = getattr(dymola, "_dymola_process", None)
+    pid = getattr(process, "pid", None)
+    if pid is None:
+        return None
+    try:
+        return psutil.Process(pid).memory_info().rss
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+
+
+class DymolaInstancePool:
+    """
+    Active Dymola instance of one process and its spare instances.
+
+    :param callable setup_instance:
+        Function without arguments returning a new instance,
+        ready to simulate, e.g. with all packages loaded.
+    :param callable close_instance:
+        Function closing the given instance
+    :param int n_spares:
+        Number of spare instances warmed in the background. Default is 0.
+    :param int max_simulations:
+        Maximal number of simulations of an instance before it is replaced.
+        Default is None, not replacing instances after a number of simulations.
+    :param float max_rss_growth:
+        Maximal growth of the resident set size of the process of an
+        instance in MB, compared to the size before its first simulation.
+        Default is None, not replacing instances due to their memory.
+    :param callable get_rss:
+        Function returning the resident set size of an instance in bytes,
+        or None if unknown. Default is get_dymola_rss.
+    :param logging.Logger logger:
+        Logger to inform about replaced instances
+    """
+
+    def __init__(self,
+                 setup_instance: Callable[[], Any],
+                 close_instance: Callable[[Any], None],
+                 n_spares: int = 0,
+                 max_simulations: int = None,
+                 max_rss_growth: float = None,
+                 get_rss: Callable[[Any], Optional[int]] = get_dymola_rss,
+                 logger: logging.Logger = None):
+        if n_spares < 0:
+            raise ValueError("n_spares has to be at least 0")
+        self.setup_instance = setup_instance
+        self.close_instance = close_instance
+        self.n_spares = n_spares
+        self.max_simulations = max_simulations
+        self.max_rss_growth = max_rss_growth
+        self.get_rss = get_rss
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.active = None
+        self.n_replaced = 0
+        self._n_simulations = 0
+        self._rss_start = None
+        # Spares ready to use, or the errors of failed setups
+        self._spares = queue.Queue()
+        self._n_warming = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self):
+        """
+        Return the instance for the next simulation. If the active instance
+        exceeds max_simulations or max_rss_growth, it is replaced by a spare
+        first. Without a spare ready, a new instance is set up.
+        """
+        if self._closed:
+            raise RuntimeError("The pool of Dymola instances is already closed")
+        if self.active is not None:
+            reason = self._get_replace_reason()
+            if reason is not None:
+                self.logger.info("Replacing Dymola instance, as %s", reason)
+                old_instance, self.active = self.active, None
+                self._activate()
+                self.n_replaced += 1
+                threading.Thread(target=self._close, args=(old_instance,), daemon=True).start()
+        self.start()
+        self._n_simulations += 1
+        return self.active
+
+    def start(self):
+        """Return the active instance, setting it up and warming the spares if necessary"""
+        if self.active is None:
+            self._activate()
+        return self.active
+
+    def reset_spares(self):
+        """Close all idle spares and warm new ones, e.g. after changing the setup"""
+        for spare in self._drain_spares():
+            self._close(spare)
+        self._warm_spares()
+
+    def close(self):
+        """Close the active and all spare instances"""
+        with self._lock:
+            self._closed = True
+        instances = self._drain_spares()
+        if self.active is not None:
+            instances.insert(0, self.active)
+            self.active = None
+        for instance in instances:
+            self._close(instance)
+
+    def _get_replace_reason(self) -> Optional[str]:
+        """Return why the active instance has to be replaced, None if it doesn't"""
+        if self.max_simulations is not None and self._n_simulations >= self.max_simulations:
+            return f"it ran {self._n_simulations} simulations"
+        if self.max_rss_growth is not None and self._rss_start is not None:
+            rss = self.get_rss(self.active)
+            if rss is not None and (rss - self._rss_start) / 1e6 > self.max_rss_growth:
+                return f"its memory grew by {(rss - self._rss_start) / 1e6:.0f} MB"
+        return None
+
+    def _activate(self):
+        """Make a spare or a new instance the active one"""
+        instance = None
+        with self._lock:
+            wait_for_spare = not self._spares.empty() or self._n_warming > 0
+        if wait_for_spare:
+            instance = self._spares.get()
+            if isinstance(instance, Exception):
+                self.logger.error("Could not warm spare Dymola instance: %s", instance)
+                instance = None
+        if instance is None:
+            instance = self.setup_instance()
+        self.active = instance
+        self._n_simulations = 0
+        self._rss_start = self.get_rss(instance) if self.max_rss_growth is not None else None
+        self._warm_spares()
+
+    def _warm_spares(self):
+        """Start warming spares in the background until n_spares are available"""
+        with self._lock:
+            n_missing = self.n_spares - self._spares.qsize() - self._n_warming
+            self._n_warming += max(n_missing, 0)
+        for _ in range(n_missing):
+            threading.Thread(target=self._warm, daemon=True).start()
+
+    def _warm(self):
+        """Set up a spare, run in a background thread"""
+        try:
+            spare = self.setup_instance()
+        except Exception as err:  # pylint: disable=broad-except
+            spare = err
+        with self._lock:
+            self._n_warming -= 1
+            if not self._closed:
+                self._spares.put(spare)
+                return
+        if not isinstance(spare, Exception):
+            self._close(spare)
+
+    def _drain_spares(self) -> list:
+        """Remove and return all spares ready to use"""
+        spares = []
+        while True:
+            try:
+                spare = self._spares.get_nowait()
+            except queue.Empty:
+                return spares
+            if not isinstance(spare, Exception):
+                spares.append(spare)
+
+    def _close(self, instance):
+        """Close the instance, logging instead of raising errors"""
+        try:
+            self.close_instance(instance)
+        except Exception as err:  # pylint: disable=broad-except
+            self.logger.error("Could not close Dymola instance: %s", err)
@@ -0,0 +1,385 @@
+"""Module containing the DymosimAPI used to simulate
+models translated by Dymola without a Dymola instance."""
+
+import os
+import sys
+import shutil
+import pathlib
+import subprocess
+from typing import Dict, List, Optional, Union
+import numpy as np
+from pydantic import Field
+from ebcpy import TimeSeriesData
+from ebcpy.modelica import manipulate_ds
+from ebcpy.modelica import simres
+from ebcpy.utils import move_file
+from ebcpy.simulationapi import SimulationSetup, SimulationAPI, \
+    SimulationSetupClass, Variable, telemetry
+from ebcpy.simulationapi.input_tables import InputTableWriter
+
+# Integration algorithms of dymosim, see the matrix experiment of a dsin.txt
+_ALGORITHMS = {"Lsodar": 4, "Dopri45": 5, "Dopri853": 6, "Dassl": 8,
+               "Euler": 11, "Rkfix2": 12, "Rkfix3": 13, "Rkfix4": 14}
+
+
+def read_dsin_variables(filename: str) -> Dict[str, Dict[str, Variable]]:
+    """
+    Read the variables of a translated model from its dsin.txt.
+
+    :param str,os.path.normpath filename:
+        Filepath to the dsin or dsfinal file
+    :return: dict
+        The variables of the model, grouped into the
+        keys 'parameters', 'inputs', 'outputs' and 'states'.
+    """
+    names, values = manipulate_ds.convert_ds_file_to_array(filename)
+    names = np.array(names, dtype=object)
+    # Bounds are ignored, if min >= max
+    has_bounds = values[:, 2] < values[:, 3]
+    minima = np.where(has_bounds, values[:, 2], -np.inf)
+    maxima = np.where(has_bounds, values[:, 3], np.inf)
+    category = values[:, 4]
+    masks = {"parameters": category == 1,
+             "inputs": category == 5,
+             "outputs": category == 4}
+    masks["states"] = ~(masks["parameters"] | masks["inputs"] | masks["outputs"])
+    # The values are already valid, skip the validation of each Variable
+    return {key: {name: Variable.construct(value=value, min=_min, max=_max)
+                  for name, value, _min, _max in zip(names[mask],
+                                                     values[mask, 1].tolist(),
+                                                     minima[mask].tolist(),
+                                                     maxima[mask].tolist())}
+            for key, mask in masks.items()}
+
+
+def get_ds_settings(sim_setup: SimulationSetup, equidistant_output: bool = True) -> dict:
+    """
+    Return the values of the given simulation setup in
+    the experiment and method matrices of a dsin.txt.
+
+    :param SimulationSetup sim_setup:
+        Simulation setup, e.g. of a DymosimAPI or a DymolaAPI
+    :param bool equidistant_output:
+        If True (the default), variables are not stored at events.
+    :return: dict
+        Settings to pass to DsinTemplate.write
+    """
+    if sim_setup.solver not in _ALGORITHMS:
+        raise ValueError(f"Given solver '{sim_setup.solver}' is not supported by dymosim. "
+                         f"Supported are {', '.join(_ALGORITHMS.keys())}.")
+    settings = {
+        "StartTime": sim_setup.start_time,
+        "StopTime": sim_setup.stop_time,
+        "Increment": sim_setup.output_interval,
+        "nInterval": 0,
+        "Tolerance": sim_setup.tolerance,
+        "MaxFixedStep": sim_setup.fixedstepsize,
+        "Algorithm": _ALGORITHMS[sim_setup.solver]
+    }
+    if equidistant_output:
+        settings["evgrid"] = 0
+    return settings
+
+
+def run_dymosim(executable: str, cd: str, dsin_path: str, result_path: str,
+                timeout: float = None) -> Optional[str]:
+    """
+    Run the given dymosim executable in a subprocess.
+
+    :param str,os.path.normpath executable:
+        Path to the dymosim executable
+    :param str,os.path.normpath cd:
+        Working directory of dymosim, e.g. to write the dslog.txt into
+    :param str,os.path.normpath dsin_path:
+        Path to the dsin.txt to simulate
+    :param str,os.path.normpath result_path:
+        Path of the .mat file to store the results in
+    :param float timeout:
+        Timeout in seconds after which dymosim is killed. Default is None.
+    :return: str
+        None if the simulation succeeded, else the reason
+        of the failure including the content of the dslog.txt.
+    """
+    # Delete old results, so that a failed run is never masked by them
+    dslog_path = os.path.join(cd, "dslog.txt")
+    for filepath in [result_path, dslog_path]:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+    try:
+        process = subprocess.run(
+            [executable, dsin_path, result_path],
+            cwd=cd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            timeout=timeout,
+            check=False
+        )
+        if process.returncode == 0 and os.path.isfile(result_path):
+            return None
+        error = f"dymosim exited with code {process.returncode}: " \
+                f"{process.stdout.decode(errors='replace')[-10000:]}"
+    except subprocess.TimeoutExpired:
+        error = f"dymosim exceeded the timeout of {timeout} s"
+    try:
+        with open(dslog_path, "r") as dslog_file:
+            dslog_content = dslog_file.read()
+    except OSError:
+        dslog_content = "Not retreivable."
+    return f"Simulation failed: {error}\nReason according " \
+           f"to dslog, located at '{dslog_path}': {dslog_content}"
+
+
+class DymosimSimulationSetup(SimulationSetup):
+    """
+    Adds ``tolerance`` and ``timeout`` to the list of possible
+    setup fields. Only the solvers of dymosim with a fixed
+    number in the dsin.txt are supported.
+    """
+    tolerance: float = Field(
+        title="tolerance",
+        default=0.0001,
+        description="Tolerance of integration"
+    )
+    timeout: float = Field(
+        title="timeout",
+        default=np.inf,
+        description="Timeout after which the dymosim process is killed."
+    )
+
+    _default_solver = "Dassl"
+    _allowed_solvers = list(_ALGORITHMS.keys())
+
+
+class DymosimAPI(SimulationAPI):
+    """
+    API to simulate a model translated by Dymola, running the generated
+    dymosim executable directly. Contrary to the DymolaAPI, no Dymola
+    instance is required per worker: Each simulation is a subprocess of
+    dymosim with its own dsin.txt containing the values of the parameters
+    and the simulation setup. Results are read from the .mat file written
+    by dymosim. As no translation is possible, only parameters which are
+    part of the dsin.txt can be changed, i.e. no structural parameters.
+
+    Use ``from_dymola_api`` to translate the model of a DymolaAPI once
+    and simulate it afterwards using dymosim.
+
+    :param str,os.path.normpath cd:
+        Dirpath for the current working directory. The dsin.txt and
+        results of each worker are created in the folder 'worker_<idx>'.
+    :param str,os.path.normpath model_name:
+        Path to the dymosim executable of the translated model.
+    :keyword str,os.path.normpath dsin_path:
+        Path to the dsin.txt of the translated model. Default is
+        the dsin.txt in the directory of the executable.
+    :keyword Boolean equidistant_output:
+        If True (Default), dymosim does not store variables at events.
+
+    Example:
+
+    >>> from ebcpy import DymolaAPI
+    >>> from ebcpy.simulationapi.dymosim import DymosimAPI
+    >>> dym_api = DymolaAPI(cd=cd, model_name=model_name, packages=[])
+    >>> dymosim_api = DymosimAPI.from_dymola_api(dym_api, n_cpu=8)
+    >>> dym_api.close()
+    >>> results = dymosim_api.simulate(parameters=[{"a": a} for a in range(100)])
+    """
+    _sim_setup_class: SimulationSetupClass = DymosimSimulationSetup
+    _supported_executors = ["process", "thread"]
+    # The writer is static to keep the hashes of the written tables in each worker
+    _worker_static_items = SimulationAPI._worker_static_items + [
+        '_dsin_template',
+        '_input_table_writer'
+    ]
+    _worker_model_items = SimulationAPI._worker_model_items + ['_dsin_template']
+
+    def __init__(self, cd, model_name, **kwargs):
+        """Instantiate class objects."""
+        if isinstance(model_name, pathlib.Path):
+            model_name = str(model_name)
+        if not os.path.isfile(model_name):
+            raise FileNotFoundError(f"Given dymosim executable '{model_name}' does not exist.")
+        dsin_path = kwargs.pop("dsin_path", None)
+        if dsin_path is None:
+            dsin_path = os.path.join(os.path.dirname(model_name), "dsin.txt")
+        if not os.path.isfile(dsin_path):
+            raise FileNotFoundError(f"Given dsin_path '{dsin_path}' does not exist.")
+        self.dsin_path = str(dsin_path)
+        self.equidistant_output = kwargs.pop("equidistant_output", True)
+        self._dsin_template: manipulate_ds.DsinTemplate = None
+        self._input_table_writer = InputTableWriter()
+        super().__init__(cd=cd, model_name=model_name, **kwargs)
+
+    @classmethod
+    def from_dymola_api(cls, dymola_api, cd=None, **kwargs):
+        """
+        Translate the current model of the given DymolaAPI and create
+        a DymosimAPI for the translated model. The dymosim executable and
+        the dsin.txt are copied, so that the DymolaAPI may translate other
+        models or be closed afterwards. The sim_setup and result_names
+        are taken from the DymolaAPI.
+
+        :param DymolaAPI dymola_api:
+            Api with the model to translate
+        :param str,os.path.normpath cd:
+            Working directory of the new api. Default is
+            the folder 'dymosim' in the cd of the DymolaAPI.
+        :keyword:
+            All further keyword arguments are passed to DymosimAPI.
+        :return: DymosimAPI
+        """
+        if cd is None:
+            cd = os.path.join(dymola_api.cd, "dymosim")
+        os.makedirs(cd, exist_ok=True)
+        dymola_api.translate()
+        executable = "dymosim.exe" if sys.platform.startswith("win") else "dymosim"
+        for filename in [executable, "dsin.txt"]:
+            shutil.copy2(os.path.join(dymola_api.cd, filename), os.path.join(cd, filename))
+        api = cls(cd=cd, model_name=os.path.join(cd, executable), **kwargs)
+        api.set_sim_setup({key: value for key, value in dymola_api.sim_setup.dict().items()
+                           if key in api.sim_setup.dict()})
+        api.result_names = dymola_api.result_names
+        return api
+
+    def _update_model(self):
+        # Parse the dsin.txt once, each simulation only patches its values
+        self._dsin_template = manipulate_ds.DsinTemplate(self.dsin_path)
+        variables = read_dsin_variables(self.dsin_path)
+        self.parameters = variables["parameters"]
+        self.inputs = variables["inputs"]
+        self.outputs = variables["outputs"]
+        self.states = variables["states"]
+
+    def simulate(self,
+                 parameters: Union[dict, List[dict]] = None,
+                 return_option: str = "time_series",
+                 **kwargs):
+        """
+        Simulate the given parameters.
+
+        Additional settings:
+
+        :param str return_option:
+            Additionally to the options of ``SimulationAPI.simulate``,
+            'array' returns a numpy array with the time in the first and
+            the result_names in the further columns. The worker loads only
+            these columns from its result file, see ``simres.mat_to_array``.
+        :keyword str table_name:
+            If inputs are given, you have to specify the name of the table
+            in the instance of CombiTimeTable. In order for the inputs to
+            work the value should be equal to the value of 'tableName' in Modelica.
+        :keyword str file_name:
+            If inputs are given, you have to specify the file_name of the table
+            in the instance of CombiTimeTable. In order for the inputs to
+            work the value should be equal to the value of 'fileName' in Modelica.
+            Files ending with .mat are written as binary MATLAB v4 file, others
+            as text file. Relative file names are resolved in the working
+            directory of dymosim, which is a separate directory for each worker.
+            The file is only written, if the inputs changed since the last
+            simulation of the worker.
+        """
+        if kwargs.get("result_store", None) is not None:
+            raise TypeError("The DymosimAPI does not support a result_store, "
+                            "dymosim writes the result files itself.")
+        return super().simulate(parameters=parameters, return_option=return_option, **kwargs)
+
+    def _get_worker_dir(self) -> str:
+        """Directory of the dsin.txt and results of the current worker"""
+        worker_dir = os.path.join(self.cd, f"worker_{self.worker_idx or 0}")
+        os.makedirs(worker_dir, exist_ok=True)
+        return worker_dir
+
+    def _single_simulation(self, kwargs):
+        # Unpack kwargs
+        result_file_name = kwargs.get("result_file_name", 'resultFile')
+        parameters = kwargs.get("parameters")
+        return_option = kwargs.get("return_option")
+        inputs = kwargs.get("inputs", None)
+        fail_on_error = kwargs.get("fail_on_error", True)
+        if parameters is None:
+            parameters = {}
+
+        worker_dir = self._get_worker_dir()
+        # Handle inputs
+        if inputs is not None:
+            # Unpack additional kwargs
+            try:
+                table_name = kwargs["table_name"]
+                file_name = kwargs["file_name"]
+            except KeyError as err:
+                raise KeyError("For inputs to be used by DymosimAPI.simulate, you "
+                               "have to specify the 'table_name' and the 'file_name' "
+                               "as keyword arguments of the function. These must match"
+                               "the values 'tableName' and 'fileName' in the CombiTimeTable"
+                               " model in your modelica code.") from err
+            # Generate the input in the correct format
+            offset = self.sim_setup.start_time - inputs.index[0]
+            with telemetry.phase("input_conversion"):
+                filepath = self._input_table_writer.write(
+                    inputs=inputs,
+                    table_name=table_name,
+                    file_name=file_name,
+                    cd=worker_dir,
+                    offset=offset
+                )
+            self.logger.info("Successfully created Dymola input file at %s", filepath)
+
+        dsin_path = os.path.join(worker_dir, "dsin.txt")
+        with telemetry.phase("set_parameters"):
+            try:
+                self._dsin_template.write(savepath=dsin_path,
+                                          initial_values=parameters,
+                                          settings=get_ds_settings(
+                                              sim_setup=self.sim_setup,
+                                              equidistant_output=self.equidistant_output))
+            except KeyError as err:
+                raise KeyError(f"dymosim can only change variables of the dsin.txt. "
+                               f"Use the DymolaAPI to change structural parameters. "
+                               f"{err}") from err
+        if return_option == "savepath":
+            result_path = os.path.join(worker_dir, f"{result_file_name}.mat")
+        else:
+            result_path = os.path.join(worker_dir, "dsres.mat")
+        with telemetry.phase("solve"):
+            error = run_dymosim(
+                executable=self.model_name,
+                cd=worker_dir,
+                dsin_path=dsin_path,
+                result_path=result_path,
+                timeout=self.sim_setup.timeout if np.isfinite(self.sim_setup.timeout) else None
+            )
+        if error is not None:
+            if fail_on_error:
+                raise Exception(error)
+            # Don't raise and return None
+            self.logger.error(error)
+            return None
+
+        if return_option == "savepath":
+            savepath = kwargs.get("savepath", None)
+            if savepath is None:
+                return result_path
+            os.makedirs(savepath, exist_ok=True)
+            for filename in [os.path.basename(result_path), "dslog.txt", "dsfinal.txt"]:
+                if os.path.isfile(os.path.join(worker_dir, filename)):
+                    move_file(os.path.join(worker_dir, filename),
+                              os.path.join(savepath, filename))
+            return os.path.join(savepath, os.path.basename(result_path))
+
+        if return_option == "array":
+            with telemetry.phase("result_conversion"):
+                return simres.mat_to_array(fname=result_path,
+                                           names=["Time"] + list(self.result_names))[1]
+        with telemetry.phase("result_conversion"):
+            df = simres.mat_to_pandas(fname=result_path,
+                                      names=list(self.result_names),
+                                      with_unit=False)
+            df.index = df.index.astype("float64")
+        if return_option == "last_point":
+            return df.iloc[-1].to_dict()
+        return TimeSeriesData(df, default_tag="sim")
+
+    def _close_multiprocessing(self, _):
+        """Nothing to close, each simulation is a separate process"""
+
+    def _single_close(self, **kwargs):
+        """Nothing to close, each simulation is a separate process"""
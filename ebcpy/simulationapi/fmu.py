@@ -2,20 +2,41 @@
 simulate models."""
 
 import os
+import glob
 import logging
 import pathlib
 import atexit
 import shutil
+import pickle
+import time
+from collections import namedtuple
+from ctypes import c_double, c_int, byref
 from typing import List, Union
 import fmpy
+from fmpy import calloc, free
+from fmpy.fmi2 import fmi2ValueReference, fmi2True, fmi2False, FMU2Slave, \
+    fmi2CallbackFunctions, fmi2CallbackLoggerTYPE, \
+    fmi2CallbackAllocateMemoryTYPE, fmi2CallbackFreeMemoryTYPE
 from fmpy.model_description import read_model_description
 from pydantic import Field
 import pandas as pd
 import numpy as np
 from ebcpy import simulationapi, TimeSeriesData
-from ebcpy.simulationapi import SimulationSetup, SimulationSetupClass, Variable
+from ebcpy.simulationapi import SimulationSetup, SimulationSetupClass, Variable, telemetry
+from ebcpy.utils import get_file_hash
 # pylint: disable=broad-except
 
+# Serialized state of an fmu together with the simulation time of the state
+FMUState = namedtuple("FMUState", "time state")
+# Serialized state at the end of a warm-up period and the results of the warm-up
+FMUSnapshot = namedtuple("FMUSnapshot", "time state result")
+# Statistics of each output for return_option 'statistics'
+STATISTICS = ["integral", "min", "max", "mean"]
+# np.trapz is removed in NumPy 2.0, np.trapezoid added
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+# Increase if the cached model descriptions change, invalidating existing caches
+_MODEL_DESCRIPTION_CACHE_VERSION = 2
+
 
 class FMU_Setup(SimulationSetup):
     """
@@ -33,6 +54,332 @@ class FMU_Setup(SimulationSetup):
     _allowed_solvers = ["CVode", "Euler"]
 
 
+class _VariableReferences:
+    """
+    Value references of a fixed list of variables, grouped by their
+    type. Values are exchanged with the fmu by one direct fmi2 call per
+    type using preallocated ctypes arrays, instead of resolving the
+    names and building new arrays on every call.
+
+    :param list names:
+        Names of the variables
+    :param dict value_references:
+        Dictionary with the variable names as keys and a tuple of the
+        value reference and the fmi type of the variable as values.
+    """
+
+    _functions = {"Real": ("fmi2GetReal", "fmi2SetReal", c_double),
+                  "Integer": ("fmi2GetInteger", "fmi2SetInteger", c_int),
+                  "Enumeration": ("fmi2GetInteger", "fmi2SetInteger", c_int),
+                  "Boolean": ("fmi2GetBoolean", "fmi2SetBoolean", c_int)}
+
+    def __init__(self, names: List[str], value_references: dict):
+        self.names = list(names)
+        _groups = {}
+        for idx, name in enumerate(self.names):
+            value_reference, fmi_type = value_references[name]
+            if fmi_type not in self._functions:
+                raise TypeError(f"Variable '{name}' is of type {fmi_type}, which "
+                                f"is not supported for direct access.")
+            _groups.setdefault(self._functions[fmi_type], []).append((idx, value_reference))
+        self._groups = []
+        for (getter, setter, c_type), group in _groups.items():
+            values = (c_type * len(group))()
+            self._groups.append((
+                getter,
+                setter,
+                np.array([idx for idx, _ in group]),
+                (fmi2ValueReference * len(group))(*[ref for _, ref in group]),
+                values,
+                np.ctypeslib.as_array(values)
+            ))
+
+    def get(self, fmu_instance, out: np.ndarray):
+        """Write the current values of the variables into the given array"""
+        for getter, _, idx, refs, values, view in self._groups:
+            getattr(fmu_instance, getter)(fmu_instance.component, refs, len(idx), values)
+            out[idx] = view
+
+    def set(self, fmu_instance, values: np.ndarray):
+        """Set the given values, ordered as the names, in the fmu"""
+        for _, setter, idx, refs, c_values, view in self._groups:
+            view[:] = values[idx]
+            getattr(fmu_instance, setter)(fmu_instance.component, refs, len(idx), c_values)
+
+
+class _AbortMonitor:
+    """
+    Evaluates an abort criterion every check_interval steps on the
+    outputs recorded so far. The criterion receives a DataFrame indexed
+    by time with one column per output. A truthy return value aborts the
+    simulation, a returned string is used as the reason of the abort.
+
+    :param callable criterion:
+        The abort criterion
+    :param list output_names:
+        Names of the recorded outputs
+    :param int check_interval:
+        Number of steps between two evaluations of the criterion
+    """
+
+    def __init__(self, criterion, output_names: List[str], check_interval: int = 10):
+        if check_interval < 1:
+            raise ValueError("abort_check_interval has to be at least 1")
+        self.criterion = criterion
+        self.output_names = output_names
+        self.check_interval = check_interval
+        self.reason: str = None
+        self.time: float = None
+        self._n_steps = 0
+        # Outputs recorded by fmpy, copied incrementally
+        self._n_rows = 0
+        self._columns = None
+        self._buffer = np.empty((0, len(output_names) + 1))
+
+    def check(self, time_grid: np.ndarray, values: np.ndarray) -> bool:
+        """Evaluate the criterion, return False if the simulation should abort"""
+        reason = self.criterion(pd.DataFrame(values, index=pd.Index(time_grid, name="time"),
+                                             columns=self.output_names, copy=False))
+        if reason is None or reason is False:
+            return True
+        self.reason = reason if isinstance(reason, str) else "Abort criterion met"
+        self.time = float(time_grid[-1])
+        telemetry.count("aborted")
+        return False
+
+    def step_finished(self, _, recorder) -> bool:
+        """Callback of fmpy, copies the new rows of the recorder before each check"""
+        self._n_steps += 1
+        if self._n_steps % self.check_interval or not recorder.rows:
+            return True
+        if self._columns is None:
+            names = [col[0] for col in recorder.cols]
+            self._columns = [names.index(name) for name in ["time"] + self.output_names]
+        rows = np.array(recorder.rows[self._n_rows:], dtype=float)[:, self._columns]
+        n_rows = self._n_rows + len(rows)
+        if n_rows > len(self._buffer):
+            buffer = np.empty((max(2 * len(self._buffer), n_rows), self._buffer.shape[1]))
+            buffer[:self._n_rows] = self._buffer[:self._n_rows]
+            self._buffer = buffer
+        self._buffer[self._n_rows:n_rows] = rows
+        self._n_rows = n_rows
+        return self.check(self._buffer[:n_rows, 0], self._buffer[:n_rows, 1:])
+
+
+class _FMUStepper:
+    """
+    Simulates a co-simulation fmu instance by calling the fmi2
+    functions directly. Value references are resolved once per
+    set of variable names and the outputs are written into a
+    preallocated buffer which is reused across simulations.
+
+    :param fmu_instance:
+        The instantiated fmpy FMU2Slave
+    :param dict value_references:
+        Value references and types of all model variables.
+    :param float tolerance:
+        Relative tolerance passed to the fmu, as done by fmpy
+        using the default experiment of the model description.
+    :param logging.Logger logger:
+        Logger for errors while terminating the fmu. Defaults to the module logger.
+    """
+
+    def __init__(self, fmu_instance, value_references: dict, tolerance: float = None,
+                 logger: logging.Logger = None):
+        self.fmu_instance = fmu_instance
+        self.tolerance = tolerance
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self._value_references = value_references
+        self._references = {}
+        self._buffer = np.empty((0, 0))
+        self.final_state: bytes = None
+
+    def references(self, names: List[str]) -> _VariableReferences:
+        """Get the cached references of the given variable names"""
+        key = tuple(names)
+        if key not in self._references:
+            self._references[key] = _VariableReferences(key, self._value_references)
+        return self._references[key]
+
+    def set_values(self, values: dict):
+        """Set the given dict with names and values in the fmu"""
+        if values:
+            self.references(values.keys()).set(self.fmu_instance,
+                                               np.array(list(values.values()), dtype=float))
+
+    def initialize(self, start_time: float, stop_time: float = None,
+                   parameters: dict = None, inputs: dict = None):
+        """
+        Setup the experiment, set parameters and inputs
+        and initialize the fmu.
+        """
+        self.fmu_instance.setupExperiment(tolerance=self.tolerance,
+                                          startTime=start_time,
+                                          stopTime=stop_time)
+        self.set_values(inputs)
+        self.set_values(parameters)
+        self.fmu_instance.enterInitializationMode()
+        self.fmu_instance.exitInitializationMode()
+
+    def simulate(self, start_time: float, stop_time: float, output_interval: float,
+                 output_names: List[str], parameters: dict = None,
+                 inputs: np.ndarray = None, timeout: float = np.inf,
+                 state: bytes = None, store_state: bool = False,
+                 record: str = "all", abort_monitor: _AbortMonitor = None):
+        """
+        Simulate from start_time to stop_time with a communication
+        step size equal to the output_interval.
+
+        :param np.ndarray inputs:
+            Structured array with a field 'time' and one field per input.
+            Values are interpolated linearly on the output grid.
+        :param bytes state:
+            If given, the serialized state is restored instead of
+            initializing the fmu. The parameters are set afterwards.
+        :param bool store_state:
+            If True, the serialized state at the stop_time is stored
+            in the attribute ``final_state``.
+        :param str record:
+            Which values to record. Options are:
+            - 'all': The outputs at every point of the output grid.
+            - 'last_point': Only the outputs at the stop_time.
+            - 'statistics': Only the integral, min, max and mean of each
+            output on the output grid, accumulated while stepping.
+            The integral uses the trapezoidal rule.
+        :param _AbortMonitor abort_monitor:
+            If given, the abort criterion of the monitor is checked on the
+            recorded outputs and the simulation stops early if it is met.
+            Requires record='all'. The returned time grid and buffer
+            end at the time of the abort.
+        :return: tuple
+            The time grid and a view on the output buffer. The buffer
+            is overwritten by the next simulation. For 'last_point', the
+            time grid and the buffer only contain the last point. For
+            'statistics', the time grid contains the start and the stop time
+            and the buffer contains one row per entry of STATISTICS.
+        """
+        if record not in ("all", "last_point", "statistics"):
+            raise ValueError(f"Given record option '{record}' is not supported.")
+        if abort_monitor is not None and record != "all":
+            raise ValueError("Checking an abort criterion requires record='all'.")
+        n_steps = int(np.ceil((stop_time - start_time) / output_interval - 1e-10))
+        time_grid = start_time + np.arange(n_steps + 1) * output_interval
+        time_grid[-1] = stop_time
+        n_rows = {"all": n_steps + 1, "last_point": 1}.get(record, len(STATISTICS))
+        if self._buffer.shape != (n_rows, len(output_names)):
+            self._buffer = np.empty((n_rows, len(output_names)))
+        outputs = self.references(output_names)
+        if inputs is not None:
+            input_names = [name for name in inputs.dtype.names if name != "time"]
+            input_refs = self.references(input_names)
+            input_values = np.column_stack([
+                np.interp(time_grid, inputs["time"], inputs[name]) for name in input_names
+            ])
+            initial_inputs = dict(zip(input_names, input_values[0]))
+        else:
+            initial_inputs = None
+        deadline = time.perf_counter() + timeout
+        fmu_instance = self.fmu_instance
+        do_step = fmu_instance.fmi2DoStep
+        component = fmu_instance.component
+
+        # Always leave the step mode, also on timeouts and failed steps,
+        # as the next simulation can't initialize the fmu otherwise.
+        initialized = False
+        try:
+            with telemetry.phase("set_parameters"):
+                if state is None:
+                    # A stored state must not contain the stop_time
+                    # as the simulation continues beyond it.
+                    self.initialize(start_time=start_time,
+                                    stop_time=None if store_state else stop_time,
+                                    parameters=parameters, inputs=initial_inputs)
+                else:
+                    self.set_state(state)
+                    self.set_values(initial_inputs)
+                    self.set_values(parameters)
+                initialized = True
+            n_steps_done = n_steps
+            with telemetry.phase("solve"):
+                if record == "all":
+                    outputs.get(fmu_instance, self._buffer[0])
+                elif record == "statistics":
+                    # Running accumulators, see STATISTICS for the order
+                    integral, minimum, maximum, previous = self._buffer
+                    current = np.empty(len(output_names))
+                    outputs.get(fmu_instance, previous)
+                    integral[:] = 0
+                    minimum[:] = previous
+                    maximum[:] = previous
+                for idx in range(n_steps):
+                    if inputs is not None:
+                        input_refs.set(fmu_instance, input_values[idx])
+                    step_size = time_grid[idx + 1] - time_grid[idx]
+                    do_step(component, time_grid[idx], step_size, fmi2True)
+                    if record == "all":
+                        outputs.get(fmu_instance, self._buffer[idx + 1])
+                    elif record == "statistics":
+                        outputs.get(fmu_instance, current)
+                        integral += 0.5 * step_size * (previous + current)
+                        np.minimum(minimum, current, out=minimum)
+                        np.maximum(maximum, current, out=maximum)
+                        previous[:] = current
+                    if time.perf_counter() > deadline:
+                        raise TimeoutError(f"Simulation exceeded the timeout of {timeout} s")
+                    if (abort_monitor is not None and
+                            (idx + 1) % abort_monitor.check_interval == 0 and
+                            not abort_monitor.check(time_grid[:idx + 2], self._buffer[:idx + 2])):
+                        n_steps_done = idx + 1
+                        break
+                if record == "last_point":
+                    outputs.get(fmu_instance, self._buffer[0])
+                if store_state:
+                    self.final_state = self.get_state()
+        finally:
+            self.terminate(initialized=initialized)
+        telemetry.count("n_steps", n_steps_done)
+        if record == "last_point":
+            return time_grid[-1:], self._buffer[:1]
+        if record == "statistics":
+            # The last row holds the mean instead of the previous values
+            if stop_time > start_time:
+                np.divide(integral, stop_time - start_time, out=self._buffer[3])
+            return time_grid[[0, -1]], self._buffer
+        return time_grid[:n_steps_done + 1], self._buffer[:n_steps_done + 1]
+
+    def terminate(self, initialized: bool = True):
+        """
+        Terminate and reset the fmu so that it can be initialized again.
+        An error while terminating, e.g. after a failed step, is only
+        logged as resetting the fmu is allowed in any state.
+
+        :param bool initialized:
+            If False, the fmu was not initialized and is only reset.
+        """
+        if initialized:
+            try:
+                self.fmu_instance.terminate()
+            except Exception as error:  # This is due to fmpy which does not yield a narrow error
+                self.logger.warning("Could not terminate fmu instance: %s", error)
+        self.fmu_instance.reset()
+
+    def get_state(self) -> bytes:
+        """Get the serialized current state of the fmu"""
+        state = self.fmu_instance.getFMUstate()
+        try:
+            return self.fmu_instance.serializeFMUstate(state)
+        finally:
+            self.fmu_instance.freeFMUstate(state)
+
+    def set_state(self, serialized_state: bytes):
+        """Restore the given serialized state of the fmu"""
+        state = self.fmu_instance.deSerializeFMUstate(serialized_state)
+        try:
+            self.fmu_instance.setFMUstate(state)
+        finally:
+            self.fmu_instance.freeFMUstate(state)
+
+
 class FMU_API(simulationapi.SimulationAPI):
     """
     Class for simulation using the fmpy library and
@@ -40,6 +387,31 @@ class FMU_API(simulationapi.SimulationAPI):
 
     :keyword bool log_fmu:
         Whether to print fmu messages or not.
+    :keyword bool validate_fmu:
+        If True (the default), the model description is validated
+        when it is parsed for the first time. Descriptions loaded
+        from the cache have already been validated and are not
+        validated again.
+    :keyword str,os.path.normpath cache_dir:
+        Directory to store the parsed model description and the
+        variables of the fmu. The cache is keyed by the hash of the
+        fmu file. Default is the working directory ``cd``.
+        Pass False to only use the in-memory cache.
+    :keyword str engine:
+        Engine used to simulate the fmu. Options are:
+        - 'fmpy': Use ``fmpy.simulate_fmu`` (the default).
+        - 'direct': Step the fmu directly through the fmi2 functions,
+        using value references resolved once and a preallocated output
+        buffer. Reduces the overhead of short and frequently repeated
+        simulations. Only supported for FMI 2.0 co-simulation fmu's.
+
+    Apart from ``simulate``, FMI 2.0 co-simulation fmu's can be simulated
+    step by step, e.g. for model predictive control or hardware-in-the-loop
+    applications, using ``initialize`` and ``do_step``. States can be stored
+    and restored using ``get_state`` and ``set_state``.
+    To save the simulation of a warm-up period which is equal for many
+    simulations, use ``simulate_warm_up`` and pass the resulting snapshot
+    to ``simulate`` using the keyword ``warm_start``.
 
     Example:
 
@@ -62,8 +434,28 @@ class FMU_API(simulationapi.SimulationAPI):
     """
 
     _sim_setup_class: SimulationSetupClass = FMU_Setup
+    # Worker processes use these class-level dicts
+    # to keep their fmu instances between tasks.
     _fmu_instances: dict = {}
     _unzip_dirs: dict = {}
+    _steppers: dict = {}
+    _items_to_drop = [
+        'pool',
+        '_fmu_instances',
+        '_unzip_dirs',
+        '_steppers',
+        'telemetry'
+    ]
+    _worker_static_items = simulationapi.SimulationAPI._worker_static_items + [
+        '_model_description',
+        '_fmi_type',
+        '_value_references',
+        '_variabilities'
+    ]
+    # The workers hold instances of the fmu
+    _restart_workers_on_model_change = True
+    # In-memory cache of parsed model descriptions, keyed by the fmu hash
+    _model_description_cache: dict = {}
     _type_map = {
         float: np.double,
         bool: np.bool_,
@@ -75,8 +467,25 @@ class FMU_API(simulationapi.SimulationAPI):
         # Init instance attributes
         self._model_description = None
         self._fmi_type = None
+        self._value_references = {}
+        self._variabilities = {}
         self.log_fmu = kwargs.get("log_fmu", True)
+        self.validate_fmu = kwargs.get("validate_fmu", True)
+        self.cache_dir = kwargs.get("cache_dir", None)
+        self.engine = kwargs.get("engine", "fmpy")
+        if self.engine not in ["fmpy", "direct"]:
+            raise ValueError(f"Given engine '{self.engine}' is not supported. "
+                             f"Supported are 'fmpy' and 'direct'.")
         self._single_unzip_dir: str = None
+        self._fmu_instances = {}
+        self._unzip_dirs = {}
+        self._steppers = {}
+        # Attributes for stepwise simulation
+        self.current_time: float = None
+        self._stepping = False
+        self._step_inputs = None
+        self._step_outputs = None
+        self._step_values = None
 
         if isinstance(model_name, pathlib.Path):
             model_name = str(model_name)
@@ -89,6 +498,13 @@ class FMU_API(simulationapi.SimulationAPI):
         atexit.register(self.close)
 
     def _update_model(self):
+        # Free a possibly loaded instance first, as extracting
+        # the fmu again would overwrite its loaded binaries.
+        if 0 in self._fmu_instances:
+            self._stepping = False
+            self._single_close(fmu_instance=self._fmu_instances.pop(0),
+                               unzip_dir=self._unzip_dirs.pop(0))
+            self._steppers.pop(0, None)
         # Setup the fmu instance
         self.setup_fmu_instance()
 
@@ -101,22 +517,148 @@ class FMU_API(simulationapi.SimulationAPI):
         """
         # Close MP of super class
         super().close()
-        # Close if single process
-        if not self.use_mp:
-            if not self._fmu_instances:
-                return  # Already closed
-            self._single_close(fmu_instance=self._fmu_instances[0],
-                               unzip_dir=self._unzip_dirs[0])
-            self._unzip_dirs = {}
-            self._fmu_instances = {}
+        # Close the instance of the main process
+        self._stepping = False
+        if 0 in self._fmu_instances:
+            self._single_close(fmu_instance=self._fmu_instances.pop(0),
+                               unzip_dir=self._unzip_dirs.pop(0))
+        self._steppers = {}
+
+    def _close_pool(self):
+        super()._close_pool()
+        # Instances of a thread pool live in this process. Close
+        # the ones of threads which did not run _close_multiprocessing.
+        for wrk_idx in [idx for idx in self._fmu_instances if idx != 0]:
+            self._single_close(fmu_instance=self._fmu_instances.pop(wrk_idx),
+                               unzip_dir=self._unzip_dirs.pop(wrk_idx))
+            self._steppers.pop(wrk_idx, None)
+        # Workers killed by a supervised pool could not delete their unzipped fmu
+        if self._single_unzip_dir is not None:
+            for unzip_dir in glob.glob(glob.escape(str(self._single_unzip_dir)) + "_worker_*"):
+                shutil.rmtree(unzip_dir, ignore_errors=True)
+
+    def initialize(self, parameters: dict = None, inputs: dict = None):
+        """
+        Initialize the fmu at the start_time of the sim_setup
+        for a stepwise simulation using ``do_step``.
+        A running stepwise simulation is terminated.
+
+        :param dict parameters:
+            Parameters to set prior to the initialization.
+        :param dict inputs:
+            Values of the inputs at the start time.
+        :return: np.ndarray
+            Values of the variables in result_names after the initialization.
+        """
+        stepper = self._get_stepper(wrk_idx=0, check_stepping=False)
+        if self._stepping:
+            self._stop_stepping()
+        if parameters:
+            self.check_unsupported_variables(variables=list(parameters.keys()),
+                                             type_of_var="parameters")
+        stepper.initialize(start_time=self.sim_setup.start_time,
+                           parameters=parameters,
+                           inputs=inputs)
+        self._step_inputs = stepper.references(list(self.inputs.keys()))
+        self._step_outputs = stepper.references(self.result_names)
+        self._step_values = np.empty(len(self.result_names))
+        self.current_time = self.sim_setup.start_time
+        self._stepping = True
+        self._step_outputs.get(stepper.fmu_instance, self._step_values)
+        return self._step_values.copy()
+
+    def do_step(self, inputs: Union[dict, np.ndarray] = None, step_size: float = None):
+        """
+        Advance the initialized fmu by one communication step.
+
+        :param dict,np.ndarray inputs:
+            Values of the inputs for this step. Either a dict with
+            names and values or an array with values ordered as the
+            keys of ``self.inputs``. Inputs not given keep their last value.
+        :param float step_size:
+            Size of the step. Default is the output_interval of the sim_setup.
+        :return: np.ndarray
+            Values of the variables in result_names at the end of the step,
+            ordered as the result_names when calling ``initialize``.
+        """
+        if not self._stepping:
+            raise RuntimeError("Call initialize() prior to do_step().")
+        if step_size is None:
+            step_size = self.sim_setup.output_interval
+        stepper = self._steppers[0]
+        fmu_instance = stepper.fmu_instance
+        if isinstance(inputs, dict):
+            stepper.set_values(inputs)
+        elif inputs is not None:
+            self._step_inputs.set(fmu_instance, np.asarray(inputs, dtype=float))
+        # The state may be set to a prior point using set_state.
+        fmu_instance.fmi2DoStep(fmu_instance.component, self.current_time,
+                                step_size, fmi2False)
+        self.current_time += step_size
+        self._step_outputs.get(fmu_instance, self._step_values)
+        return self._step_values.copy()
+
+    def get_state(self) -> FMUState:
+        """
+        Get the current state of the stepwise simulation.
+        Requires an fmu which supports serializing its state.
+
+        :return: FMUState
+            Named tuple with the time and the serialized state.
+        """
+        stepper = self._get_stepper(wrk_idx=0)
+        return FMUState(time=self.current_time, state=stepper.get_state())
+
+    def set_state(self, state: FMUState):
+        """
+        Restore a state obtained by ``get_state`` to continue
+        the stepwise simulation from this state, e.g. to
+        branch prediction horizons.
+
+        :param FMUState state:
+            State to restore
+        """
+        stepper = self._get_stepper(wrk_idx=0)
+        stepper.set_state(state.state)
+        self.current_time = state.time
+
+    def _get_stepper(self, wrk_idx, check_stepping=True) -> _FMUStepper:
+        """Get the stepper of the given worker and create it if necessary"""
+        if check_stepping and not self._stepping and wrk_idx == 0:
+            raise RuntimeError("Call initialize() prior to accessing the fmu state.")
+        if not self._supports_direct_stepping():
+            raise TypeError("Stepping the fmu directly is only supported "
+                            "for FMI 2.0 co-simulation fmu's.")
+        if wrk_idx not in self._fmu_instances:
+            self._setup_single_fmu_instance(use_mp=wrk_idx != 0)
+        if wrk_idx not in self._steppers:
+            experiment = self._model_description.defaultExperiment
+            self._steppers[wrk_idx] = _FMUStepper(
+                fmu_instance=self._fmu_instances[wrk_idx],
+                value_references=self._value_references,
+                tolerance=None if experiment is None or experiment.tolerance is None
+                else float(experiment.tolerance),
+                logger=self.logger
+            )
+        return self._steppers[wrk_idx]
+
+    def _stop_stepping(self):
+        """Terminate and reset the fmu of a running stepwise simulation"""
+        fmu_instance = self._fmu_instances[0]
+        fmu_instance.terminate()
+        fmu_instance.reset()
+        self._stepping = False
 
     def _single_close(self, **kwargs):
         fmu_instance = kwargs["fmu_instance"]
         unzip_dir = kwargs["unzip_dir"]
+        # Simulations reset the instance after terminating it. Terminating
+        # it again is not allowed by the FMI standard and crashes fmu's
+        # sharing a process with other instances. A reset is always allowed.
         try:
-            fmu_instance.terminate()
+            fmu_instance.reset()
         except Exception as error:  # This is due to fmpy which does not yield a narrow error
-            self.logger.error(f"Could not terminate fmu instance: {error}")
+            self.logger.error(f"Could not reset fmu instance: {error}")
         try:
             fmu_instance.freeInstance()
         except OSError as error:
@@ -137,10 +679,9 @@ class FMU_API(simulationapi.SimulationAPI):
         if idx_worker not in self._fmu_instances:
             return  # Already closed
         self.logger.error(f"Closing fmu for worker {idx_worker}")
-        self._single_close(fmu_instance=self._fmu_instances[idx_worker],
-                           unzip_dir=self._unzip_dirs[idx_worker])
-        self._unzip_dirs = {}
-        self._fmu_instances = {}
+        self._single_close(fmu_instance=self._fmu_instances.pop(idx_worker),
+                           unzip_dir=self._unzip_dirs.pop(idx_worker))
+        self._steppers.pop(idx_worker, None)
 
     def simulate(self,
                  parameters: Union[dict, List[dict]] = None,
@@ -150,9 +691,95 @@ class FMU_API(simulationapi.SimulationAPI):
         Perform the single simulation for the given
         unzip directory and fmu_instance.
         See the docstring of simulate() for information on kwargs.
+
+        Additional settings:
+
+        :param str return_option:
+            Apart from the options of the base class, 'statistics' returns a
+            DataFrame with the integral, min, max and mean (see STATISTICS) of
+            each result on the output grid. For 'last_point' and 'statistics',
+            the engine 'direct' only records the last point or the
+            statistics while stepping, instead of the whole history.
+        :keyword FMUSnapshot warm_start:
+            Snapshot created by ``simulate_warm_up``. If given, each
+            simulation restores the state of the snapshot and continues
+            from the time of the snapshot. The results of the warm-up are
+            prepended to the results. Only tunable parameters may differ
+            from the parameters of the warm-up. Only supported for
+            FMI 2.0 co-simulation fmu's with serializable states.
+        :keyword callable abort_criterion:
+            Function evaluated every abort_check_interval steps on the
+            outputs recorded so far to stop hopeless simulations early,
+            e.g. in a calibration. It receives a DataFrame indexed by time
+            with the result_names as columns and returns a falsy value to
+            continue. A truthy value aborts the simulation, a string is
+            used as reason. The partial results are returned, DataFrames
+            hold the reason and the time of the abort in
+            ``attrs["abort_reason"]`` and ``attrs["abort_time"]``.
+            For 'last_point', they are added to the returned dict.
+            Must be picklable, e.g. a module-level function, if n_cpu > 1.
+        :keyword int abort_check_interval:
+            Number of steps between two evaluations of the abort_criterion.
+            Steps are the steps of the output grid for co-simulation fmu's and
+            the steps of the solver for model-exchange fmu's. Default is 10.
         """
+        # Convert the inputs once for all parameter sets
+        inputs = kwargs.get("inputs", None)
+        if isinstance(inputs, list):
+            converted = {}
+            for _inputs in inputs:
+                if _inputs is not None and id(_inputs) not in converted:
+                    converted[id(_inputs)] = self._convert_inputs(_inputs)
+            kwargs["inputs"] = [None if _inputs is None else converted[id(_inputs)]
+                                for _inputs in inputs]
+        elif inputs is not None:
+            kwargs["inputs"] = self._convert_inputs(inputs)
         return super().simulate(parameters=parameters, return_option=return_option, **kwargs)
 
+    def simulate_warm_up(self, warm_up_time: float,
+                         parameters: dict = None,
+                         inputs: Union[TimeSeriesData, pd.DataFrame] = None) -> FMUSnapshot:
+        """
+        Simulate a warm-up period which is equal for many simulations
+        from the start_time of the sim_setup up to the given time and
+        store the serialized state of the fmu.
+        Pass the result to ``simulate`` using the keyword ``warm_start``
+        to continue all simulations from this state.
+
+        :param float warm_up_time:
+            Simulation time at which the warm-up ends.
+        :param dict parameters:
+            Parameters of the warm-up. Non-tunable parameters can't
+            be changed by simulations continuing from the snapshot.
+        :param (TimeSeriesData, pd.DataFrame) inputs:
+            Inputs of the warm-up period.
+        :return: FMUSnapshot
+            Named tuple with the time, the serialized state and
+            the results of the warm-up for the current result_names.
+        """
+        if not self._model_description.coSimulation.canSerializeFMUstate:
+            raise TypeError("The fmu does not support serializing its state.")
+        stepper = self._get_stepper(wrk_idx=0, check_stepping=False)
+        if self._stepping:
+            self._stop_stepping()
+        time_grid, values = stepper.simulate(
+            start_time=self.sim_setup.start_time,
+            stop_time=warm_up_time,
+            output_interval=self.sim_setup.output_interval,
+            output_names=self.result_names,
+            parameters=parameters,
+            inputs=None if inputs is None else self._convert_inputs(inputs),
+            timeout=self.sim_setup.timeout,
+            store_state=True
+        )
+        return FMUSnapshot(
+            time=time_grid[-1],
+            state=stepper.final_state,
+            result=pd.DataFrame(values.copy(),
+                                index=pd.Index(time_grid, name="time"),
+                                columns=self.result_names)
+        )
+
     def _single_simulation(self, kwargs):
         """
         Perform the single simulation for the given
@@ -167,64 +794,110 @@ class FMU_API(simulationapi.SimulationAPI):
         return_option = kwargs.pop("return_option", "time_series")
         inputs = kwargs.get("inputs", None)
         fail_on_error = kwargs.get("fail_on_error", True)
+        warm_start = kwargs.get("warm_start", None)
+        abort_criterion = kwargs.get("abort_criterion", None)
 
-        if self.use_mp:
-            idx_worker = self.worker_idx
-            if idx_worker not in self._fmu_instances:
-                self._setup_single_fmu_instance(use_mp=True)
-        else:
-            idx_worker = 0
+        with telemetry.phase("setup"):
+            if self.use_mp:
+                idx_worker = self.worker_idx
+                if idx_worker not in self._fmu_instances:
+                    self._setup_single_fmu_instance(use_mp=True)
+            else:
+                idx_worker = 0
+                if self._stepping:
+                    self._stop_stepping()
 
-        fmu_instance = self._fmu_instances[idx_worker]
-        unzip_dir = self._unzip_dirs[idx_worker]
+            fmu_instance = self._fmu_instances[idx_worker]
+            unzip_dir = self._unzip_dirs[idx_worker]
 
-        if inputs is not None:
-            if not isinstance(inputs, (TimeSeriesData, pd.DataFrame)):
-                raise TypeError("DataFrame or TimeSeriesData object expected for inputs.")
-            inputs = inputs.copy()  # Create save copy
-            if isinstance(inputs, TimeSeriesData):
-                inputs = inputs.to_df(force_single_index=True)
-            if "time" in inputs.columns:
-                raise IndexError(
-                    "Given inputs contain a column named 'time'. "
-                    "The index is assumed to contain the time-information."
-                )
-            # Convert df to structured numpy array for fmpy: simulate_fmu
-            inputs.insert(0, column="time", value=inputs.index)
-            inputs_tuple = [tuple(columns) for columns in inputs.to_numpy()]
-            # Try to match the type, default is np.double.
-            # 'time' is not in inputs and thus handled separately.
-            dtype = [(inputs.columns[0], np.double)] + \
-                    [(col,
-                      self._type_map.get(self.inputs[col].type, np.double)
-                      ) for col in inputs.columns[1:]]
-            inputs = np.array(inputs_tuple, dtype=dtype)
-        if parameters is None:
-            parameters = {}
+            if parameters is None:
+                parameters = {}
+            else:
+                self.check_unsupported_variables(variables=list(parameters.keys()),
+                                                 type_of_var="parameters")
+            if warm_start is not None:
+                self._check_warm_start(warm_start=warm_start, parameters=parameters)
+        if inputs is not None and not isinstance(inputs, np.ndarray):
+            with telemetry.phase("input_conversion"):
+                inputs = self._convert_inputs(inputs)
+        if abort_criterion is None:
+            abort_monitor = None
         else:
-            self.check_unsupported_variables(variables=list(parameters.keys()),
-                                             type_of_var="parameters")
+            abort_monitor = _AbortMonitor(criterion=abort_criterion,
+                                          output_names=self.result_names,
+                                          check_interval=kwargs.get("abort_check_interval", 10))
+        # Only record what is returned, if the fmu is stepped directly.
+        # The abort criterion requires the whole history.
+        if return_option in ("last_point", "statistics") and abort_monitor is None:
+            record = return_option
+        else:
+            record = "all"
+        use_stepper = self.engine == "direct" or warm_start is not None
         try:
-            res = fmpy.simulate_fmu(
-                filename=unzip_dir,
-                start_time=self.sim_setup.start_time,
-                stop_time=self.sim_setup.stop_time,
-                solver=self.sim_setup.solver,
-                step_size=self.sim_setup.fixedstepsize,
-                relative_tolerance=None,
-                output_interval=self.sim_setup.output_interval,
-                record_events=False,  # Used for an equidistant output
-                start_values=parameters,
-                apply_default_start_values=False,  # As we pass start_values already
-                input=inputs,
-                output=self.result_names,
-                timeout=self.sim_setup.timeout,
-                step_finished=None,
-                model_description=self._model_description,
-                fmu_instance=fmu_instance,
-                fmi_type=self._fmi_type,
-            )
-            fmu_instance.reset()
+            if use_stepper:
+                time_grid, values = self._get_stepper(idx_worker, check_stepping=False).simulate(
+                    start_time=self.sim_setup.start_time if warm_start is None else warm_start.time,
+                    stop_time=self.sim_setup.stop_time,
+                    output_interval=self.sim_setup.output_interval,
+                    output_names=self.result_names,
+                    parameters=parameters,
+                    inputs=inputs,
+                    timeout=self.sim_setup.timeout,
+                    state=None if warm_start is None else warm_start.state,
+                    record=record,
+                    abort_monitor=abort_monitor
+                )
+                if record == "statistics":
+                    with telemetry.phase("result_conversion"):
+                        df = pd.DataFrame(values.copy(), index=STATISTICS,
+                                          columns=self.result_names)
+                        if warm_start is not None:
+                            df = self._merge_statistics(
+                                warm_up=self._get_statistics(
+                                    warm_start.result[self.result_names]
+                                ),
+                                warm_up_time=warm_start.time - warm_start.result.index[0],
+                                continued=df,
+                                continued_time=self.sim_setup.stop_time - warm_start.time
+                            )
+                    return df
+                with telemetry.phase("result_conversion"):
+                    df = pd.DataFrame(values.copy(),
+                                      index=pd.Index(time_grid, name="time"),
+                                      columns=self.result_names)
+                    if warm_start is not None and record == "all":
+                        # The first point equals the last point of the warm-up
+                        df = pd.concat([warm_start.result.iloc[:-1][self.result_names], df])
+            else:
+                with telemetry.phase("solve"):
+                    res = fmpy.simulate_fmu(
+                        filename=unzip_dir,
+                        start_time=self.sim_setup.start_time,
+                        stop_time=self.sim_setup.stop_time,
+                        solver=self.sim_setup.solver,
+                        step_size=self.sim_setup.fixedstepsize,
+                        relative_tolerance=None,
+                        output_interval=self.sim_setup.output_interval,
+                        record_events=False,  # Used for an equidistant output
+                        start_values=parameters,
+                        apply_default_start_values=False,  # As we pass start_values already
+                        input=inputs,
+                        output=self.result_names,
+                        timeout=self.sim_setup.timeout,
+                        step_finished=(None if abort_monitor is None
+                                       else abort_monitor.step_finished),
+                        model_description=self._model_description,
+                        fmu_instance=fmu_instance,
+                        fmi_type=self._fmi_type,
+                    )
+                    fmu_instance.reset()
+                # Count the output steps from the results instead of
+                # a callback of fmpy slowing down every step.
+                telemetry.count("n_steps", len(res) - 1)
+                with telemetry.phase("result_conversion"):
+                    df = pd.DataFrame(res).set_index("time")
+                    if record == "statistics":
+                        return self._get_statistics(df)
 
         except Exception as error:
             self.logger.error(f"[SIMULATION ERROR] Error occurred while running FMU: \n {error}")
@@ -232,28 +905,136 @@ class FMU_API(simulationapi.SimulationAPI):
                 raise error
             return None
 
-        # Reshape result:
-        df = pd.DataFrame(res).set_index("time")
-        df.index = np.round(df.index.astype("float64"),
-                            str(self.sim_setup.output_interval)[::-1].find('.'))
-
-        if return_option == "savepath":
-            result_file_name = kwargs.get("result_file_name", 'resultFile')
-            savepath = kwargs.get("savepath", None)
-
-            if savepath is None:
-                savepath = self.cd
-
-            os.makedirs(savepath, exist_ok=True)
-            filepath = os.path.join(savepath, f"{result_file_name}.hdf")
-            df.to_hdf(filepath,
-                      key="simulation")
-            return filepath
-        if return_option == "last_point":
-            return df.iloc[-1].to_dict()
-        # Else return time series data
-        tsd = TimeSeriesData(df, default_tag="sim")
-        return tsd
+        with telemetry.phase("result_conversion"):
+            # Reshape result:
+            df.index = np.round(df.index.astype("float64"),
+                                str(self.sim_setup.output_interval)[::-1].find('.'))
+            if abort_monitor is not None and abort_monitor.reason is not None:
+                self.logger.info("Simulation aborted at time %s: %s",
+                                 abort_monitor.time, abort_monitor.reason)
+            if return_option == "statistics":
+                return self._add_abort_info(self._get_statistics(df), abort_monitor)
+
+            if return_option == "savepath" and kwargs.get("result_store", None) is not None:
+                return kwargs["result_store"].put(run_id=kwargs["run_id"],
+                                                  df=df,
+                                                  parameters=parameters)
+            if return_option == "savepath":
+                result_file_name = kwargs.get("result_file_name", 'resultFile')
+                savepath = kwargs.get("savepath", None)
+
+                if savepath is None:
+                    savepath = self.cd
+
+                os.makedirs(savepath, exist_ok=True)
+                filepath = os.path.join(savepath, f"{result_file_name}.hdf")
+                df.to_hdf(filepath,
+                          key="simulation")
+                return filepath
+            if return_option == "last_point":
+                last_point = df.iloc[-1].to_dict()
+                if abort_monitor is not None and abort_monitor.reason is not None:
+                    last_point["abort_reason"] = abort_monitor.reason
+                    last_point["abort_time"] = abort_monitor.time
+                return last_point
+            # Else return time series data
+            tsd = TimeSeriesData(df, default_tag="sim")
+            return self._add_abort_info(tsd, abort_monitor)
+
+    @staticmethod
+    def _add_abort_info(df: pd.DataFrame, abort_monitor: _AbortMonitor = None) -> pd.DataFrame:
+        """Store the reason and the time of an abort in the attrs of the result"""
+        if abort_monitor is not None and abort_monitor.reason is not None:
+            df.attrs["abort_reason"] = abort_monitor.reason
+            df.attrs["abort_time"] = abort_monitor.time
+        return df
+
+    @staticmethod
+    def _get_statistics(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calculate the STATISTICS of each column of the given results,
+        using the trapezoidal rule as done while stepping.
+        """
+        time_grid = df.index.to_numpy(dtype=float)
+        values = df.to_numpy(dtype=float)
+        duration = time_grid[-1] - time_grid[0]
+        integral = _trapezoid(values, x=time_grid, axis=0)
+        return pd.DataFrame([integral,
+                             values.min(axis=0),
+                             values.max(axis=0),
+                             integral / duration if duration > 0 else values[0]],
+                            index=STATISTICS, columns=df.columns)
+
+    @staticmethod
+    def _merge_statistics(warm_up: pd.DataFrame, warm_up_time: float,
+                          continued: pd.DataFrame, continued_time: float) -> pd.DataFrame:
+        """Merge the STATISTICS of a warm-up and a continued simulation"""
+        merged = pd.DataFrame(index=STATISTICS, columns=warm_up.columns, dtype=float)
+        merged.loc["integral"] = warm_up.loc["integral"] + continued.loc["integral"]
+        merged.loc["min"] = np.minimum(warm_up.loc["min"], continued.loc["min"])
+        merged.loc["max"] = np.maximum(warm_up.loc["max"], continued.loc["max"])
+        merged.loc["mean"] = merged.loc["integral"] / (warm_up_time + continued_time)
+        return merged
+
+    def _supports_direct_stepping(self) -> bool:
+        """Check if the fmu can be simulated by the _FMUStepper"""
+        return (self._model_description.fmiVersion == "2.0" and
+                self._fmi_type == "CoSimulation")
+
+    def _get_shared_result_shape(self, kwargs: dict) -> Union[tuple, None]:
+        """
+        Results of FMU simulations are returned on the equidistant
+        output grid, hence the shape is known in advance.
+        """
+        if kwargs.get("return_option", "time_series") != "time_series":
+            return None
+        n_steps = int(np.ceil((self.sim_setup.stop_time - self.sim_setup.start_time) /
+                              self.sim_setup.output_interval - 1e-10))
+        return n_steps + 1, len(self.result_names)
+
+    def _convert_inputs(self, inputs: Union[TimeSeriesData, pd.DataFrame]) -> np.ndarray:
+        """
+        Convert the given inputs to a structured numpy
+        array with a time field, as required by fmpy.
+        The columns are copied directly into a preallocated array.
+        """
+        if not isinstance(inputs, (TimeSeriesData, pd.DataFrame)):
+            raise TypeError("DataFrame or TimeSeriesData object expected for inputs.")
+        if isinstance(inputs, TimeSeriesData):
+            inputs = inputs.to_df(force_single_index=True)
+        if "time" in inputs.columns:
+            raise IndexError(
+                "Given inputs contain a column named 'time'. "
+                "The index is assumed to contain the time-information."
+            )
+        # Try to match the type, default is np.double.
+        # 'time' is not in inputs and thus handled separately.
+        dtype = [("time", np.double)] + \
+                [(col,
+                  self._type_map.get(self.inputs[col].type, np.double)
+                  ) for col in inputs.columns]
+        array = np.empty(len(inputs.index), dtype=dtype)
+        array["time"] = inputs.index
+        for col in inputs.columns:
+            array[col] = inputs[col].to_numpy()
+        return array
+
+    def _check_warm_start(self, warm_start: FMUSnapshot, parameters: dict):
+        """
+        Check if the simulation can continue from the given snapshot.
+        """
+        missing = set(self.result_names).difference(warm_start.result.columns)
+        if missing:
+            raise KeyError(f"The result_names {', '.join(missing)} are not part "
+                           f"of the results of the given warm_start.")
+        if not warm_start.time < self.sim_setup.stop_time:
+            raise ValueError(f"Time of the warm_start ({warm_start.time}) is not "
+                             f"before the stop_time ({self.sim_setup.stop_time}).")
+        fixed = [name for name in parameters
+                 if self._variabilities.get(name) != "tunable"]
+        if fixed:
+            raise ValueError(f"The parameters {', '.join(fixed)} are not tunable and "
+                             f"can't be changed when continuing from a warm_start.")
 
     def setup_fmu_instance(self):
         """
@@ -267,13 +1048,81 @@ class FMU_API(simulationapi.SimulationAPI):
         os.makedirs(self._single_unzip_dir, exist_ok=True)
         self._single_unzip_dir = fmpy.extract(self.model_name,
                                          unzipdir=self._single_unzip_dir)
-        self._model_description = read_model_description(self._single_unzip_dir,
-                                                         validate=True)
+        self._load_model_description()
+
+        # With multiprocessing, each worker extracts and
+        # instantiates its own fmu in _setup_worker.
+        if not self.use_mp:
+            self._setup_single_fmu_instance(use_mp=False)
+
+    def _setup_worker(self):
+        self._setup_single_fmu_instance(use_mp=True)
+
+    def _load_model_description(self):
+        """
+        Load the model description and the variables of the fmu.
+        Parsing and validating large model descriptions is slow. Hence,
+        the results are cached in memory and on disk, keyed by the hash
+        of the fmu file and the version of the cached contents.
+        """
+        fmu_hash = get_file_hash(self.model_name)
+        cache_path = None
+        if self.cache_dir is not False:
+            cache_dir = self.cd if self.cache_dir is None else self.cache_dir
+            cache_path = os.path.join(
+                cache_dir,
+                f"{os.path.basename(self.model_name)[:-4]}_{fmu_hash[:16]}"
+                f"_v{_MODEL_DESCRIPTION_CACHE_VERSION}.pickle"
+            )
+        cached = self._model_description_cache.get(fmu_hash)
+        if cached is None and cache_path is not None and os.path.isfile(cache_path):
+            try:
+                with open(cache_path, "rb") as file:
+                    cached = pickle.load(file)
+                self.logger.info("Loaded model description from cache %s", cache_path)
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as error:
+                self.logger.error("Could not load cached model description: %s", error)
+                cached = None
+        if cached is not None and self.validate_fmu and not cached["validated"]:
+            cached = None  # Parse again to validate the description
+        if cached is None:
+            self.logger.info("Parsing model description")
+            cached = self._parse_model_description()
+            if cache_path is not None:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                with open(cache_path, "wb") as file:
+                    pickle.dump(cached, file)
+        self._model_description_cache[fmu_hash] = cached
 
-        if self._model_description.coSimulation is None:
-            self._fmi_type = 'ModelExchange'
+        self._model_description = cached["model_description"]
+        self._fmi_type = cached["fmi_type"]
+        self._value_references = cached["value_references"]
+        self._variabilities = cached["variabilities"]
+        if self.engine == "direct" and not self._supports_direct_stepping():
+            raise ValueError("The engine 'direct' only supports FMI 2.0 "
+                             "co-simulation fmu's. Use engine='fmpy' instead.")
+        # Copy the dicts to not alter the cache when altering the variables
+        self.inputs = dict(cached["inputs"])
+        self.outputs = dict(cached["outputs"])
+        self.parameters = dict(cached["parameters"])
+        self.states = dict(cached["states"])
+
+    def _parse_model_description(self) -> dict:
+        """
+        Read the model description of the extracted fmu
+        and convert the model variables to ebcpy Variables.
+
+        :return: dict
+            Dictionary with the model description, the fmi type,
+            the variables and whether the description was validated.
+        """
+        model_description = read_model_description(self._single_unzip_dir,
+                                                   validate=self.validate_fmu)
+
+        if model_description.coSimulation is None:
+            fmi_type = 'ModelExchange'
         else:
-            self._fmi_type = 'CoSimulation'
+            fmi_type = 'CoSimulation'
 
         def _to_bound(value):
             if value is None or \
@@ -286,8 +1135,9 @@ class FMU_API(simulationapi.SimulationAPI):
                   "Integer": int,
                   "Real": float,
                   "Boolean": bool, }
+        variables = {"inputs": {}, "outputs": {}, "parameters": {}, "states": {}}
         # Extract inputs, outputs & tuner (lists from parent classes will be appended)
-        for var in self._model_description.modelVariables:
+        for var in model_description.modelVariables:
             if var.start is not None:
                 var.start = _types[var.type](var.start)
 
@@ -298,28 +1148,24 @@ class FMU_API(simulationapi.SimulationAPI):
                 type=_types[var.type]
             )
             if var.causality == 'input':
-                self.inputs[var.name] = _var_ebcpy
+                variables["inputs"][var.name] = _var_ebcpy
             elif var.causality == 'output':
-                self.outputs[var.name] = _var_ebcpy
+                variables["outputs"][var.name] = _var_ebcpy
             elif var.causality == 'parameter' or var.causality == 'calculatedParameter':
-                self.parameters[var.name] = _var_ebcpy
+                variables["parameters"][var.name] = _var_ebcpy
             elif var.causality == 'local':
-                self.states[var.name] = _var_ebcpy
+                variables["states"][var.name] = _var_ebcpy
             else:
                 self.logger.error(f"Could not map causality {var.causality}"
                                   f" to any variable type.")
-
-        if self.use_mp:
-            self.logger.info("Extracting fmu %s times for "
-                             "multiprocessing on %s processes",
-                             self.n_cpu, self.n_cpu)
-            self.pool.map(
-                self._setup_single_fmu_instance,
-                [True for _ in range(self.n_cpu)]
-            )
-            self.logger.info("Instantiated fmu's on all processes.")
-        else:
-            self._setup_single_fmu_instance(use_mp=False)
+        return {"model_description": model_description,
+                "fmi_type": fmi_type,
+                "validated": self.validate_fmu,
+                "value_references": {var.name: (var.valueReference, var.type)
+                                     for var in model_description.modelVariables},
+                "variabilities": {var.name: var.variability
+                                  for var in model_description.modelVariables},
+                **variables}
 
     def _setup_single_fmu_instance(self, use_mp):
         if not use_mp:
@@ -329,25 +1175,61 @@ class FMU_API(simulationapi.SimulationAPI):
             if wrk_idx in self._fmu_instances:
                 return True
         if use_mp:
-            unzip_dir = self._single_unzip_dir + f"_worker_{wrk_idx}"
+            unzip_dir = str(self._single_unzip_dir) + f"_worker_{wrk_idx}"
             unzip_dir = fmpy.extract(self.model_name,
                                      unzipdir=unzip_dir)
         else:
             unzip_dir = self._single_unzip_dir
         self.logger.info("Instantiating fmu for worker %s", wrk_idx)
-        self._fmu_instances.update({wrk_idx: fmpy.instantiate_fmu(
-            unzipdir=unzip_dir,
-            model_description=self._model_description,
-            fmi_type=self._fmi_type,
-            visible=False,
-            debug_logging=False,
-            logger=self._custom_logger,
-            fmi_call_logger=None)})
+        if use_mp and self.executor == "thread":
+            fmu_instance = self._instantiate_fmu_for_thread(
+                unzip_dir=unzip_dir,
+                instance_name=f"{self._model_description.modelName}_worker_{wrk_idx}"
+            )
+        else:
+            fmu_instance = fmpy.instantiate_fmu(
+                unzipdir=unzip_dir,
+                model_description=self._model_description,
+                fmi_type=self._fmi_type,
+                visible=False,
+                debug_logging=False,
+                logger=self._custom_logger,
+                fmi_call_logger=None)
+        self._fmu_instances.update({wrk_idx: fmu_instance})
         self._unzip_dirs.update({
             wrk_idx: unzip_dir
         })
         return True
 
+    def _instantiate_fmu_for_thread(self, unzip_dir: str, instance_name: str):
+        """
+        Instantiate the fmu for a worker thread. All threads share one process.
+        Hence, each thread loads the binaries of its own extracted copy of the
+        fmu and uses a distinct instance name.
+        """
+        if (self._model_description.fmiVersion != "2.0" or
+                self._model_description.coSimulation is None):
+            raise TypeError("The thread executor is only supported for "
+                            "co-simulation fmu's of FMI version 2.0.")
+        callbacks = fmi2CallbackFunctions()
+        callbacks.logger = fmi2CallbackLoggerTYPE(self._custom_logger)
+        callbacks.allocateMemory = fmi2CallbackAllocateMemoryTYPE(calloc)
+        callbacks.freeMemory = fmi2CallbackFreeMemoryTYPE(free)
+        try:
+            # pylint: disable=import-outside-toplevel
+            from fmpy.logging import addLoggerProxy
+            addLoggerProxy(byref(callbacks))
+        except Exception as err:
+            self.logger.error("Could not add logger proxy function: %s", err)
+        fmu_instance = FMU2Slave(
+            guid=self._model_description.guid,
+            unzipDirectory=unzip_dir,
+            modelIdentifier=self._model_description.coSimulation.modelIdentifier,
+            instanceName=instance_name
+        )
+        fmu_instance.instantiate(visible=False, callbacks=callbacks, loggingOn=False)
+        return fmu_instance
+
     def _custom_logger(self, component, instanceName, status, category, message):
         """ Print the FMU's log messages to the command line (works for both FMI 1.0 and 2.0) """
         # pylint: disable=unused-argument, invalid-name
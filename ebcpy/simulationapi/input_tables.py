@@ -0,0 +1,80 @@
+"""
+Module to write the inputs of simulations into the files read by the
+CombiTimeTable of a Modelica model. Writing a year-long table with a
+resolution of minutes takes seconds, while the inputs often stay the
+same for many simulations, e.g. in a calibration. Hence, tables are
+only written if the inputs have changed since the last write.
+"""
+
+import os
+import hashlib
+from typing import Dict
+import pandas as pd
+from ebcpy.utils.conversion import convert_tsd_to_modelica_table
+
+
+def get_inputs_hash(inputs: pd.DataFrame, **kwargs) -> str:
+    """
+    Return a hash of the given inputs and the settings of their conversion.
+
+    :param pd.DataFrame inputs:
+        Inputs of the simulation, e.g. a TimeSeriesData object
+    :keyword:
+        Settings of the conversion, e.g. the table_name and the offset
+    :return: str
+        Hex-digest, changing if the inputs, their index,
+        their columns or the settings change.
+    """
+    _hash = hashlib.sha1()
+    _hash.update(repr(sorted(kwargs.items())).encode())
+    _hash.update(repr(inputs.columns.tolist()).encode())
+    _hash.update(pd.util.hash_pandas_object(inputs, index=True).to_numpy().tobytes())
+    return _hash.hexdigest()
+
+
+class InputTableWriter:
+    """
+    Write inputs into the files of CombiTimeTables, skipping files
+    already holding the same inputs. Files ending with .mat are written
+    as binary MATLAB v4 files, all others as text files.
+
+    Relative file names are resolved in the working directory of the
+    simulation, e.g. the directory of the worker. Thus, each worker
+    writes and reads its own file, if the fileName of the CombiTimeTable
+    is relative. Absolute file names are shared by all workers.
+    """
+
+    def __init__(self):
+        self._hashes: Dict[str, str] = {}
+
+    def write(self, inputs: pd.DataFrame, table_name: str, file_name: str,
+              cd: str, offset: float = 0) -> str:
+        """
+        Write the inputs into the given file, if they changed since the last write.
+
+        :param pd.DataFrame inputs:
+            Inputs of the simulation, e.g. a TimeSeriesData object
+        :param str table_name:
+            Value of 'tableName' in the CombiTimeTable
+        :param str,os.path.normpath file_name:
+            Value of 'fileName' in the CombiTimeTable
+        :param str,os.path.normpath cd:
+            Working directory of the simulation, used for relative file names
+        :param float offset:
+            Offset for time in seconds, default 0
+        :return: str
+            Path of the written file
+        """
+        filepath = os.path.join(cd, str(file_name))
+        inputs_hash = get_inputs_hash(inputs, table_name=table_name, offset=float(offset))
+        if self._hashes.get(filepath) == inputs_hash and os.path.isfile(filepath):
+            return filepath
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        convert_tsd_to_modelica_table(
+            tsd=inputs,
+            table_name=table_name,
+            save_path_file=filepath,
+            offset=offset
+        )
+        self._hashes[filepath] = inputs_hash
+        return filepath
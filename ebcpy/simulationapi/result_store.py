@@ -0,0 +1,275 @@
+"""
+Module to store the results of many simulations, e.g. of a parameter
+sweep, in one or few consolidated hdf-files instead of one file per
+simulation. Only a dedicated writer process writes into the files,
+workers of the simulation APIs send their results to this process.
+"""
+
+import os
+import re
+import multiprocessing as mp
+from typing import List, Union
+import pandas as pd
+from ebcpy.utils import setup_logger
+
+_RUN_KEY = re.compile(r"^/?run_(\d+)$")
+
+
+def _run_key(run_id: int) -> str:
+    """Key of the dataset of the given run"""
+    return f"run_{run_id:06d}"
+
+
+def _write_results(queue, filepaths: List[str], complevel: int, complib: str):
+    """
+    Loop of the writer process. Writes each received result together
+    with its parameters into the file of its shard and flushes the file,
+    so all written runs survive if the sweep is killed. At the end,
+    the parameters of all runs are collected in the table 'parameters'
+    of each file. After an error, the queue is still emptied to never
+    block the workers.
+    """
+    logger = setup_logger(name="SweepResultStore")
+    stores = []
+    parameters = [{} for _ in filepaths]
+    failed = False
+    try:
+        try:
+            stores = [pd.HDFStore(filepath, mode="a", complevel=complevel, complib=complib)
+                      for filepath in filepaths]
+            for store in stores:
+                store.flush(fsync=True)
+        except Exception as err:  # pylint: disable=broad-except
+            logger.error("Could not open the result files: %s", err)
+            failed = True
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+            if failed:
+                continue
+            run_id, df, _parameters = item
+            shard = run_id % len(filepaths)
+            try:
+                stores[shard].put(_run_key(run_id), df, format="fixed")
+                stores[shard].get_storer(_run_key(run_id)).attrs.parameters = _parameters
+                stores[shard].flush(fsync=True)
+                parameters[shard][run_id] = _parameters
+            except Exception as err:  # pylint: disable=broad-except
+                logger.error("Could not write result of run %s: %s", run_id, err)
+                failed = True
+        for store, _parameters in zip(stores, parameters):
+            if not _parameters:
+                continue
+            table = pd.DataFrame.from_dict(_parameters, orient="index")
+            if "parameters" in store:
+                table = pd.concat([store["parameters"], table])
+                table = table[~table.index.duplicated(keep="last")]
+            table.index.name = "run_id"
+            store.put("parameters", table.sort_index(), format="fixed")
+    except Exception as err:  # pylint: disable=broad-except
+        logger.error("Could not write the results: %s", err)
+        failed = True
+    finally:
+        for store in stores:
+            store.close()
+    if failed:
+        raise SystemExit(1)
+
+
+class SweepResultStore:
+    """
+    Store for the results of many simulations in consolidated hdf-files.
+    Each result is stored as a dataset 'run_<run_id>' with its parameters
+    in the attributes of the dataset. When closing the store, the
+    parameters of all runs are collected in the table 'parameters',
+    indexed by the run id. Datasets are compressed in chunks.
+
+    Pass the store to ``simulate`` using the keyword ``result_store``
+    together with ``return_option="savepath"``. Instead of the filepaths,
+    the run ids of the results are returned. All results are sent to a
+    single writer process, so no two workers ever write into the same
+    file. The store has to be opened before simulating and closed
+    afterwards, best using the with statement:
+
+    >>> with SweepResultStore(filepath="sweep.hdf") as store:
+    >>>     run_ids = sim_api.simulate(parameters=parameters,
+    >>>                                return_option="savepath",
+    >>>                                result_store=store)
+    >>> df = store.read(run_ids[0])
+
+    Existing files are continued, new runs get the following run ids.
+
+    :param str,os.path.normpath filepath:
+        Path of the hdf-file to store the results in.
+    :param int n_shards:
+        Number of files to distribute the results over. Default is 1.
+        If larger, the files are named '<filepath>_<shard>.hdf' and each
+        run is stored in the file of the shard run_id % n_shards.
+    :param int complevel:
+        Level of the compression, from 0 (none) to 9. Default is 5.
+    :param str complib:
+        Library used for the compression, see pandas.HDFStore. Default is 'blosc'.
+    :param int max_queued:
+        Maximal number of results waiting to be written. Workers wait
+        if the writer is too slow. Default is 100.
+    """
+
+    def __init__(self,
+                 filepath: str,
+                 n_shards: int = 1,
+                 complevel: int = 5,
+                 complib: str = "blosc",
+                 max_queued: int = 100):
+        if n_shards < 1:
+            raise ValueError("n_shards has to be at least 1")
+        filepath = str(filepath)
+        if n_shards == 1:
+            self.filepaths = [filepath]
+        else:
+            root, ext = os.path.splitext(filepath)
+            self.filepaths = [f"{root}_{shard}{ext or '.hdf'}" for shard in range(n_shards)]
+        self.complevel = complevel
+        self.complib = complib
+        self.max_queued = max_queued
+        self._queue = None
+        self._manager = None
+        self._writer = None
+        self._next_run_id = max(self.run_ids, default=-1) + 1
+
+    @property
+    def is_open(self) -> bool:
+        """True, if the writer process is running"""
+        return self._queue is not None
+
+    @property
+    def run_ids(self) -> List[int]:
+        """Ids of all runs already written to the files"""
+        run_ids = []
+        for filepath in self.filepaths:
+            if not os.path.isfile(filepath):
+                continue
+            with pd.HDFStore(filepath, mode="r") as store:
+                for key in store.keys():
+                    match = _RUN_KEY.match(key)
+                    if match:
+                        run_ids.append(int(match.group(1)))
+        return sorted(run_ids)
+
+    def open(self):
+        """Start the writer process"""
+        if self.is_open:
+            return
+        for filepath in self.filepaths:
+            os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        # pylint: disable=consider-using-with
+        self._manager = mp.Manager()
+        self._queue = self._manager.Queue(maxsize=self.max_queued)
+        self._writer = mp.Process(target=_write_results,
+                                  args=(self._queue, self.filepaths,
+                                        self.complevel, self.complib),
+                                  name="SweepResultStoreWriter",
+                                  daemon=True)
+        self._writer.start()
+
+    def close(self):
+        """Wait until all results are written and stop the writer process"""
+        if not self.is_open:
+            return
+        self._queue.put(None)
+        self._writer.join()
+        self._manager.shutdown()
+        exitcode = self._writer.exitcode
+        self._queue = None
+        self._manager = None
+        self._writer = None
+        if exitcode != 0:
+            raise RuntimeError("Writing the results failed, see the log of the writer process.")
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getstate__(self):
+        """Only the queue is required to send results from the workers"""
+        state = self.__dict__.copy()
+        state["_manager"] = None
+        state["_writer"] = None
+        return state
+
+    def reserve(self, n_runs: int) -> List[int]:
+        """Return the run ids for the given number of new runs"""
+        if not self.is_open:
+            raise RuntimeError("Open the store before simulating, "
+                               "e.g. using 'with store:'")
+        run_ids = list(range(self._next_run_id, self._next_run_id + n_runs))
+        self._next_run_id += n_runs
+        return run_ids
+
+    def put(self, run_id: int, df: pd.DataFrame, parameters: dict = None) -> int:
+        """
+        Send the result and the parameters of a run to the writer process.
+        Called by the workers of the simulation APIs.
+
+        :return: int
+            The given run_id
+        """
+        if not self.is_open:
+            raise RuntimeError("The store is closed, results can't be written.")
+        self._queue.put((run_id, pd.DataFrame(df), dict(parameters or {})))
+        return run_id
+
+    def read(self, run_id: int) -> pd.DataFrame:
+        """Read the result of the given run"""
+        self._check_closed()
+        return pd.read_hdf(self.filepaths[run_id % len(self.filepaths)],
+                           key=_run_key(run_id))
+
+    def read_parameters(self, run_ids: Union[int, List[int]] = None) -> pd.DataFrame:
+        """
+        Read the parameters of all or the given runs. Runs missing in
+        the table 'parameters', e.g. as the writer process was killed,
+        are read from the attributes of their datasets.
+
+        :param (int, list) run_ids:
+            Ids of the runs. Default are all runs.
+        :return: pd.DataFrame
+            One row per run, indexed by the run id.
+        """
+        self._check_closed()
+        tables = []
+        for filepath in self.filepaths:
+            if not os.path.isfile(filepath):
+                continue
+            with pd.HDFStore(filepath, mode="r") as store:
+                table = store["parameters"] if "parameters" in store else pd.DataFrame()
+                missing = {}
+                for key in store.keys():
+                    match = _RUN_KEY.match(key)
+                    if match is None or int(match.group(1)) in table.index:
+                        continue
+                    _parameters = getattr(store.get_storer(key).attrs, "parameters", None)
+                    # Results without parameters were not written completely
+                    if _parameters is not None:
+                        missing[int(match.group(1))] = _parameters
+                tables.append(table)
+                if missing:
+                    tables.append(pd.DataFrame.from_dict(missing, orient="index"))
+        tables = [table for table in tables if not table.empty]
+        if not tables:
+            return pd.DataFrame(index=pd.Index([], name="run_id"))
+        table = pd.concat(tables).sort_index()
+        table.index.name = "run_id"
+        if run_ids is None:
+            return table
+        if isinstance(run_ids, int):
+            run_ids = [run_ids]
+        return table.loc[run_ids]
+
+    def _check_closed(self):
+        if self.is_open:
+            raise RuntimeError("Close the store before reading, "
+                               "the writer process may still write into the files.")
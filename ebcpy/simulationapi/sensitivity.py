@@ -0,0 +1,230 @@
+"""
+Module for the global sensitivity analysis of the parameters of a
+simulation model, e.g. to screen the influential parameters before a
+calibration. Supported are the elementary effects of Morris and the
+Sobol indices, estimated using the sampling design of Saltelli.
+Bounds of the parameters are taken from ``sim_api.parameters``,
+unless given explicitly, see ``ebcpy.simulationapi.sweep.get_bounds``.
+
+Example:
+
+>>> from ebcpy.simulationapi.sensitivity import SensitivityAnalysis
+>>> analysis = SensitivityAnalysis(sim_api, names=["TAmb", "heatCapacitor.C"],
+>>>                                bounds={"TAmb": (273.15, 303.15),
+>>>                                        "heatCapacitor.C": (0.1, 1)})
+>>> morris = analysis.morris(n_trajectories=20)
+>>> sobol = analysis.sobol(n_samples=512)
+"""
+
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from ebcpy.simulationapi import SimulationAPI
+from ebcpy.simulationapi.sweep import get_bounds, design_point_id, sample_unit_cube
+
+
+class SensitivityAnalysis:
+    """
+    Global sensitivity analysis of the given parameters on all
+    result_names of the api at once.
+
+    All samples of an analysis are simulated using few calls of
+    ``simulate``, keeping all workers of the api busy. Samples are
+    deduplicated and the metrics of all simulated samples are cached,
+    so that points shared between designs or analyses are only
+    simulated once.
+
+    :param SimulationAPI sim_api:
+        Api to simulate the samples with
+    :param list names:
+        Names of the parameters to analyse
+    :param dict bounds:
+        Bounds (min, max) of the parameters. Overwrites the
+        min and max of the variables in sim_api.parameters.
+    :param str return_option:
+        Metrics of each simulation. Options are:
+        - 'last_point': The value of each result_name at the stop time (the default).
+        - 'statistics': Each statistic of each result_name, e.g. the mean.
+        Only supported by apis offering this return_option, e.g. the FMU_API.
+    :param int batch_size:
+        Maximal number of samples per call of simulate.
+        Default is None, all samples of an analysis at once.
+    :keyword:
+        All further keyword arguments are passed to the
+        simulate function of the api, e.g. the inputs.
+    """
+
+    def __init__(self,
+                 sim_api: SimulationAPI,
+                 names: List[str],
+                 bounds: Dict[str, Tuple[float, float]] = None,
+                 return_option: str = "last_point",
+                 batch_size: int = None,
+                 **kwargs):
+        if return_option not in ("last_point", "statistics"):
+            raise ValueError(f"Given return_option '{return_option}' is not supported. "
+                             f"Supported are 'last_point' and 'statistics'.")
+        self.sim_api = sim_api
+        self.names = list(names)
+        self.bounds = get_bounds(sim_api=sim_api, names=self.names, bounds=bounds)
+        self.return_option = return_option
+        self.batch_size = batch_size
+        self.simulate_kwargs = kwargs
+        self.metric_names: List[str] = None
+        self._cache: Dict[str, np.ndarray] = {}
+
+    def morris(self, n_trajectories: int = 10, n_levels: int = 4,
+               seed: int = None) -> pd.DataFrame:
+        """
+        Screen the parameters using the elementary effects of Morris.
+        Each trajectory changes one parameter after another by
+        delta = n_levels / (2 * (n_levels - 1)) in the unit cube,
+        requiring n_trajectories * (len(names) + 1) simulations.
+
+        :param int n_trajectories:
+            Number of trajectories. Default is 10.
+        :param int n_levels:
+            Number of levels of the grid, should be even. Default is 4.
+        :param int seed:
+            Seed of the random number generator
+
+        :return: pd.DataFrame
+            Index are the metric and the parameter. Columns are the mean
+            'mu', the mean of the absolute values 'mu_star' and the standard
+            deviation 'sigma' of the elementary effects. Effects are the
+            change of the metric per change of the parameter in the
+            unit cube, i.e. relative to the range of the bounds.
+        """
+        if n_levels < 2:
+            raise ValueError("n_levels has to be at least 2")
+        n_params = len(self.names)
+        rng = np.random.default_rng(seed)
+        delta = n_levels / (2 * (n_levels - 1))
+        # Levels from which a step of +delta stays in the unit cube
+        grid = np.arange(n_levels) / (n_levels - 1)
+        grid = grid[grid <= 1 - delta + 1e-12]
+        base = rng.choice(grid, size=(n_trajectories, n_params))
+        directions = rng.choice([-1, 1], size=(n_trajectories, n_params))
+        order = np.argsort(rng.random((n_trajectories, n_params)), axis=1)
+        # Start at the upper level for negative steps
+        start = base + delta * (directions < 0)
+        steps = np.zeros((n_trajectories, n_params, n_params))
+        trajectories_idx = np.arange(n_trajectories)[:, None]
+        steps[trajectories_idx, np.arange(n_params)[None, :], order] = \
+            delta * np.take_along_axis(directions, order, axis=1)
+        samples = np.concatenate([start[:, None, :],
+                                  start[:, None, :] + np.cumsum(steps, axis=1)], axis=1)
+        metrics = self.evaluate(samples.reshape(-1, n_params))
+        metrics = metrics.reshape(n_trajectories, n_params + 1, -1)
+        # Effect of the step j is assigned to the parameter changed in this step
+        step_sizes = delta * np.take_along_axis(directions, order, axis=1)
+        effects = np.empty((n_trajectories, n_params, metrics.shape[2]))
+        effects[trajectories_idx, order] = np.diff(metrics, axis=1) / step_sizes[:, :, None]
+        with np.errstate(invalid="ignore"):
+            return self._to_frame({
+                "mu": np.nanmean(effects, axis=0),
+                "mu_star": np.nanmean(np.abs(effects), axis=0),
+                "sigma": np.nanstd(effects, axis=0, ddof=1) if n_trajectories > 1
+                else np.full(effects.shape[1:], np.nan)
+            })
+
+    def sobol(self, n_samples: int = 256, seed: int = None) -> pd.DataFrame:
+        """
+        Calculate the first-order and total Sobol indices using the
+        sampling design of Saltelli, requiring n_samples * (len(names) + 2)
+        simulations. The first-order indices are estimated as proposed
+        by Saltelli et al. (2010), the total indices as proposed by Jansen.
+
+        :param int n_samples:
+            Number of base samples, should be a power of two. Default is 256.
+        :param int seed:
+            Seed of the scrambling of the Sobol sequence
+
+        :return: pd.DataFrame
+            Index are the metric and the parameter.
+            Columns are the first-order 'S1' and total 'ST' indices.
+        """
+        n_params = len(self.names)
+        base = sample_unit_cube(design="sobol", n_dim=2 * n_params,
+                                n_samples=n_samples, seed=seed)
+        samples_a, samples_b = base[:, :n_params], base[:, n_params:]
+        # AB_i equals A with the column i of B
+        samples_ab = np.repeat(samples_a[None, :, :], n_params, axis=0)
+        samples_ab[np.arange(n_params), :, np.arange(n_params)] = samples_b.T
+        metrics = self.evaluate(np.concatenate([samples_a, samples_b,
+                                                samples_ab.reshape(-1, n_params)]))
+        metrics_a = metrics[:n_samples]
+        metrics_b = metrics[n_samples:2 * n_samples]
+        metrics_ab = metrics[2 * n_samples:].reshape(n_params, n_samples, -1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = np.nanvar(np.concatenate([metrics_a, metrics_b]), axis=0)
+            return self._to_frame({
+                "S1": np.nanmean(metrics_b * (metrics_ab - metrics_a), axis=1) / variance,
+                "ST": 0.5 * np.nanmean((metrics_a - metrics_ab) ** 2, axis=1) / variance
+            })
+
+    def evaluate(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Simulate the given samples and return their metrics.
+        Only samples not yet simulated are simulated.
+
+        :param np.ndarray samples:
+            Samples in the unit cube, one row per sample
+            and one column per parameter in names.
+        :return: np.ndarray
+            One row per sample and one column per metric, see metric_names.
+            Failed simulations result in rows of NaN.
+        """
+        values = self.bounds["min"].to_numpy() + samples * (
+            self.bounds["max"] - self.bounds["min"]).to_numpy()
+        is_integer = self.bounds["integer"].to_numpy()
+        values[:, is_integer] = np.round(values[:, is_integer])
+        values, inverse = np.unique(values, axis=0, return_inverse=True)
+        keys = [design_point_id(dict(zip(self.names, row))) for row in values]
+        # Failed simulations are not cached and simulated again in the next call
+        results_of_keys = {key: self._cache[key] for key in keys if key in self._cache}
+        missing = [idx for idx, key in enumerate(keys) if key not in self._cache]
+        batch_size = len(missing) if self.batch_size is None else self.batch_size
+        for start in range(0, len(missing), max(batch_size, 1)):
+            batch = missing[start:start + batch_size]
+            results = self.sim_api.simulate(
+                parameters=[dict(zip(self.names, values[idx])) for idx in batch],
+                return_option=self.return_option,
+                **self.simulate_kwargs
+            )
+            if len(batch) == 1:
+                results = [results]
+            for idx, result in zip(batch, results):
+                results_of_keys[keys[idx]] = self._get_metrics(result)
+                if results_of_keys[keys[idx]] is not None:
+                    self._cache[keys[idx]] = results_of_keys[keys[idx]]
+        n_metrics = len(self.metric_names) if self.metric_names is not None else 0
+        metrics = np.array([results_of_keys[key] if results_of_keys[key] is not None
+                            else np.full(n_metrics, np.nan) for key in keys])
+        n_failed = sum(results_of_keys[key] is None for key in keys)
+        if n_failed:
+            self.sim_api.logger.warning("%s of %s simulations failed, the indices "
+                                        "ignore their metrics.", n_failed, len(keys))
+        return metrics[inverse.reshape(-1)]
+
+    def _get_metrics(self, result) -> np.ndarray:
+        """Convert the result of a simulation into the vector of its metrics"""
+        if result is None:
+            return None
+        if self.return_option == "last_point":
+            names = list(result.keys())
+            metrics = np.array(list(result.values()), dtype=float)
+        else:
+            names = [f"{statistic}_{name}" for statistic in result.index
+                     for name in result.columns]
+            metrics = result.to_numpy(dtype=float).ravel()
+        if self.metric_names is None:
+            self.metric_names = names
+        return metrics
+
+    def _to_frame(self, indices: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """Convert the indices of shape (parameters, metrics) into a DataFrame"""
+        index = pd.MultiIndex.from_product([self.metric_names, self.names],
+                                           names=["metric", "parameter"])
+        return pd.DataFrame({key: value.T.ravel() for key, value in indices.items()},
+                            index=index)
@@ -0,0 +1,181 @@
+"""
+Module to exchange large arrays between the main process and
+the workers of a process pool using shared memory.
+Only small handles are pickled, instead of the arrays themselves.
+Requires python >= 3.8. For older versions, ``SHARED_MEMORY_AVAILABLE``
+is False and the simulation APIs pickle all data.
+"""
+
+from typing import List, Union
+import numpy as np
+import pandas as pd
+from ebcpy.data_types import TimeSeriesData
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+    SHARED_MEMORY_AVAILABLE = True
+except ImportError:
+    SHARED_MEMORY_AVAILABLE = False
+
+
+def ensure_resource_tracker():
+    """
+    Start the resource tracker of the main process, if not already running.
+    Call this before starting a pool, so that the workers share the resource
+    tracker of the main process instead of starting their own ones, which
+    would unlink the blocks of the main process at their shutdown.
+    """
+    if SHARED_MEMORY_AVAILABLE and hasattr(resource_tracker, "ensure_running"):
+        resource_tracker.ensure_running()
+
+
+def _attach(name: str):
+    """
+    Attach to an existing block of shared memory.
+    Workers of a pool share the resource tracker of the main process,
+    which only unlinks blocks not freed by the main process.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # track was added in python 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedArray:
+    """
+    Picklable handle to a numpy array inside a block of shared memory.
+
+    :param str name:
+        Name of the block of shared memory
+    :param tuple shape:
+        Shape of the array
+    :param np.dtype dtype:
+        Data type of the array
+    :param int offset:
+        Offset of the array in bytes from the start of the block
+    """
+
+    def __init__(self, name: str, shape: tuple, dtype: np.dtype, offset: int = 0):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.offset = offset
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the array in bytes"""
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def read(self) -> np.ndarray:
+        """Return a copy of the array"""
+        shm = _attach(self.name)
+        try:
+            return self._view(shm).copy()
+        finally:
+            shm.close()
+
+    def write(self, array: np.ndarray):
+        """Write the given array into the shared memory"""
+        shm = _attach(self.name)
+        try:
+            self._view(shm)[...] = array
+        finally:
+            shm.close()
+
+    def _view(self, shm) -> np.ndarray:
+        return np.ndarray(self.shape, dtype=self.dtype,
+                          buffer=shm.buf, offset=self.offset)
+
+
+class SharedBlock:
+    """
+    Block of shared memory owned by the main process.
+    Arrays are placed one after another into the block. Close the
+    block after all workers are done to free the memory.
+
+    :param int nbytes:
+        Size of the block in bytes
+    """
+
+    _alignment = 64
+
+    def __init__(self, nbytes: int):
+        self._shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        self._offset = 0
+
+    @classmethod
+    def required_bytes(cls, arrays: List[Union[np.ndarray, SharedArray]]) -> int:
+        """Return the size of a block holding all given arrays"""
+        return sum(-(-array.nbytes // cls._alignment) * cls._alignment for array in arrays)
+
+    def allocate(self, shape: tuple, dtype: np.dtype) -> SharedArray:
+        """Reserve space for an array with the given shape and dtype"""
+        shared_array = SharedArray(name=self._shm.name, shape=shape,
+                                   dtype=dtype, offset=self._offset)
+        if self._offset + shared_array.nbytes > self._shm.size:
+            raise MemoryError("Shared memory block is too small for the given array.")
+        self._offset += -(-shared_array.nbytes // self._alignment) * self._alignment
+        return shared_array
+
+    def put(self, array: np.ndarray) -> SharedArray:
+        """Copy the given array into the block"""
+        array = np.ascontiguousarray(array)
+        shared_array = self.allocate(shape=array.shape, dtype=array.dtype)
+        shared_array._view(self._shm)[...] = array  # pylint: disable=protected-access
+        return shared_array
+
+    def read(self, shared_array: SharedArray) -> np.ndarray:
+        """Return a copy of an array of this block without attaching again"""
+        return shared_array._view(self._shm).copy()  # pylint: disable=protected-access
+
+    def close(self):
+        """Close and free the block"""
+        self._shm.close()
+        self._shm.unlink()
+
+
+class SharedDataFrame:
+    """
+    Picklable handle to a DataFrame or TimeSeriesData with numeric
+    values and a numeric index stored in shared memory.
+    The columns and attrs are pickled, as they are small.
+    """
+
+    def __init__(self, values: SharedArray, index: SharedArray,
+                 columns: pd.Index, index_name: str = None, is_tsd: bool = False,
+                 attrs: dict = None):
+        self.values = values
+        self.index = index
+        self.columns = columns
+        self.index_name = index_name
+        self.is_tsd = is_tsd
+        self.attrs = attrs or {}
+
+    @staticmethod
+    def is_supported(df) -> bool:
+        """Check if the given object can be shared"""
+        return (isinstance(df, pd.DataFrame) and
+                len(set(df.dtypes)) == 1 and
+                np.issubdtype(df.dtypes.iloc[0], np.number) and
+                np.issubdtype(df.index.dtype, np.number))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, block: SharedBlock) -> "SharedDataFrame":
+        """Copy the given DataFrame into the given block"""
+        return cls(values=block.put(df.to_numpy()),
+                   index=block.put(df.index.to_numpy()),
+                   columns=df.columns,
+                   index_name=df.index.name,
+                   is_tsd=isinstance(df, TimeSeriesData),
+                   attrs=dict(df.attrs))
+
+    def to_frame(self, values: np.ndarray = None, index: np.ndarray = None):
+        """Build the DataFrame. Arrays not given are read from the shared memory."""
+        df = pd.DataFrame(self.values.read() if values is None else values,
+                          index=pd.Index(self.index.read() if index is None else index,
+                                         name=self.index_name),
+                          columns=self.columns)
+        if self.is_tsd:
+            df = TimeSeriesData(df)
+        df.attrs.update(self.attrs)
+        return df
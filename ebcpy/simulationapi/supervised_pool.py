@@ -0,0 +1,222 @@
+"""
+Module with a pool of processes which supervises its workers.
+Contrary to multiprocessing.Pool, a task running longer than a given
+wall-clock time or crashing its worker, e.g. due to a segmentation fault
+in a native solver, does not stall or abort the whole batch. The worker
+is killed, respawned using the initializer of the pool and the task is
+retried. Tasks failing on every attempt are reported.
+"""
+
+import time
+import logging
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from collections import deque
+from typing import Callable, Dict
+
+
+class _TaskError:
+    """Error raised by a task, picklable even if the error itself is not"""
+
+    def __init__(self, error: Exception):
+        self.error = error
+        self.text = f"{type(error).__name__}: {error}"
+
+
+def _supervised_worker(conn, initializer: Callable, initargs: tuple):
+    """Loop of a worker process, running the tasks received over conn"""
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break  # The parent is gone
+        if task is None:
+            break
+        func, argument = task
+        try:
+            result = (True, func(argument))
+        except Exception as err:  # pylint: disable=broad-except
+            result = (False, _TaskError(err))
+        try:
+            conn.send(result)
+        except Exception as err:  # pylint: disable=broad-except
+            conn.send((False, _TaskError(RuntimeError(f"Could not send result: {err}"))))
+
+
+class _Worker:
+    """Process of the pool and the connection to it"""
+
+    def __init__(self, initializer: Callable, initargs: tuple):
+        self.conn, child_conn = mp.Pipe()
+        self.process = mp.Process(target=_supervised_worker,
+                                  args=(child_conn, initializer, initargs),
+                                  daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task_idx = None
+        self.start_time = None
+
+    def kill(self):
+        """Kill the process, e.g. if hanging"""
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SupervisedPool:
+    """
+    Pool of processes with the same map function and
+    initializer as multiprocessing.Pool, supervising its workers.
+
+    :param int processes:
+        Number of worker processes
+    :param callable initializer:
+        Called with initargs in each started or respawned worker
+    :param tuple initargs:
+        Arguments of the initializer
+    :param float task_timeout:
+        Maximal wall-clock time of a task in seconds. The worker of a task
+        running longer is killed and respawned. Default is None, no limit.
+    :param int max_retries:
+        Number of times a task is retried, if it timed out, crashed its
+        worker or raised an error. Default is 0.
+    :param logging.Logger logger:
+        Logger to report failed attempts to.
+    """
+
+    def __init__(self,
+                 processes: int,
+                 initializer: Callable = None,
+                 initargs: tuple = (),
+                 task_timeout: float = None,
+                 max_retries: int = 0,
+                 logger: logging.Logger = None):
+        self._initializer = initializer
+        self._initargs = initargs
+        self.task_timeout = task_timeout
+        self.max_retries = max_retries
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        # Index of failed tasks and the reason of the failure of the last map
+        self.failures: Dict[int, str] = {}
+        self._workers = [_Worker(initializer, initargs) for _ in range(processes)]
+        self._closed = False
+
+    def map(self, func: Callable, iterable) -> list:
+        """
+        Apply func to each item of the iterable on the workers.
+        Tasks which timed out or crashed their worker on every attempt
+        return None and are listed in ``failures``. If a task raised an
+        error on every attempt, the first of these errors is raised
+        after all other tasks finished, as done by multiprocessing.Pool.
+        """
+        if self._closed:
+            raise ValueError("Pool not running")
+        arguments = list(iterable)
+        results = [None] * len(arguments)
+        attempts = [0] * len(arguments)
+        pending = deque(range(len(arguments)))
+        errors = {}
+        self.failures = {}
+
+        def _failed(task_idx: int, reason: str, error: _TaskError = None):
+            attempts[task_idx] += 1
+            if attempts[task_idx] <= self.max_retries:
+                self.logger.warning("Task %s failed (%s), retrying. Attempt %s of %s.",
+                                    task_idx, reason, attempts[task_idx] + 1,
+                                    self.max_retries + 1)
+                pending.appendleft(task_idx)
+            elif error is not None:
+                errors[task_idx] = error
+            else:
+                self.logger.error("Task %s failed (%s) on all %s attempts.",
+                                  task_idx, reason, attempts[task_idx])
+                self.failures[task_idx] = reason
+
+        while True:
+            for worker in list(self._workers):
+                if worker.task_idx is not None or not pending:
+                    continue
+                if not worker.process.is_alive():
+                    # Died while idle, e.g. killed by the OOM killer
+                    self.logger.warning("Idle worker died with exit code %s, respawning it.",
+                                        worker.process.exitcode)
+                    worker = self._respawn(worker)
+                task_idx = pending.popleft()
+                try:
+                    worker.conn.send((func, arguments[task_idx]))
+                except OSError:
+                    # Died right before sending, the task was not started
+                    pending.appendleft(task_idx)
+                    self._respawn(worker)
+                    continue
+                worker.task_idx = task_idx
+                worker.start_time = time.monotonic()
+            busy = [worker for worker in self._workers if worker.task_idx is not None]
+            if not busy:
+                if pending:
+                    continue
+                break
+            timeout = None
+            if self.task_timeout is not None:
+                timeout = max(0.0, min(worker.start_time + self.task_timeout
+                                       for worker in busy) - time.monotonic())
+            wait([worker.conn for worker in busy] +
+                 [worker.process.sentinel for worker in busy], timeout=timeout)
+            for worker in busy:
+                task_idx = worker.task_idx
+                try:
+                    has_result = worker.conn.poll()
+                except (OSError, EOFError):
+                    has_result = False
+                if has_result:
+                    try:
+                        success, result = worker.conn.recv()
+                    except (OSError, EOFError):
+                        has_result = False
+                if has_result:
+                    worker.task_idx = None
+                    if success:
+                        results[task_idx] = result
+                    else:
+                        _failed(task_idx, result.text, error=result)
+                elif not worker.process.is_alive():
+                    self._respawn(worker)
+                    _failed(task_idx, f"worker crashed with exit "
+                                      f"code {worker.process.exitcode}")
+                elif (self.task_timeout is not None and
+                      time.monotonic() - worker.start_time > self.task_timeout):
+                    self._respawn(worker)
+                    _failed(task_idx, f"timeout of {self.task_timeout} s exceeded")
+        if errors:
+            raise errors[min(errors)].error
+        return results
+
+    def _respawn(self, worker: _Worker) -> _Worker:
+        """Kill the given worker and start a new one at its place"""
+        worker.kill()
+        new_worker = _Worker(self._initializer, self._initargs)
+        self._workers[self._workers.index(worker)] = new_worker
+        return new_worker
+
+    def close(self):
+        """Stop the workers after their current task"""
+        self._closed = True
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+
+    def join(self):
+        """Wait for the workers to exit, requires close() or terminate() first"""
+        for worker in self._workers:
+            worker.process.join()
+            worker.conn.close()
+
+    def terminate(self):
+        """Kill all workers immediately"""
+        self._closed = True
+        for worker in self._workers:
+            worker.process.kill()
@@ -0,0 +1,276 @@
+"""
+Module to create designs of experiments for the parameters of a
+simulation api and to simulate them as a resumable parameter sweep.
+The bounds of the parameters are taken from the min and max of the
+variables in ``sim_api.parameters``, unless given explicitly.
+
+Example:
+
+>>> from ebcpy.simulationapi.result_store import SweepResultStore
+>>> from ebcpy.simulationapi.sweep import ParameterSweep, create_design
+>>> design = create_design(sim_api, names=["TAmb", "heatCapacitor.C"],
+>>>                        design="latin_hypercube", n_samples=1000,
+>>>                        bounds={"TAmb": (273.15, 303.15)})
+>>> sweep = ParameterSweep(sim_api, design=design,
+>>>                        result_store=SweepResultStore("sweep.hdf"))
+>>> run_table = sweep.run()
+"""
+
+import json
+import hashlib
+import itertools
+from typing import Dict, List, Tuple, Union
+import numpy as np
+import pandas as pd
+from ebcpy.simulationapi import SimulationAPI
+from ebcpy.simulationapi.result_store import SweepResultStore
+
+# pylint: disable=import-outside-toplevel
+
+DESIGNS = ["full_factorial", "latin_hypercube", "sobol", "halton", "random"]
+
+
+def design_point_id(parameters: dict) -> str:
+    """
+    Return the key of the design point with the given parameters.
+    The key only depends on the names and values, not on their order.
+    """
+    values = sorted((name, float(value)) for name, value in parameters.items())
+    return hashlib.sha1(json.dumps(values).encode()).hexdigest()[:16]
+
+
+def get_bounds(sim_api: SimulationAPI,
+               names: List[str],
+               bounds: Dict[str, Tuple[float, float]] = None) -> pd.DataFrame:
+    """
+    Get the bounds of the given parameters. Explicitly given bounds
+    overwrite the min and max of the variables in sim_api.parameters.
+    Boolean parameters are bounded by 0 and 1.
+
+    :return: pd.DataFrame
+        Index are the names, columns are 'min', 'max' and 'integer'.
+    """
+    if bounds is None:
+        bounds = {}
+    rows = {}
+    for name in names:
+        if name not in sim_api.parameters and name not in bounds:
+            raise KeyError(f"Parameter '{name}' is not a parameter of the model "
+                           f"and has no given bounds.")
+        variable = sim_api.parameters.get(name, None)
+        _type = None if variable is None else variable.type
+        if name in bounds:
+            _min, _max = bounds[name]
+        elif _type in (bool, "Boolean"):
+            _min, _max = 0, 1
+        else:
+            _min, _max = variable.min, variable.max
+        if not np.isfinite(_min) or not np.isfinite(_max):
+            raise ValueError(f"Parameter '{name}' has no finite bounds. "
+                             f"Pass them using the argument bounds.")
+        if _min > _max:
+            raise ValueError(f"Lower bound of parameter '{name}' is greater than the upper bound.")
+        rows[name] = {"min": _min, "max": _max,
+                      "integer": _type in (bool, int, "Boolean", "Integer")}
+    return pd.DataFrame(rows).transpose().astype({"min": float, "max": float, "integer": bool})
+
+
+def create_design(sim_api: SimulationAPI,
+                  names: List[str],
+                  design: str = "latin_hypercube",
+                  n_samples: int = None,
+                  levels: Union[int, Dict[str, int]] = 3,
+                  bounds: Dict[str, Tuple[float, float]] = None,
+                  seed: int = None) -> pd.DataFrame:
+    """
+    Create a design of experiments for the given parameters.
+    Integer and boolean parameters are rounded and duplicated
+    design points are dropped.
+
+    :param SimulationAPI sim_api:
+        Api with the parameters of the model
+    :param list names:
+        Names of the parameters to vary
+    :param str design:
+        Type of the design, see DESIGNS. Options are:
+        - 'full_factorial': All combinations of the given levels.
+        - 'latin_hypercube': Latin hypercube sampling.
+        - 'sobol': Scrambled Sobol sequence. Use a power of two
+        as n_samples to keep its balance properties.
+        - 'halton': Scrambled Halton sequence.
+        - 'random': Uniform random sampling.
+        Default is 'latin_hypercube'.
+    :param int n_samples:
+        Number of samples. Required for all designs
+        but the full factorial one.
+    :param (int, dict) levels:
+        Number of equidistant levels of each parameter for the full
+        factorial design, for all parameters or per name. Default is 3.
+    :param dict bounds:
+        Bounds (min, max) of the parameters. Overwrites the
+        min and max of the variables in sim_api.parameters.
+    :param int seed:
+        Seed of the random number generator
+
+    :return: pd.DataFrame
+        One row per design point, one column per parameter. The
+        index holds the key of each design point, see design_point_id.
+    """
+    if design not in DESIGNS:
+        raise ValueError(f"Given design '{design}' is not supported. "
+                         f"Supported are {', '.join(DESIGNS)}.")
+    _bounds = get_bounds(sim_api=sim_api, names=names, bounds=bounds)
+    if design == "full_factorial":
+        if isinstance(levels, int):
+            levels = {name: levels for name in names}
+        grids = []
+        for name in names:
+            _levels = levels[name]
+            if _bounds.loc[name, "integer"]:
+                # Not more levels than integers in the bounds
+                _levels = min(_levels, int(_bounds.loc[name, "max"] - _bounds.loc[name, "min"]) + 1)
+            grids.append(np.linspace(0, 1, _levels) if _levels > 1 else np.array([0.5]))
+        samples = np.array(list(itertools.product(*grids))).reshape(-1, len(names))
+    else:
+        if n_samples is None:
+            raise ValueError(f"n_samples is required for the design '{design}'.")
+        samples = sample_unit_cube(design=design, n_dim=len(names),
+                                   n_samples=n_samples, seed=seed)
+    values = _bounds["min"].to_numpy() + samples * (_bounds["max"] - _bounds["min"]).to_numpy()
+    is_integer = _bounds["integer"].to_numpy()
+    values[:, is_integer] = np.round(values[:, is_integer])
+    df = pd.DataFrame(values, columns=names).drop_duplicates()
+    df.index = pd.Index([design_point_id(row) for row in df.to_dict("records")],
+                        name="design_point")
+    return df
+
+
+def sample_unit_cube(design: str, n_dim: int, n_samples: int, seed: int = None) -> np.ndarray:
+    """
+    Sample points in the unit cube.
+
+    :param str design:
+        Sampling design, one of 'random', 'latin_hypercube', 'sobol' or 'halton'
+    :param int n_dim:
+        Number of dimensions
+    :param int n_samples:
+        Number of points
+    :param int seed:
+        Seed of the random number generator. Default is None.
+    :return: np.ndarray
+        Array of shape (n_samples, n_dim) with values in [0, 1)
+    """
+    if design == "random":
+        return np.random.default_rng(seed).random((n_samples, n_dim))
+    try:
+        from scipy.stats import qmc
+    except ImportError as err:
+        raise ImportError(f"The design '{design}' requires scipy>=1.7.0. "
+                          f"Upgrade scipy or use the design 'random'.") from err
+    if design == "latin_hypercube":
+        sampler = qmc.LatinHypercube(d=n_dim, seed=seed)
+    elif design == "sobol":
+        sampler = qmc.Sobol(d=n_dim, scramble=True, seed=seed)
+    else:
+        sampler = qmc.Halton(d=n_dim, scramble=True, seed=seed)
+    return sampler.random(n_samples)
+
+
+class ParameterSweep:
+    """
+    Simulate a design of experiments and store the results in
+    a SweepResultStore. The design is simulated in batches using the
+    parallel simulation path of the api, so that only one batch of
+    results is held in memory at a time. Design points already
+    present in the store are skipped, so an interrupted or killed
+    sweep is resumed by running it again on the same store.
+
+    Requires an api supporting the keyword ``result_store``, e.g. the FMU_API.
+
+    :param SimulationAPI sim_api:
+        Api to simulate the design with
+    :param pd.DataFrame design:
+        Design with one row per design point and one column
+        per parameter, e.g. created by create_design.
+    :param SweepResultStore result_store:
+        Store for the results of all design points.
+    """
+
+    def __init__(self,
+                 sim_api: SimulationAPI,
+                 design: pd.DataFrame,
+                 result_store: SweepResultStore):
+        self.sim_api = sim_api
+        self.result_store = result_store
+        self.design = design.drop_duplicates()
+        self.design.index = pd.Index([design_point_id(row) for row in
+                                      self.design.to_dict("records")],
+                                     name="design_point")
+
+    def get_pending_design(self) -> pd.DataFrame:
+        """Return the design points without results in the store"""
+        return self.design.loc[~self.design.index.isin(self.run_table().index)]
+
+    def run(self, batch_size: int = None, **kwargs) -> pd.DataFrame:
+        """
+        Simulate all pending design points.
+
+        :param int batch_size:
+            Number of design points simulated per call of
+            simulate. Default is 16 times n_cpu of the api.
+        :keyword:
+            All further keyword arguments are passed to the
+            simulate function of the api, e.g. the inputs.
+
+        :return: pd.DataFrame
+            The run table, see run_table()
+        """
+        if batch_size is None:
+            batch_size = 16 * self.sim_api.n_cpu
+        pending = self.get_pending_design()
+        self.sim_api.logger.info("Simulating %s of %s design points, %s are already stored",
+                                 len(pending), len(self.design),
+                                 len(self.design) - len(pending))
+        with self.result_store:
+            for start in range(0, len(pending), batch_size):
+                batch = pending.iloc[start:start + batch_size]
+                self.sim_api.simulate(parameters=self._get_parameter_sets(batch),
+                                      return_option="savepath",
+                                      result_store=self.result_store,
+                                      **kwargs)
+                self.sim_api.logger.info("Simulated %s of %s design points",
+                                         start + len(batch), len(pending))
+        return self.run_table()
+
+    def _get_parameter_sets(self, design: pd.DataFrame) -> List[dict]:
+        """Convert the design points to parameter sets with the types of the parameters"""
+        design = design.copy()
+        for name in design.columns:
+            variable = self.sim_api.parameters.get(name, None)
+            if variable is not None and variable.type in (bool, "Boolean"):
+                design[name] = design[name].astype(bool)
+            elif variable is not None and variable.type in (int, "Integer"):
+                design[name] = design[name].astype(int)
+        return design.to_dict("records")
+
+    def run_table(self) -> pd.DataFrame:
+        """
+        Return the table of all runs in the store belonging to the
+        parameters of the design, keyed by the design point. Columns
+        are the parameters and the run_id of the result in the store.
+        If a design point was simulated more than once, the latest
+        run is used. Runs of an interrupted sweep are included, as
+        each run is stored with its parameters, see
+        SweepResultStore.read_parameters.
+        """
+        parameters = self.result_store.read_parameters()
+        columns = list(self.design.columns)
+        if parameters.empty or not set(columns).issubset(parameters.columns):
+            return pd.DataFrame(columns=columns + ["run_id"],
+                                index=pd.Index([], name="design_point"))
+        parameters = parameters[columns].dropna().reset_index()
+        parameters.index = pd.Index([design_point_id(row) for row in
+                                     parameters[columns].to_dict("records")],
+                                    name="design_point")
+        parameters = parameters[~parameters.index.duplicated(keep="last")]
+        return parameters[columns + ["run_id"]]
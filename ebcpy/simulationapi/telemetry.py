@@ -0,0 +1,167 @@
+"""
+Module to collect structured telemetry of each simulation, e.g. to find
+out which phase of a large sweep got slower. Workers record the wall
+time of the phases of each simulation, the simulation APIs collect
+the records in the main process. Enable it using the keyword
+``telemetry`` of the simulation APIs.
+"""
+
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+import pandas as pd
+
+# Phases of a simulation, as recorded by the simulation APIs:
+# - setup: Set up or check the simulation program and the given arguments
+# - input_conversion: Convert the inputs into the format of the program
+# - set_parameters: Set parameters and initialize the model
+# - solve: Run the solver
+# - result_conversion: Convert, reshape or save the results
+# - transfer: Exchange arguments and results with the workers
+PHASES = ["setup", "input_conversion", "set_parameters",
+          "solve", "result_conversion", "transfer"]
+
+_ACTIVE = threading.local()
+
+
+class RunTelemetry:
+    """
+    Telemetry of a single simulation, recorded in the worker.
+
+    :param int run:
+        Index of the simulation in its batch
+    :param int worker:
+        Index of the worker, see SimulationAPI.worker_idx
+    :param float submitted:
+        Unix time at which the simulation was submitted to the pool
+    """
+
+    def __init__(self, run: int, worker: int = None, submitted: float = None):
+        self.run = run
+        self.worker = worker
+        self.start_time = time.time()
+        self.queue_wait = 0.0 if submitted is None else max(0.0, self.start_time - submitted)
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.counters = {}
+        self._start = time.perf_counter()
+        self.wall_time = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Add the wall time of the block to the given phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, value: int = 1):
+        """Increase the given counter, e.g. the number of steps"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self):
+        """Stop the wall time of the simulation"""
+        self.wall_time = time.perf_counter() - self._start
+
+    def to_dict(self) -> dict:
+        """Return the record as a flat dict"""
+        return {"run": self.run,
+                "worker": self.worker,
+                "start_time": self.start_time,
+                "queue_wait": self.queue_wait,
+                "wall_time": self.wall_time,
+                **self.phases,
+                **self.counters}
+
+
+def active() -> Optional[RunTelemetry]:
+    """Return the telemetry of the simulation running in the current thread, if any"""
+    return getattr(_ACTIVE, "run", None)
+
+
+@contextmanager
+def record_run(run: int, worker: int = None, submitted: float = None):
+    """Record the telemetry of the simulation running in the block"""
+    run_telemetry = RunTelemetry(run=run, worker=worker, submitted=submitted)
+    _ACTIVE.run = run_telemetry
+    try:
+        yield run_telemetry
+    finally:
+        run_telemetry.finish()
+        _ACTIVE.run = None
+
+
+@contextmanager
+def phase(name: str):
+    """Add the wall time of the block to the given phase of the active simulation"""
+    run_telemetry = active()
+    if run_telemetry is None:
+        yield
+        return
+    with run_telemetry.phase(name):
+        yield
+
+
+def count(name: str, value: int = 1):
+    """Increase the given counter of the active simulation"""
+    run_telemetry = active()
+    if run_telemetry is not None:
+        run_telemetry.count(name, value)
+
+
+class SimulationTelemetry:
+    """
+    Records of all simulations of a simulation API, collected
+    in the main process. Each record contains the index of the
+    batch (one per call of simulate) and of the run in the batch,
+    the worker, the time spent waiting in the queue of the pool,
+    the wall time in the worker, the wall time of each of the PHASES
+    and counters like the number of steps, where available.
+
+    :param callable callback:
+        Optional function called with each record as dict,
+        once the batch of the simulation finished.
+    """
+
+    def __init__(self, callback: Callable[[dict], None] = None):
+        self.callback = callback
+        self.records: List[dict] = []
+        self._n_batches = 0
+
+    def new_batch(self) -> int:
+        """Return the index of a new batch"""
+        self._n_batches += 1
+        return self._n_batches - 1
+
+    def add(self, record: dict, batch: int):
+        """Add the record of a simulation of the given batch"""
+        record = {"batch": batch, **record}
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def clear(self):
+        """Delete all records"""
+        self.records = []
+        self._n_batches = 0
+
+    def to_df(self) -> pd.DataFrame:
+        """Return all records as a DataFrame with one row per simulation"""
+        return pd.DataFrame(self.records)
+
+    def to_json(self, filepath: str = None) -> str:
+        """
+        Export all records as JSON.
+
+        :param str,os.path.normpath filepath:
+            If given, the JSON is written into this file.
+        :return: str
+            The JSON string, a list with one object per simulation
+        """
+        json_str = json.dumps(self.records, default=str)
+        if filepath is not None:
+            with open(filepath, "w") as file:
+                file.write(json_str)
+        return json_str
@@ -0,0 +1,231 @@
+"""
+Module to cache translated Modelica models on disk. Translating a model
+with modifiers for structural parameters takes long, while switching
+between few modifiers is common, e.g. in sweeps over a structural
+parameter. The cache stores the artefacts of each translation, i.e. the
+executable dymosim, the dsin.txt and the variables of the model, and
+restores them instead of translating the same model again.
+"""
+
+import os
+import json
+import errno
+import time
+import shutil
+import pickle
+import hashlib
+from typing import Dict, List, Optional
+from ebcpy.utils import get_file_hash
+
+# Artefacts of a translation, as created by Dymola in its working directory
+ARTEFACTS = ["dymosim", "dymosim.exe", "dsin.txt"]
+
+
+def get_packages_hash(packages: List[str]) -> str:
+    """
+    Return a hash of the given packages. A package given by its
+    package.mo represents all .mo-files in its directory. To keep
+    the hash fast for large libraries, the size and the time of
+    the last modification of each file are hashed, not the content.
+
+    :param list packages:
+        Paths to the packages, e.g. the package.mo of each library
+    :return: str
+        Hex-digest, changing if any file of the packages changes
+    """
+    _hash = hashlib.sha1()
+    for package in packages:
+        package = os.path.abspath(package)
+        if os.path.basename(package) == "package.mo":
+            root = os.path.dirname(package)
+            filepaths = []
+            for dirpath, _, filenames in os.walk(root):
+                filepaths.extend(os.path.join(dirpath, filename)
+                                 for filename in filenames if filename.endswith(".mo"))
+        else:
+            root = os.path.dirname(package)
+            filepaths = [package]
+        _hash.update(root.encode())
+        for filepath in sorted(filepaths):
+            try:
+                stat = os.stat(filepath)
+            except OSError:
+                continue  # Deleted while walking
+            _hash.update(f"{os.path.relpath(filepath, root)}|{stat.st_size}|"
+                         f"{stat.st_mtime_ns}".encode())
+    return _hash.hexdigest()
+
+
+class TranslationCache:
+    """
+    Bounded on-disk store of translated models, one entry per model name
+    including its modifiers. Entries are keyed by the full model name,
+    the hash of the packages, see get_packages_hash, the Dymola executable
+    and the script run before loading the packages, see get_key. Hence,
+    editing a package or changing the setup of Dymola invalidates all
+    translations. If more than max_entries
+    are stored, the least recently used entries are deleted.
+
+    :param str,os.path.normpath cache_dir:
+        Directory to store the entries in.
+    :param int max_entries:
+        Maximal number of stored translations. Default is 10.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = 10):
+        if max_entries < 1:
+            raise ValueError("max_entries has to be at least 1")
+        self.cache_dir = str(cache_dir)
+        self.max_entries = max_entries
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def get_key(model_name: str, packages: List[str],
+                dymola_path: str = None, mos_script_pre: str = None) -> str:
+        """
+        Return the key of the translation of the given model.
+
+        :param str model_name:
+            Full name of the model, including its modifiers
+        :param list packages:
+            Paths to the packages, see get_packages_hash
+        :param str,os.path.normpath dymola_path:
+            Path of the Dymola executable translating the model. Default is None.
+        :param str,os.path.normpath mos_script_pre:
+            Path of the script executed before loading the packages, e.g.
+            to set flags of the translation. Its content is part of the key.
+            Default is None.
+        :return: str
+            Key of the translation
+        """
+        mos_script_hash = None
+        if mos_script_pre is not None and os.path.isfile(mos_script_pre):
+            mos_script_hash = get_file_hash(mos_script_pre)
+        return hashlib.sha1(json.dumps(
+            [model_name, get_packages_hash(packages),
+             None if dymola_path is None else str(dymola_path), mos_script_hash]
+        ).encode()).hexdigest()[:16]
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.isfile(os.path.join(self._entry_dir(key), "variables.pickle"))
+
+    @property
+    def keys(self) -> List[str]:
+        """Keys of all entries, the least recently used first"""
+        keys = [key for key in os.listdir(self.cache_dir)
+                if not key.endswith((".tmp", ".deleted")) and key in self]
+        return sorted(keys, key=self._get_mtime)
+
+    def _get_mtime(self, key: str) -> float:
+        try:
+            return os.path.getmtime(self._entry_dir(key))
+        except OSError:
+            return 0.0  # Deleted by another process
+
+    def store(self, key: str, model_name: str, cd: str, variables: Dict[str, dict]):
+        """
+        Store the artefacts of the translation in cd and the variables of the model.
+        An existing entry of the key is kept.
+
+        :param str key:
+            Key of the translation, see get_key
+        :param str model_name:
+            Name of the translated model, stored for information only
+        :param str,os.path.normpath cd:
+            Directory containing the artefacts of the translation
+        :param dict variables:
+            The parameters, inputs, outputs and states of the model
+        """
+        # Entries are never replaced, as other processes may restore
+        # them meanwhile. The same key always holds the same translation.
+        if key in self:
+            return
+        entry_dir = self._entry_dir(key)
+        # Write into a temporary directory first, so that
+        # a failed store never leaves an incomplete entry.
+        tmp_dir = f"{entry_dir}_{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            for artefact in ARTEFACTS:
+                if os.path.isfile(os.path.join(cd, artefact)):
+                    shutil.copy2(os.path.join(cd, artefact), os.path.join(tmp_dir, artefact))
+            with open(os.path.join(tmp_dir, "variables.pickle"), "wb") as file:
+                pickle.dump({"model_name": model_name, "variables": variables}, file)
+            os.replace(tmp_dir, entry_dir)
+        except OSError as err:
+            # Another process stored the same key meanwhile
+            if err.errno not in (errno.ENOTEMPTY, errno.EEXIST) and key not in self:
+                raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self._evict()
+
+    def restore(self, key: str, cd: str = None) -> Optional[Dict[str, dict]]:
+        """
+        Restore the translation with the given key.
+
+        :param str key:
+            Key of the translation, see get_key
+        :param str,os.path.normpath cd:
+            If given, the artefacts are copied into this directory.
+        :return: dict
+            The variables of the model, None if the key is not cached.
+        """
+        if key not in self:
+            return None
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, "variables.pickle"), "rb") as file:
+                variables = pickle.load(file)["variables"]
+        except (pickle.UnpicklingError, EOFError, KeyError):
+            self._delete(key)
+            return None
+        except OSError:
+            return None  # Deleted meanwhile
+        try:
+            if cd is not None:
+                os.makedirs(cd, exist_ok=True)
+                for artefact in ARTEFACTS:
+                    if os.path.isfile(os.path.join(entry_dir, artefact)):
+                        shutil.copy2(os.path.join(entry_dir, artefact),
+                                     os.path.join(cd, artefact))
+            # Mark as recently used
+            now = time.time()
+            os.utime(entry_dir, (now, now))
+        except OSError:
+            return None  # Evicted by another process while copying
+        return variables
+
+    def get_artefact(self, key: str, artefact: str) -> Optional[str]:
+        """Return the path to the given artefact of the entry, if stored"""
+        filepath = os.path.join(self._entry_dir(key), artefact)
+        if key in self and os.path.isfile(filepath):
+            return filepath
+        return None
+
+    def clear(self):
+        """Delete all entries"""
+        for key in self.keys:
+            self._delete(key)
+
+    def _evict(self):
+        """Delete the least recently used entries exceeding max_entries"""
+        keys = self.keys
+        for key in keys[:max(0, len(keys) - self.max_entries)]:
+            self._delete(key)
+
+    def _delete(self, key: str):
+        """
+        Delete the entry of the given key. The entry is renamed first,
+        so no process restores it while it is partially deleted.
+        """
+        deleted_dir = f"{self._entry_dir(key)}_{os.getpid()}.deleted"
+        try:
+            os.replace(self._entry_dir(key), deleted_dir)
+        except OSError:
+            return  # Deleted by another process
+        shutil.rmtree(deleted_dir, ignore_errors=True)
@@ -4,6 +4,8 @@ Contains a statistics analyzer and a visualizer.
 """
 import logging
 import os
+import hashlib
+import shutil
 
 
 def setup_logger(name: str,
@@ -41,3 +43,40 @@ def setup_logger(name: str,
         file_handler.setFormatter(fmt=formatter)
         logger.addHandler(hdlr=file_handler)
     return logger
+
+
+def get_file_hash(filepath: str, algorithm: str = "sha256") -> str:
+    """
+    Calculate the hash of the given file. The file is read
+    in chunks to limit memory usage for large files.
+
+    :param str,os.path.normpath filepath:
+        Path to the file to hash
+    :param str algorithm:
+        Name of the hashlib algorithm to use, default is sha256
+
+    :return: str
+        Hex-digest of the file content
+    """
+    _hash = hashlib.new(algorithm)
+    with open(filepath, "rb") as file:
+        for chunk in iter(lambda: file.read(2 ** 20), b""):
+            _hash.update(chunk)
+    return _hash.hexdigest()
+
+
+def move_file(src: str, dst: str):
+    """
+    Move the file src to dst, replacing an existing file dst. On the same
+    filesystem, the file is renamed without copying its content.
+
+    :param str,os.path.normpath src:
+        Path of the file to move
+    :param str,os.path.normpath dst:
+        New path of the file
+    """
+    try:
+        os.replace(src, dst)
+    except OSError:
+        # Different filesystems
+        shutil.move(src, dst)
@@ -2,8 +2,9 @@
 Module with functions to convert
 certain format into other formats.
 """
+import os
 import pathlib
-import scipy.io as spio
+import threading
 import numpy as np
 import pandas as pd
 
@@ -21,6 +22,9 @@ def convert_tsd_to_modelica_mat(tsd, save_path_file, **kwargs):
         If no list is provided, all columns are converted.
     :keyword float offset:
         Offset for time in seconds, default 0
+    :keyword str table_name:
+        Name of the matrix in the .mat file, equal to the tableName
+        of the CombiTimeTable in Modelica. Default is 'table'.
     :returns mat_file:
         Returns the version 4 mat-file
 
@@ -49,18 +53,16 @@ def convert_tsd_to_modelica_mat(tsd, save_path_file, **kwargs):
     if not save_path_file.endswith(".mat"):
         raise ValueError("Given savepath for txt-file is not a .mat file!")
 
-    # Load the relevant part of the df
-    df_sub, _ = _convert_to_subset(
+    # Load the relevant part of the df as array with one row per column
+    data, _ = _convert_to_array(
         df=tsd,
         columns=kwargs.get("columns", None),
         offset=kwargs.get("offset", 0)
     )
-
-    # Convert np.array into a list and create a dict with 'table' as matrix name
-    new_mat = {'table': df_sub.values.tolist()}
     # Save matrix as a MATLAB *.mat file, which is readable by Modelica.
-    spio.savemat(save_path_file, new_mat, format="4")
-    # Provide user feedback whether the conversion was successful.
+    with open(save_path_file, "wb") as file:
+        _write_mat_v4_matrix(file=file, name=kwargs.get("table_name", "table"),
+                             data_transposed=data)
     return save_path_file
 
 
@@ -194,34 +196,112 @@ def convert_tsd_to_modelica_txt(tsd, table_name, save_path_file, **kwargs):
     return save_path_file
 
 
-def _convert_to_subset(df, columns, offset):
+def convert_tsd_to_modelica_table(tsd, table_name, save_path_file, **kwargs):
     """
-    Private function to ensure lean conversion to either mat or txt.
+    Write the tsd to the file of a CombiTimeTable in Modelica, as binary
+    .mat file or as text file depending on the extension of the given
+    file. The file is first written to a temporary file and then moved,
+    so that simulations never read an incomplete table.
+
+    :param TimeSeriesData tsd:
+        TimeSeriesData object
+    :param str table_name:
+        Name of the table for modelica.
+        Needed in Modelica to correctly load the file.
+    :param str,os.path.normpath save_path_file:
+        File path and name where to store the output .mat or .txt file.
+    :keyword:
+        All further keyword arguments, e.g. columns and offset, are passed
+        to convert_tsd_to_modelica_mat or convert_tsd_to_modelica_txt.
+
+    :return:
+        str,os.path.normpath:
+            Path where the data is saved.
+            Equal to save_path_file
     """
-    df = df.copy()
-    if columns:
-        headers = df[columns].columns.values.tolist()
+    save_path_file = str(save_path_file)
+    root, ext = os.path.splitext(save_path_file)
+    tmp_path = f"{root}_{os.getpid()}_{threading.get_ident()}.tmp{ext}"
+    if ext == ".mat":
+        convert_tsd_to_modelica_mat(tsd=tsd, save_path_file=tmp_path,
+                                    table_name=table_name, **kwargs)
+    elif ext == ".txt":
+        convert_tsd_to_modelica_txt(tsd=tsd, table_name=table_name,
+                                    save_path_file=tmp_path, **kwargs)
     else:
-        headers = df.columns.values.tolist()
+        raise ValueError(f"Given savepath '{save_path_file}' is neither "
+                         f"a .mat nor a .txt file!")
+    os.replace(tmp_path, save_path_file)
+    return save_path_file
 
-    _time_header = ('time', 'in_s')
-    headers.insert(0, _time_header)  # Ensure time will be at first place
 
+def _get_time(df, offset):
+    """
+    Private function to get the zero based time of the index in seconds.
+    """
     if isinstance(df.index, pd.DatetimeIndex):
-        df.index = df.index - df.iloc[0].name.to_datetime64()  # Make index zero based
-        df[_time_header] = df.index.total_seconds() + offset
+        time = (df.index - df.index[0]).total_seconds().to_numpy() + offset
     elif isinstance(df.index, (pd.Float64Index, pd.RangeIndex, pd.Int64Index)):
-        df[_time_header] = df.index - df.iloc[0].name + offset
+        time = np.asarray(df.index - df.index[0] + offset)
     else:
         raise IndexError(f"Given data has index of type {type(df.index)}. "
                          f"Currently only DatetimeIndex, Float64Index "
                          f", RangeIndex and Int64Index are supported.")
     # Avoid 1e-8 errors in timedelta calculation.
-    df[_time_header] = df[_time_header].round(4)
+    return np.round(time, 4)
+
+
+def _convert_to_subset(df, columns, offset):
+    """
+    Private function to ensure lean conversion to either mat or txt.
+    """
+    if columns:
+        headers = df[columns].columns.values.tolist()
+    else:
+        headers = df.columns.values.tolist()
+    _time_header = ('time', 'in_s')
+    time = _get_time(df=df, offset=offset)
+
+    # Only the selected columns are copied
+    df = df.loc[:, headers]
+    df.insert(0, _time_header, time)  # Ensure time will be at first place
+    headers.insert(0, _time_header)
 
     # Check if nan values occur
-    if df.loc[:, headers].isnull().values.sum() > 0:
+    if df.isnull().values.sum() > 0:
+        raise ValueError("Selected columns contain NaN values. This would lead to errors"
+                         "in the simulation environment.")
+
+    return df, headers
+
+
+def _convert_to_array(df, columns, offset):
+    """
+    Private function to convert the df into a float array with the time in
+    the first row and one further row per column, i.e. the transposed table.
+    """
+    if columns:
+        headers = df[columns].columns.values.tolist()
+    else:
+        headers = df.columns.values.tolist()
+    data = np.empty((len(headers) + 1, len(df.index)), dtype=np.float64)
+    data[0] = _get_time(df=df, offset=offset)
+    data[1:] = df.loc[:, headers].to_numpy(dtype=np.float64).T
+    if np.isnan(data).any():
         raise ValueError("Selected columns contain NaN values. This would lead to errors"
                          "in the simulation environment.")
+    return data, [('time', 'in_s')] + headers
 
-    return df.loc[:, headers], headers
+
+def _write_mat_v4_matrix(file, name, data_transposed):
+    """
+    Private function to write a matrix of doubles in the MATLAB v4 format.
+    As v4 stores matrices column by column, the buffer of the transposed
+    C-ordered matrix is written as it is.
+    """
+    n_cols, n_rows = data_transposed.shape
+    # Type 0: Little endian, doubles, full matrix
+    header = np.array([0, n_rows, n_cols, 0, len(name) + 1], dtype="<i4")
+    file.write(header.tobytes())
+    file.write(name.encode("ascii") + b"\0")
+    file.write(np.ascontiguousarray(data_transposed, dtype="<f8").tobytes())
@@ -0,0 +1,57 @@
+"""
+Stand-in for a dymosim executable, used to test the DymosimAPI without
+Dymola. Called as ``dymosim_stand_in.py <dsin.txt> <dsres.mat>``, it reads
+the experiment and the initial values of the given dsin.txt and writes a
+result file in the format of dymosim. Parameters are stored as constants,
+all other variables rise linearly from their initial value to the double
+of it at the stop time. A stop time before the start time fails.
+"""
+
+import sys
+import numpy as np
+from scipy.io import savemat
+from ebcpy.modelica import manipulate_ds
+
+
+def main(dsin_path, dsres_path):
+    """Simulate the given dsin.txt"""
+    experiment = {}
+    with open(dsin_path, "r") as file:
+        for line in file:
+            if line.startswith("char initialName("):
+                break
+            if "#" in line and line.split("#")[0].strip():
+                experiment[line.split("#")[1].split()[0]] = float(line.split("#")[0])
+    start, stop = experiment["StartTime"], experiment["StopTime"]
+    with open("dslog.txt", "w") as file:
+        file.write(f"Integration started at T = {start}\n")
+        if stop < start:
+            file.write("Error: StopTime is before StartTime\n")
+            sys.exit(1)
+        file.write(f"Integration terminated successfully at T = {stop}\n")
+    df = manipulate_ds.convert_ds_file_to_dataframe(dsin_path)
+    values = df["2"].astype(float).to_numpy()
+    is_parameter = (df["5"] == "1").to_numpy()
+    times = np.arange(start, stop + experiment["Increment"] / 2, experiment["Increment"])
+    ramp = 1 + (times - start) / (stop - start)
+    data_1 = np.column_stack([[start, stop]] + [[value, value] for value in
+                                                values[is_parameter]])
+    data_2 = np.column_stack([times] + [value * ramp for value in values[~is_parameter]])
+    data_info = np.zeros((len(df) + 1, 4), dtype=np.int32)
+    data_info[0] = [0, 1, 0, -1]
+    data_info[1:, 0] = np.where(is_parameter, 1, 2)
+    data_info[1:, 1][is_parameter] = np.arange(2, is_parameter.sum() + 2)
+    data_info[1:, 1][~is_parameter] = np.arange(2, (~is_parameter).sum() + 2)
+    data_info[1:, 3] = -1
+    savemat(dsres_path, {
+        "Aclass": np.array(["Atrajectory", "1.1", "", "binNormal"]),
+        "name": np.array(["Time"] + list(df.index)),
+        "description": np.array(["Time in [s]"] + [""] * len(df)),
+        "dataInfo": data_info,
+        "data_1": data_1,
+        "data_2": data_2
+    }, format="4")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
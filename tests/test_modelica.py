@@ -3,12 +3,15 @@ ebcpy.optimization."""
 
 import unittest
 import os
+import shutil
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from ebcpy.modelica import manipulate_ds, \
     get_expressions, \
     get_names_and_values_of_lines
-from ebcpy.modelica.simres import mat_to_pandas
+from ebcpy.modelica.simres import mat_to_pandas, mat_to_array
+from ebcpy.modelica.library_index import ModelicaLibraryIndex, parse_declarations
 
 
 class TestToPandas(unittest.TestCase):
@@ -35,6 +38,19 @@ class TestToPandas(unittest.TestCase):
                            names=['combiTimeTable.y[6]'])
         self.assertEqual(len(df.columns), 1)
 
+    def test_mat_to_array(self):
+        """Test function for the selective reader mat_to_array"""
+        df = mat_to_pandas(fname=self.example_mat_dir, with_unit=False)
+        names = [df.columns[-1], df.columns[0]]
+        times, values = mat_to_array(fname=self.example_mat_dir, names=names)
+        self.assertEqual(values.shape, (len(df.index), 2))
+        np.testing.assert_allclose(times, df.index)
+        np.testing.assert_allclose(values, df[names].values)
+        _, values = mat_to_array(fname=self.example_mat_dir, names=["Time"])
+        np.testing.assert_allclose(values[:, 0], times)
+        with self.assertRaises(KeyError):
+            mat_to_array(fname=self.example_mat_dir, names=["not_a_variable"])
+
     def test_get_variable_code(self):
         """Test function get variable code"""
         exp = get_expressions(filepath_model=self.example_mo_dir)
@@ -79,6 +95,29 @@ class TestManipulateDS(unittest.TestCase):
         df = manipulate_ds.convert_ds_file_to_dataframe(self.ds_path)
         self.assertIsInstance(df, pd.DataFrame)
 
+    def test_convert_ds_file_to_array(self):
+        """Test function for the function convert_ds_file_to_array"""
+        names, values = manipulate_ds.convert_ds_file_to_array(self.ds_path)
+        df = manipulate_ds.convert_ds_file_to_dataframe(self.ds_path)
+        self.assertEqual(names, list(df.index))
+        self.assertEqual(values.dtype, float)
+        np.testing.assert_equal(values, df.to_numpy(dtype=float))
+        # The matrices are found independent of their line number
+        with open(self.ds_path, "r") as file:
+            content = file.read()
+        with open("dummy_dsin.txt", "w") as file:
+            file.write("#1\n#    Additional comment\n" + content)
+        names_shifted, values_shifted = manipulate_ds.convert_ds_file_to_array("dummy_dsin.txt")
+        self.assertEqual(names, names_shifted)
+        np.testing.assert_equal(values, values_shifted)
+        pd.testing.assert_frame_equal(
+            df, manipulate_ds.convert_ds_file_to_dataframe("dummy_dsin.txt"))
+        with open("dummy_dsin.txt", "w") as file:
+            file.write(content.replace("double initialValue", "double otherValue"))
+        with self.assertRaises(ValueError):
+            manipulate_ds.convert_ds_file_to_array("dummy_dsin.txt")
+        os.remove("dummy_dsin.txt")
+
     def test_eliminate_parameters_from_ds_file(self):
         """Test function for the function eliminate_parameters_from_ds_file."""
         manipulate_ds.eliminate_parameters_from_ds_file(self.ds_path,
@@ -108,6 +147,147 @@ class TestManipulateDS(unittest.TestCase):
                 exclude_paras={"Not a": "list"}
             )
 
+    def test_dsin_template(self):
+        """Test function for the class DsinTemplate."""
+        template = manipulate_ds.DsinTemplate(self.ds_path)
+        df = manipulate_ds.convert_ds_file_to_dataframe(self.ds_path)
+        self.assertEqual(template.names, list(df.index))
+        np.testing.assert_equal(template.initial_values, df.to_numpy(dtype=float))
+        self.assertIn("StopTime", template.settings)
+        # Unchanged values reproduce the file
+        template.write("dummy_dsin.txt")
+        with open(self.ds_path, "rb") as file, open("dummy_dsin.txt", "rb") as file_new:
+            self.assertEqual(file.read(), file_new.read())
+        template.write("dummy_dsin.txt",
+                       initial_values={"sourceSideMassFlowSource.m_flow": 0.1,
+                                       "sourceSideMassFlowSource.use_m_flow_in": True},
+                       settings={"StopTime": 100, "Tolerance": 1e-4})
+        df_new = manipulate_ds.convert_ds_file_to_dataframe("dummy_dsin.txt")
+        self.assertEqual(float(df_new.loc["sourceSideMassFlowSource.m_flow", "2"]), 0.1)
+        self.assertEqual(df_new.loc["sourceSideMassFlowSource.use_m_flow_in", "2"], "1")
+        self.assertEqual((df_new != df).any(axis=1).sum(), 2)
+        self.assertEqual(manipulate_ds.DsinTemplate("dummy_dsin.txt").names, template.names)
+        with open("dummy_dsin.txt", "r") as file:
+            content = file.read()
+        self.assertRegex(content, r"\s100\s+# StopTime")
+        self.assertRegex(content, r"\s0.0001\s+# Tolerance")
+        # Same result with update_ds_file
+        manipulate_ds.update_ds_file(self.ds_path, "dummy_dsin_2.txt",
+                                     initial_values={"sourceSideMassFlowSource.m_flow": 0.1,
+                                                     "sourceSideMassFlowSource.use_m_flow_in": True},
+                                     settings={"StopTime": 100, "Tolerance": 1e-4})
+        with open("dummy_dsin.txt", "rb") as file, open("dummy_dsin_2.txt", "rb") as file_new:
+            self.assertEqual(file.read(), file_new.read())
+        os.remove("dummy_dsin.txt")
+        os.remove("dummy_dsin_2.txt")
+        with self.assertRaises(KeyError):
+            template.write("dummy_dsin.txt", initial_values={"not_a_variable": 1})
+        with self.assertRaises(KeyError):
+            template.write("dummy_dsin.txt", settings={"NotASetting": 1})
+
+
+
+class TestLibraryIndex(unittest.TestCase):
+    """Test-class for library_index module."""
+
+    def setUp(self):
+        """Called before every test.
+        Used to setup relevant paths and APIs etc."""
+        data_dir = Path(__file__).parent.joinpath("data")
+        self.example_mo_dir = data_dir.joinpath("HeatPumpSystem.mo")
+        self.library_dir = Path(__file__).parent.joinpath("testzone", "library_index", "MyLib")
+        os.makedirs(self.library_dir, exist_ok=True)
+        with open(self.library_dir.joinpath("package.mo"), "w") as file:
+            file.write('within;\npackage MyLib "My library"\nend MyLib;\n')
+        self._write_model("A", "parameter Real k = 1;")
+        self._write_model("B", "parameter Boolean b = true;")
+        shutil.copy(self.example_mo_dir, self.library_dir.joinpath("HeatPumpSystem.mo"))
+
+    def _write_model(self, name, declarations):
+        """Write a model with the given declarations into the library"""
+        with open(self.library_dir.joinpath(f"{name}.mo"), "w") as file:
+            file.write(f"within MyLib;\nmodel {name}\n  {declarations}\n"
+                       f"equation\n  x = 1;\nend {name};\n")
+
+    def test_parse_declarations(self):
+        """Test parsing the declarations of a model"""
+        with open(self.example_mo_dir, "r") as file:
+            declarations = parse_declarations(file.read())
+        parameters = {dec["name"]: dec for dec in declarations
+                      if dec["variability"] == "parameter"}
+        # The parameter scalingFactor which is commented out is ignored
+        self.assertEqual(len(parameters), 22)
+        self.assertEqual(len([dec for dec in parameters.values() if dec["protected"]]), 7)
+        self.assertEqual(parameters["nthOrder"]["value"], 3)
+        self.assertIs(parameters["use_revHP"]["value"], True)
+        self.assertEqual(parameters["VCon"]["modification"], 'displayUnit="l"')
+        self.assertEqual(parameters["x_start"]["dimensions"], "nthOrder")
+        self.assertEqual(parameters["GConIns"]["expression"], "QCon_nominal/dTPinchCon")
+        self.assertEqual(parameters["yRefIne_start"]["description"],
+                         "Initial or guess value of output (= state)")
+        self.assertEqual(parameters["CCon"]["class_name"],
+                         "AixLib.Systems.HeatPumpSystems.HeatPumpSystem")
+        self.assertEqual([dec["name"] for dec in declarations
+                          if dec["variability"] == "constant"], ["refIneFre_constant"])
+        declarations = parse_declarations(
+            'model C\n  parameter Real x(min=0) = 2, y "Doc; with semicolon";\n'
+            '  /* parameter Real z = 1; */\n  Real v[2](each start=0) = {x, y};\n'
+            '  final parameter String s = "a;b" "Doc";\nend C;\n'
+        )
+        self.assertEqual([dec["name"] for dec in declarations], ["x", "y", "v", "s"])
+        self.assertEqual(declarations[1]["description"], "Doc; with semicolon")
+        self.assertIsNone(declarations[2]["variability"])
+        self.assertEqual(declarations[2]["expression"], "{x, y}")
+        self.assertEqual(declarations[3]["expression"], '"a;b"')
+        self.assertEqual(declarations[3]["description"], "Doc")
+
+    def test_scan(self):
+        """Test scanning a library incrementally"""
+        cache_path = self.library_dir.parent.joinpath("index.json")
+        index = ModelicaLibraryIndex(cache_path=cache_path)
+        parsed = index.scan(self.library_dir.joinpath("package.mo"))
+        self.assertEqual(len(parsed), 4)
+        self.assertEqual(len(index.get_declarations(
+            class_name="AixLib.Systems.HeatPumpSystems.HeatPumpSystem",
+            modelica_type="parameters",
+            get_protected=False
+        )), 15)
+        self.assertEqual(index.scan(self.library_dir), [])
+        # Only the changed file is parsed again
+        filepath = self.library_dir.joinpath("A.mo")
+        self._write_model("A", "parameter Real k = 2; Real x;")
+        os.utime(filepath, ns=(0, os.stat(filepath).st_mtime_ns + 10 ** 9))
+        self.assertEqual(index.scan(self.library_dir), [str(filepath)])
+        declarations = index.get_declarations(class_name="MyLib.A")
+        self.assertEqual([dec["value"] for dec in declarations], [2, None])
+        self.assertEqual(index.get_declarations(class_name="MyLib.A",
+                                                modelica_type="variables")[0]["name"], "x")
+        # Touched files with the same content are not parsed again
+        os.utime(filepath, ns=(0, os.stat(filepath).st_mtime_ns + 10 ** 9))
+        self.assertEqual(index.scan(self.library_dir), [])
+        # Deleted files are removed
+        os.remove(self.library_dir.joinpath("B.mo"))
+        self.assertEqual(index.scan(self.library_dir), [])
+        self.assertEqual(index.get_declarations(class_name="MyLib.B"), [])
+        self.assertEqual(len(index.filepaths), 3)
+        # The index is restored from the cache
+        index = ModelicaLibraryIndex(cache_path=cache_path, n_cpu=2)
+        self.assertEqual(index.scan(self.library_dir), [])
+        self.assertEqual(len(index.get_declarations()), 25)
+        with self.assertRaises(ValueError):
+            index.get_declarations(modelica_type="not_a_type")
+
+    def test_parallel_scan(self):
+        """Test scanning a library with multiple processes"""
+        index = ModelicaLibraryIndex()
+        index.scan(self.library_dir)
+        index_mp = ModelicaLibraryIndex(n_cpu=2)
+        self.assertEqual(len(index_mp.scan(self.library_dir)), 4)
+        self.assertEqual(index_mp.get_declarations(), index.get_declarations())
+
+    def tearDown(self):
+        shutil.rmtree(self.library_dir.parent, ignore_errors=True)
+
 
 if __name__ == "__main__":
     unittest.main()
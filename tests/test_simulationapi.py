@@ -2,15 +2,67 @@
 ebcpy.simulationapi."""
 
 import unittest
+from unittest import mock
 import sys
 import os
+import glob
 from pathlib import Path
 import shutil
+import time
+import json
+import pickle
+import multiprocessing as mp
 import numpy as np
+import pandas as pd
+import scipy.io as spio
 from pydantic import ValidationError
-from ebcpy.simulationapi import dymola_api, fmu
+from ebcpy import simulationapi
+from ebcpy.simulationapi import dymola_api, fmu, shared_memory, benchmark, result_store, \
+    supervised_pool, telemetry, sweep, sensitivity, translation_cache, dymosim, \
+    dymola_pool
 from ebcpy import TimeSeriesData
 
+_WORKER_STATE = {}
+
+
+def _init_test_worker(value):
+    """Initializer of the workers of the TestSupervisedPool"""
+    _WORKER_STATE["value"] = value
+
+
+def _test_task(argument):
+    """Task of the TestSupervisedPool, behaving according to the argument"""
+    action, value = argument
+    if action == "sleep":
+        time.sleep(value)
+    elif action == "crash":
+        os._exit(1)
+    elif action == "crash_once":
+        if not os.path.exists(value):
+            Path(value).touch()
+            os._exit(1)
+    elif action == "raise":
+        raise ValueError(value)
+    return _WORKER_STATE["value"], value
+
+
+def _store_translations(cache_dir, translation_dir):
+    """Task of the TestTranslationCache, storing and restoring the same keys"""
+    cache = translation_cache.TranslationCache(cache_dir=cache_dir, max_entries=2)
+    for idx in range(30):
+        cache.store(key=f"key_{idx}", model_name="Model", cd=translation_dir, variables={})
+        cache.restore(key=f"key_{idx}", cd=os.path.join(translation_dir, str(os.getpid())))
+
+
+def _interrupt_result_store(store):
+    """Stop the writer of the store as if the simulating process was killed"""
+    # pylint: disable=protected-access
+    while not store._queue.empty():
+        time.sleep(0.01)
+    store._manager.shutdown()
+    store._writer.join()
+    store._queue = store._manager = store._writer = None
+
 
 class PartialTestSimAPI(unittest.TestCase):
 
@@ -216,6 +268,43 @@ class PartialTestDymolaAPI(PartialTestSimAPI):
         )
         self.assertEqual(res["test_local"], some_val)
 
+    def test_batch_size(self):
+        """Test batches of parameter sets in one call of Dymola"""
+        self.sim_api.result_names = ["test_out"]
+        parameters = [{"test_int": value} for value in range(5)]
+        parameters.append({"test_int": 5, "test_real": 2.0})
+        for return_option in ["last_point", "time_series"]:
+            res_batched = self.sim_api.simulate(parameters=parameters,
+                                                return_option=return_option,
+                                                batch_size=3)
+            res = self.sim_api.simulate(parameters=parameters,
+                                        return_option=return_option)
+            self.assertEqual(len(res_batched), len(parameters))
+            for _res_batched, _res in zip(res_batched, res):
+                if return_option == "last_point":
+                    self.assertEqual(_res_batched, _res)
+                else:
+                    pd.testing.assert_frame_equal(_res_batched, _res)
+
+    def test_distribute_translation(self):
+        """Test simulating the translation of the main instance in the workers"""
+        self.sim_api.result_names = ["test_out"]
+        parameters = [{"test_int": value} for value in range(3)]
+        res = self.sim_api.simulate(parameters=parameters, return_option="last_point")
+        self.sim_api.close()
+        self.sim_api = dymola_api.DymolaAPI(
+            cd=self.example_sim_dir,
+            model_name=self.sim_api.model_name,
+            packages=self.sim_api.packages,
+            n_cpu=self.n_cpu,
+            distribute_translation=True
+        )
+        self.sim_api.result_names = ["test_out"]
+        res_distributed = self.sim_api.simulate(parameters=parameters,
+                                                return_option="last_point")
+        for _res_distributed, _res in zip(res_distributed, res):
+            self.assertEqual(_res_distributed["test_out"], _res["test_out"])
+
 
 class TestDymolaAPIMultiCore(PartialTestDymolaAPI):
     """Test-Class for the DymolaAPI class on single core."""
@@ -254,6 +343,906 @@ class TestFMUAPI(PartialTestSimAPI):
         self.sim_api.close()
         self.assertEqual(self.sim_api._unzip_dirs, {})
 
+    def test_model_description_cache(self):
+        """Test caching of the parsed model description"""
+        # pylint: disable=protected-access
+        parameters = self.sim_api.parameters.copy()
+        fmu.FMU_API._model_description_cache.clear()
+        self.sim_api.model_name = self.sim_api.model_name
+        cache_files = [f for f in os.listdir(self.example_sim_dir) if f.endswith(".pickle")]
+        self.assertEqual(len(cache_files), 1)
+        # Caches of other versions are not loaded
+        self.assertTrue(cache_files[0].endswith(
+            f"_v{fmu._MODEL_DESCRIPTION_CACHE_VERSION}.pickle"))
+        # Clear the in-memory cache to force loading from disk
+        fmu.FMU_API._model_description_cache.clear()
+        self.sim_api.model_name = self.sim_api.model_name
+        self.assertEqual(parameters.keys(), self.sim_api.parameters.keys())
+        # Altering the variables must not alter the cache
+        self.sim_api.parameters.clear()
+        self.sim_api.model_name = self.sim_api.model_name
+        self.assertEqual(parameters.keys(), self.sim_api.parameters.keys())
+
+    def test_direct_engine(self):
+        """Test the direct stepping engine against fmpy"""
+        self.sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 0.1})
+        self.sim_api.result_names = list(self.sim_api.states.keys())[:5]
+        parameters = {"TAmb": 290.0}
+        res_fmpy = self.sim_api.simulate(parameters=parameters)
+        self.sim_api.engine = "direct"
+        self.sim_api.model_name = self.sim_api.model_name
+        self.sim_api.result_names = list(self.sim_api.states.keys())[:5]
+        res_direct = self.sim_api.simulate(parameters=parameters)
+        self.assertIsInstance(res_direct, TimeSeriesData)
+        np.testing.assert_allclose(res_fmpy.to_numpy(),
+                                   res_direct[res_fmpy.columns].to_numpy())
+        self.assertTrue((res_fmpy.index == res_direct.index).all())
+        # Buffer reuse must not alter previous results:
+        res_other = self.sim_api.simulate(parameters={"TAmb": 300.0})
+        self.assertFalse(np.allclose(res_other.to_numpy(), res_direct.to_numpy()))
+        with self.assertRaises(ValueError):
+            fmu.FMU_API(cd=self.example_sim_dir,
+                        model_name=self.sim_api.model_name,
+                        engine="not_an_engine")
+
+    def test_direct_engine_timeout(self):
+        """Test that a timed out simulation leaves the fmu reusable"""
+        self.sim_api.engine = "direct"
+        self.sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 0.1})
+        self.sim_api.result_names = list(self.sim_api.states.keys())[:5]
+        res_clean = self.sim_api.simulate()
+        self.sim_api.set_sim_setup({"timeout": 1e-9})
+        self.assertIsNone(self.sim_api.simulate(fail_on_error=False))
+        self.sim_api.set_sim_setup({"timeout": np.inf})
+        res = self.sim_api.simulate()
+        np.testing.assert_allclose(res_clean.to_numpy(), res.to_numpy())
+
+    def test_stepwise_simulation(self):
+        """Test initialize, do_step and the state handling"""
+        self.sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 0.1})
+        self.sim_api.result_names = list(self.sim_api.states.keys())[:5]
+        res = self.sim_api.simulate(parameters={"TAmb": 290.0})
+        with self.assertRaises(RuntimeError):
+            self.sim_api.do_step()
+        values = [self.sim_api.initialize(parameters={"TAmb": 290.0})]
+        values.extend([self.sim_api.do_step() for _ in range(100)])
+        np.testing.assert_allclose(np.array(values), res.to_numpy(), atol=1e-6)
+        self.assertAlmostEqual(self.sim_api.current_time, 10.0)
+        # Branch from a stored state
+        state = self.sim_api.get_state()
+        self.sim_api.do_step(step_size=1)
+        self.sim_api.set_state(state)
+        self.assertEqual(self.sim_api.current_time, state.time)
+        branch_2 = [self.sim_api.do_step(step_size=1) for _ in range(3)]
+        self.sim_api.set_state(state)
+        branch_3 = [self.sim_api.do_step(step_size=1) for _ in range(3)]
+        np.testing.assert_allclose(branch_2, branch_3)
+        # Simulating again ends the stepwise simulation
+        res_2 = self.sim_api.simulate(parameters={"TAmb": 290.0})
+        np.testing.assert_allclose(res.to_numpy(), res_2.to_numpy())
+        with self.assertRaises(RuntimeError):
+            self.sim_api.do_step()
+
+    def test_warm_start(self):
+        """Test continuing simulations from a warm-up snapshot"""
+        self.sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 0.1})
+        self.sim_api.result_names = list(self.sim_api.states.keys())[:5]
+        snapshot = self.sim_api.simulate_warm_up(warm_up_time=5.0)
+        self.assertEqual(snapshot.time, 5.0)
+        self.assertEqual(len(snapshot.result.index), 51)
+        res = self.sim_api.simulate(parameters=[{"TAmb": 290.0}, {"TAmb": 300.0}],
+                                    warm_start=snapshot)
+        reference = self.sim_api.simulate()
+        for _res in res:
+            self.assertIsInstance(_res, TimeSeriesData)
+            self.assertTrue((_res.index == reference.index).all())
+            # Results of the warm-up are equal:
+            np.testing.assert_allclose(_res.loc[:4.9].to_numpy(),
+                                       reference.loc[:4.9].to_numpy())
+        # TAmb is altered after the warm-up
+        self.assertNotAlmostEqual(res[0].iloc[-1, 0], res[1].iloc[-1, 0])
+        # Non-tunable parameters can't be changed
+        with self.assertRaises(ValueError):
+            self.sim_api.simulate(parameters={"medium.lamda": 1.0},
+                                  warm_start=snapshot)
+
+    def test_thread_executor(self):
+        """Test the simulation on a pool of threads"""
+        with self.assertRaises(ValueError):
+            fmu.FMU_API(cd=self.example_sim_dir,
+                        model_name=self.sim_api.model_name,
+                        executor="not_an_executor")
+        if mp.cpu_count() < 2:
+            self.skipTest("Thread pool requires at least two cpus")
+        self.sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 0.1})
+        self.sim_api.result_names = list(self.sim_api.states.keys())[:5]
+        parameters = [{"TAmb": 280.0 + 5 * i} for i in range(4)]
+        reference = self.sim_api.simulate(parameters=parameters)
+        # Use another cd to not overwrite the binaries loaded by self.sim_api
+        sim_api = fmu.FMU_API(cd=os.path.join(self.example_sim_dir, "threads"),
+                              model_name=self.sim_api.model_name,
+                              n_cpu=2,
+                              executor="thread")
+        sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 0.1})
+        sim_api.result_names = self.sim_api.result_names
+        res = sim_api.simulate(parameters=parameters)
+        for _res, _ref in zip(res, reference):
+            np.testing.assert_allclose(_res.to_numpy(), _ref.to_numpy())
+        sim_api.close()
+        # pylint: disable=protected-access
+        self.assertEqual(sim_api._fmu_instances, {})
+
+    def test_shared_memory(self):
+        """Test the exchange of inputs and results using shared memory"""
+        # pylint: disable=protected-access
+        if not shared_memory.SHARED_MEMORY_AVAILABLE:
+            self.skipTest("Shared memory requires python >= 3.8")
+        self.sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 0.1})
+        self.sim_api.result_names = list(self.sim_api.states.keys())[:5]
+        reference = self.sim_api.simulate(parameters={"TAmb": 290.0})
+        shape = self.sim_api._get_shared_result_shape({"return_option": "time_series"})
+        self.assertEqual(shape, reference.shape)
+        self.assertIsNone(self.sim_api._get_shared_result_shape({"return_option": "savepath"}))
+        block = shared_memory.SharedBlock(shared_memory.SharedBlock.required_bytes(
+            2 * [reference.to_numpy(), reference.index.to_numpy()]
+        ))
+        try:
+            # Inputs are read from the shared memory by the workers
+            shared_df = shared_memory.SharedDataFrame.from_frame(df=reference, block=block)
+            self.assertIsInstance(shared_df.to_frame(), TimeSeriesData)
+            self.assertTrue(shared_df.to_frame().equals(reference))
+            # Results are written into preallocated buffers
+            shared_result = (block.allocate(shape=shape, dtype=np.double),
+                             block.allocate(shape=shape[:1], dtype=np.double))
+            res = self.sim_api._single_simulation_shared_memory(
+                {"parameters": {"TAmb": 290.0}, "_shared_result": shared_result}
+            )
+            self.assertIsInstance(res, shared_memory.SharedDataFrame)
+            res = res.to_frame(values=block.read(res.values), index=block.read(res.index))
+            self.assertTrue(res.equals(reference))
+        finally:
+            block.close()
+
+    def test_worker_registry(self):
+        """Test the registration of the api in the workers and the task context"""
+        # pylint: disable=protected-access
+        context = self.sim_api._get_worker_context()
+        for item in self.sim_api._worker_static_items:
+            self.assertNotIn(item, context)
+        self.assertIn("_sim_setup", context)
+        self.assertIn("_result_names", context)
+        simulationapi._WORKER_APIS["test"] = pickle.loads(pickle.dumps(self.sim_api))
+        try:
+            self.sim_api.set_sim_setup({"stop_time": 5.0})
+            res = simulationapi._run_worker_task(
+                ("test", "_worker_noop", self.sim_api._get_worker_context(), 1)
+            )
+            self.assertEqual(res, 1)
+            self.assertEqual(simulationapi._WORKER_APIS["test"].sim_setup.stop_time, 5.0)
+        finally:
+            simulationapi._WORKER_APIS.pop("test")
+        if mp.cpu_count() < 2:
+            self.skipTest("Pool requires at least two cpus")
+        sim_api = fmu.FMU_API(cd=os.path.join(self.example_sim_dir, "processes"),
+                              model_name=self.sim_api.model_name,
+                              n_cpu=2)
+        overhead = benchmark.benchmark_task_overhead(sim_api, n_tasks=10)
+        sim_api.close()
+        self.assertLess(overhead["context_bytes"], overhead["api_bytes"])
+
+    def test_convert_inputs(self):
+        """Test the conversion of inputs to structured arrays"""
+        # pylint: disable=protected-access
+        self.sim_api.inputs = {"u_real": simulationapi.Variable(value=0.0, type=float),
+                               "u_int": simulationapi.Variable(value=0, type=int)}
+        df = pd.DataFrame({"u_real": np.linspace(0, 1, 11), "u_int": np.arange(11)},
+                          index=np.arange(11) * 1.0)
+        array = self.sim_api._convert_inputs(TimeSeriesData(df.copy()))
+        self.assertEqual(array.dtype.names, ("time", "u_real", "u_int"))
+        self.assertEqual(array["u_int"].dtype, np.int_)
+        np.testing.assert_equal(array["time"], df.index.to_numpy())
+        np.testing.assert_equal(array["u_real"], df["u_real"].to_numpy())
+        with self.assertRaises(IndexError):
+            self.sim_api._convert_inputs(df.assign(time=0))
+        # Shared inputs are only converted once per batch
+        self.sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 1.0})
+        with mock.patch.object(self.sim_api, "_convert_inputs",
+                               wraps=self.sim_api._convert_inputs) as convert:
+            res = self.sim_api.simulate(parameters=[{"TAmb": 280.0}, {"TAmb": 290.0}],
+                                        inputs=df)
+            self.assertEqual(convert.call_count, 1)
+        self.assertEqual(len(res), 2)
+
+    def test_recording_modes(self):
+        """Test the last_point and statistics return options"""
+        # pylint: disable=protected-access
+        self.sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 0.1})
+        self.sim_api.result_names = list(self.sim_api.states.keys())[:5]
+        res = self.sim_api.simulate(parameters={"TAmb": 290.0})
+        res = res.to_df(force_single_index=True)
+        for engine in ["fmpy", "direct"]:
+            self.sim_api.engine = engine
+            with mock.patch.object(fmu._FMUStepper, "simulate",
+                                   autospec=True,
+                                   side_effect=fmu._FMUStepper.simulate) as stepper:
+                last_point = self.sim_api.simulate(parameters={"TAmb": 290.0},
+                                                   return_option="last_point")
+                statistics = self.sim_api.simulate(parameters={"TAmb": 290.0},
+                                                   return_option="statistics")
+            # Only the engine 'direct' uses the stepper, fmpy keeps its solver settings
+            self.assertEqual(stepper.called, engine == "direct")
+            self.assertEqual(list(last_point.keys()), self.sim_api.result_names)
+            np.testing.assert_allclose(list(last_point.values()), res.iloc[-1].to_numpy())
+            self.assertEqual(list(statistics.index), fmu.STATISTICS)
+            np.testing.assert_allclose(statistics.to_numpy(),
+                                       self.sim_api._get_statistics(res).to_numpy())
+        # Statistics of the warm-up are merged
+        snapshot = self.sim_api.simulate_warm_up(warm_up_time=5.0)
+        res = self.sim_api.simulate(warm_start=snapshot).to_df(force_single_index=True)
+        statistics = self.sim_api.simulate(warm_start=snapshot, return_option="statistics")
+        np.testing.assert_allclose(statistics.to_numpy(),
+                                   self.sim_api._get_statistics(res).to_numpy())
+
+    def test_result_store(self):
+        """Test the consolidated storage of results of a sweep"""
+        self.sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 1.0})
+        self.sim_api.result_names = list(self.sim_api.states.keys())[:3]
+        parameters = [{"TAmb": 280.0 + i} for i in range(3)]
+        filepath = os.path.join(self.example_sim_dir, "sweep", "sweep.hdf")
+        store = result_store.SweepResultStore(filepath=filepath, n_shards=2)
+        with self.assertRaises(RuntimeError):
+            self.sim_api.simulate(parameters=parameters, return_option="savepath",
+                                  result_store=store)
+        with store:
+            run_ids = self.sim_api.simulate(parameters=parameters,
+                                            return_option="savepath",
+                                            result_store=store)
+            self.assertEqual(run_ids, [0, 1, 2])
+            # Workers only receive the queue
+            self.assertIsNone(pickle.loads(pickle.dumps(store))._writer)
+            with self.assertRaises(RuntimeError):
+                store.read(0)
+        self.assertEqual(len(store.filepaths), 2)
+        self.assertEqual(store.run_ids, [0, 1, 2])
+        res = self.sim_api.simulate(parameters=parameters[1])
+        pd.testing.assert_frame_equal(
+            store.read(1),
+            res.to_df(force_single_index=True),
+            check_names=False
+        )
+        table = store.read_parameters()
+        self.assertEqual(list(table.index), [0, 1, 2])
+        self.assertEqual(list(table["TAmb"]), [280.0, 281.0, 282.0])
+        # Existing files are continued
+        store = result_store.SweepResultStore(filepath=filepath, n_shards=2)
+        with store:
+            run_id = self.sim_api.simulate(parameters={"TAmb": 290.0},
+                                           return_option="savepath",
+                                           result_store=store)
+        self.assertEqual(run_id, 3)
+        self.assertEqual(list(store.read_parameters().index), [0, 1, 2, 3])
+        # Results written before an interruption are kept with their parameters
+        store.open()
+        run_ids = self.sim_api.simulate(parameters=parameters[:2],
+                                        return_option="savepath",
+                                        result_store=store)
+        _interrupt_result_store(store)
+        self.assertEqual(store.run_ids, [0, 1, 2, 3, 4, 5])
+        table = store.read_parameters()
+        self.assertEqual(list(table.index), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(list(table.loc[run_ids, "TAmb"]), [280.0, 281.0])
+
+    def test_supervised_pool(self):
+        """Test the simulation on a supervised pool of processes"""
+        with self.assertRaises(ValueError):
+            fmu.FMU_API(cd=self.example_sim_dir,
+                        model_name=self.sim_api.model_name,
+                        executor="thread",
+                        task_timeout=10)
+        if mp.cpu_count() < 2:
+            self.skipTest("Supervised pool requires at least two cpus")
+        self.sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 0.1})
+        self.sim_api.result_names = list(self.sim_api.states.keys())[:5]
+        parameters = [{"TAmb": 280.0 + 5 * i} for i in range(4)]
+        reference = self.sim_api.simulate(parameters=parameters)
+        sim_api = fmu.FMU_API(cd=os.path.join(self.example_sim_dir, "supervised"),
+                              model_name=self.sim_api.model_name,
+                              n_cpu=2,
+                              task_timeout=60,
+                              max_retries=1)
+        self.assertTrue(sim_api.supervise)
+        sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 0.1})
+        sim_api.result_names = self.sim_api.result_names
+        res = sim_api.simulate(parameters=parameters)
+        self.assertEqual(sim_api.failed_simulations, [])
+        for _res, _ref in zip(res, reference):
+            np.testing.assert_allclose(_res.to_numpy(), _ref.to_numpy())
+        sim_api.close()
+
+    def test_abort_criterion(self):
+        """Test the early abort of simulations"""
+        self.sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 0.1})
+        self.sim_api.result_names = list(self.sim_api.states.keys())[:3]
+
+        def _abort_criterion(df):
+            if df.index[-1] >= 2.0:
+                return "Too long"
+            return None
+
+        res = self.sim_api.simulate(abort_criterion=lambda df: False)
+        self.assertEqual(res.index[-1], 10.0)
+        self.assertNotIn("abort_reason", res.attrs)
+        for engine in ["fmpy", "direct"]:
+            self.sim_api.engine = engine
+            res = self.sim_api.simulate(abort_criterion=_abort_criterion,
+                                        abort_check_interval=5)
+            self.assertEqual(res.attrs["abort_reason"], "Too long")
+            self.assertGreaterEqual(res.attrs["abort_time"], 2.0)
+            self.assertLess(res.index[-1], 10.0)
+            self.assertEqual(res.index[-1], res.attrs["abort_time"])
+            statistics = self.sim_api.simulate(abort_criterion=_abort_criterion,
+                                               return_option="statistics")
+            self.assertEqual(statistics.attrs["abort_reason"], "Too long")
+            last_point = self.sim_api.simulate(abort_criterion=lambda df: True,
+                                               return_option="last_point")
+            self.assertEqual(list(last_point.keys()),
+                             self.sim_api.result_names + ["abort_reason", "abort_time"])
+            self.assertEqual(last_point["abort_reason"], "Abort criterion met")
+            last_point = self.sim_api.simulate(abort_criterion=lambda df: False,
+                                               return_option="last_point")
+            self.assertEqual(list(last_point.keys()), self.sim_api.result_names)
+        with self.assertRaises(ValueError):
+            self.sim_api.simulate(abort_criterion=_abort_criterion,
+                                  abort_check_interval=0)
+
+    def test_sweep(self):
+        """Test the design of experiments and the resumable parameter sweep"""
+        self.sim_api.set_sim_setup({"stop_time": 5.0, "output_interval": 1.0})
+        self.sim_api.result_names = list(self.sim_api.states.keys())[:2]
+        names = ["TAmb", "heatCapacitor.C", "valve.LinearCharacteristic"]
+        bounds = {"TAmb": (280.0, 300.0), "heatCapacitor.C": (0.1, 0.2)}
+        with self.assertRaises(ValueError):
+            sweep.create_design(self.sim_api, names=names)
+        with self.assertRaises(ValueError):
+            sweep.create_design(self.sim_api, names=names, bounds=bounds,
+                                design="not_a_design", n_samples=4)
+        with self.assertRaises(ValueError):
+            sweep.create_design(self.sim_api, names=names, bounds=bounds,
+                                design="random")
+        design = sweep.create_design(self.sim_api, names=names, bounds=bounds,
+                                     design="full_factorial",
+                                     levels={"TAmb": 3, "heatCapacitor.C": 2,
+                                             "valve.LinearCharacteristic": 5})
+        # The boolean parameter only has two levels
+        self.assertEqual(len(design), 12)
+        self.assertEqual(sorted(design["TAmb"].unique()), [280.0, 290.0, 300.0])
+        self.assertTrue(design.index.is_unique)
+        for _design in ["latin_hypercube", "sobol", "halton", "random"]:
+            design = sweep.create_design(self.sim_api, names=names[:2], bounds=bounds,
+                                         design=_design, n_samples=8, seed=1)
+            self.assertEqual(len(design), 8)
+            self.assertTrue((design["TAmb"].between(280.0, 300.0)).all())
+            self.assertEqual(list(design.index),
+                             [sweep.design_point_id(row) for row in design.to_dict("records")])
+        store = result_store.SweepResultStore(
+            filepath=os.path.join(self.example_sim_dir, "sweep", "doe.hdf")
+        )
+        _sweep = sweep.ParameterSweep(self.sim_api, design=design.iloc[:5], result_store=store)
+        run_table = _sweep.run(batch_size=2)
+        self.assertEqual(sorted(run_table.index), sorted(design.index[:5]))
+        self.assertEqual(sorted(run_table["run_id"]), list(range(5)))
+        pd.testing.assert_frame_equal(run_table.loc[design.index[:5], names[:2]],
+                                      design.iloc[:5], check_names=False)
+        # Resume with the whole design, only new points are simulated
+        _sweep = sweep.ParameterSweep(self.sim_api, design=design, result_store=store)
+        self.assertEqual(len(_sweep.get_pending_design()), 3)
+        run_table = _sweep.run()
+        self.assertEqual(sorted(run_table.index), sorted(design.index))
+        self.assertEqual(store.run_ids, list(range(8)))
+        self.assertTrue(_sweep.get_pending_design().empty)
+        # Resume after the sweep was killed partway through a batch
+        store = result_store.SweepResultStore(
+            filepath=os.path.join(self.example_sim_dir, "sweep", "doe_killed.hdf")
+        )
+        _sweep = sweep.ParameterSweep(self.sim_api, design=design, result_store=store)
+        simulate = self.sim_api.simulate
+        n_calls = []
+
+        def _simulate_and_kill(parameters, **kwargs):
+            n_calls.append(len(parameters))
+            if len(n_calls) == 1:
+                return simulate(parameters=parameters, **kwargs)
+            simulate(parameters=parameters[:2], **kwargs)
+            _interrupt_result_store(store)
+            raise KeyboardInterrupt
+
+        with mock.patch.object(self.sim_api, "simulate", side_effect=_simulate_and_kill):
+            with self.assertRaises(KeyboardInterrupt):
+                _sweep.run(batch_size=4)
+        self.assertEqual(len(_sweep.get_pending_design()), 2)
+        run_table = _sweep.run()
+        self.assertEqual(sorted(run_table.index), sorted(design.index))
+        self.assertEqual(store.run_ids, list(range(8)))
+
+    def test_telemetry(self):
+        """Test the telemetry of each simulation"""
+        self.assertIsNone(self.sim_api.telemetry)
+        records = []
+        sim_api = fmu.FMU_API(cd=os.path.join(self.example_sim_dir, "telemetry"),
+                              model_name=self.sim_api.model_name,
+                              telemetry_callback=records.append)
+        sim_api.set_sim_setup({"stop_time": 10.0, "output_interval": 1.0})
+        sim_api.simulate(parameters=[{"TAmb": 280.0}, {"TAmb": 290.0}])
+        sim_api.simulate(parameters={"TAmb": 280.0}, return_option="last_point")
+        df = sim_api.telemetry.to_df()
+        self.assertEqual(len(df), 3)
+        self.assertEqual(list(df["batch"]), [0, 0, 1])
+        self.assertEqual(list(df["run"]), [0, 1, 0])
+        self.assertEqual(list(df["n_steps"]), [10, 10, 10])
+        for _phase in telemetry.PHASES + ["queue_wait", "wall_time"]:
+            self.assertTrue((df[_phase] >= 0).all())
+        self.assertTrue((df["solve"] > 0).all())
+        self.assertTrue((df[telemetry.PHASES].sum(axis=1) <= df["wall_time"]).all())
+        self.assertEqual(records, sim_api.telemetry.records)
+        filepath = os.path.join(self.example_sim_dir, "telemetry.json")
+        sim_api.telemetry.to_json(filepath)
+        with open(filepath, "r") as file:
+            self.assertEqual(json.load(file), records)
+        sim_api.telemetry.clear()
+        self.assertTrue(sim_api.telemetry.to_df().empty)
+        sim_api.close()
+
+
+class _AnalyticalAPI(simulationapi.SimulationAPI):
+    """Api evaluating the Ishigami function and a linear function"""
+
+    def _update_model(self):
+        self.parameters = {name: simulationapi.Variable(value=0, min=-np.pi, max=np.pi)
+                           for name in ["x1", "x2", "x3"]}
+        self.outputs = {name: simulationapi.Variable(value=0)
+                        for name in ["ishigami", "linear"]}
+
+    def _single_simulation(self, kwargs):
+        x1, x2, x3 = [kwargs["parameters"][name] for name in ["x1", "x2", "x3"]]
+        return {"ishigami": np.sin(x1) + 7 * np.sin(x2) ** 2 + 0.1 * x3 ** 4 * np.sin(x1),
+                "linear": 2 * x1 + 0.5 * x2}
+
+    def _close_multiprocessing(self, _):
+        pass
+
+    def _single_close(self, **kwargs):
+        pass
+
+
+class TestSensitivityAnalysis(unittest.TestCase):
+    """Test-Class for the SensitivityAnalysis class."""
+
+    def setUp(self) -> None:
+        self.example_dir = Path(__file__).parent.joinpath("testzone", "sensitivity")
+        self.sim_api = _AnalyticalAPI(cd=self.example_dir, model_name="Ishigami")
+        self.analysis = sensitivity.SensitivityAnalysis(self.sim_api,
+                                                        names=["x1", "x2", "x3"])
+
+    def test_morris(self):
+        """Test the elementary effects of Morris"""
+        with mock.patch.object(self.sim_api, "simulate",
+                               wraps=self.sim_api.simulate) as simulate:
+            morris = self.analysis.morris(n_trajectories=20, seed=1)
+            # All samples are simulated at once
+            self.assertEqual(simulate.call_count, 1)
+        self.assertEqual(list(morris.columns), ["mu", "mu_star", "sigma"])
+        # Effects are relative to the range of the bounds
+        linear = morris.loc["linear"]
+        np.testing.assert_allclose(linear["mu"], [4 * np.pi, np.pi, 0], atol=1e-10)
+        np.testing.assert_allclose(linear["sigma"], [0, 0, 0], atol=1e-10)
+        ishigami = morris.loc["ishigami"]
+        self.assertGreater(ishigami.loc["x1", "mu_star"], ishigami.loc["x3", "mu_star"])
+        self.assertGreater(ishigami.loc["x3", "sigma"], 0)
+
+    def test_sobol(self):
+        """Test the Sobol indices using the analytical values of the Ishigami function"""
+        sobol = self.analysis.sobol(n_samples=2 ** 12, seed=1)
+        self.assertEqual(list(sobol.columns), ["S1", "ST"])
+        ishigami = sobol.loc["ishigami"]
+        np.testing.assert_allclose(ishigami["S1"], [0.314, 0.442, 0.0], atol=0.05)
+        np.testing.assert_allclose(ishigami["ST"], [0.558, 0.442, 0.244], atol=0.05)
+        linear = sobol.loc["linear"]
+        np.testing.assert_allclose(linear["S1"], [16 / 17, 1 / 17, 0], atol=0.05)
+        # Simulations are cached
+        with mock.patch.object(self.sim_api, "simulate") as simulate:
+            pd.testing.assert_frame_equal(self.analysis.sobol(n_samples=2 ** 12, seed=1), sobol)
+            simulate.assert_not_called()
+
+    def test_failed_simulations(self):
+        """Test that failed simulations are not cached"""
+        samples = np.array([[0.5, 0.5, 0.5], [0.1, 0.2, 0.3]])
+        with mock.patch.object(self.sim_api, "simulate", return_value=[None, None]):
+            self.assertTrue(np.isnan(self.analysis.evaluate(samples)).all())
+        with mock.patch.object(self.sim_api, "simulate",
+                               wraps=self.sim_api.simulate) as simulate:
+            metrics = self.analysis.evaluate(samples)
+            self.assertEqual(len(simulate.call_args.kwargs["parameters"]), 2)
+        self.assertFalse(np.isnan(metrics).any())
+
+    def test_errors(self):
+        """Test unsupported arguments"""
+        with self.assertRaises(ValueError):
+            sensitivity.SensitivityAnalysis(self.sim_api, names=["x1"],
+                                            return_option="time_series")
+        with self.assertRaises(ValueError):
+            sensitivity.SensitivityAnalysis(self.sim_api, names=["x1"],
+                                            bounds={"x1": (1, 0)})
+        with self.assertRaises(ValueError):
+            self.analysis.morris(n_levels=1)
+
+    def tearDown(self) -> None:
+        self.sim_api.close()
+        shutil.rmtree(self.example_dir, ignore_errors=True)
+
+
+class TestSupervisedPool(unittest.TestCase):
+    """Test-Class for the SupervisedPool class."""
+
+    def setUp(self) -> None:
+        self.example_dir = Path(__file__).parent.joinpath("testzone", "supervised_pool")
+        os.makedirs(self.example_dir, exist_ok=True)
+        self.pool = supervised_pool.SupervisedPool(processes=2,
+                                                   initializer=_init_test_worker,
+                                                   initargs=("init", ),
+                                                   task_timeout=2,
+                                                   max_retries=1)
+
+    def test_map(self):
+        """Test the results of a batch without failures"""
+        res = self.pool.map(_test_task, [("return", i) for i in range(5)])
+        self.assertEqual(res, [("init", i) for i in range(5)])
+        self.assertEqual(self.pool.failures, {})
+
+    def test_failures(self):
+        """Test timeouts and crashes of workers"""
+        res = self.pool.map(_test_task, [("return", 0), ("sleep", 60),
+                                         ("crash", 2), ("return", 3)])
+        self.assertEqual(res, [("init", 0), None, None, ("init", 3)])
+        self.assertEqual(sorted(self.pool.failures), [1, 2])
+        self.assertIn("timeout", self.pool.failures[1])
+        self.assertIn("crashed", self.pool.failures[2])
+        # Respawned workers are initialized again
+        res = self.pool.map(_test_task, [("return", i) for i in range(4)])
+        self.assertEqual(res, [("init", i) for i in range(4)])
+        # Workers killed while idle are respawned, also if not yet noticed as dead
+        # pylint: disable=protected-access
+        for worker in self.pool._workers:
+            worker.process.kill()
+            worker.process.join()
+        self.pool._workers[1].process.is_alive = lambda: True
+        res = self.pool.map(_test_task, [("return", i) for i in range(4)])
+        self.assertEqual(res, [("init", i) for i in range(4)])
+        self.assertEqual(self.pool.failures, {})
+
+    def test_retry(self):
+        """Test the retry of a task crashing its worker once"""
+        marker = str(self.example_dir.joinpath("crashed"))
+        res = self.pool.map(_test_task, [("crash_once", marker), ("return", 1)])
+        self.assertEqual(res, [("init", marker), ("init", 1)])
+        self.assertEqual(self.pool.failures, {})
+
+    def test_error(self):
+        """Test that errors of tasks are raised after the batch"""
+        with self.assertRaises(ValueError):
+            self.pool.map(_test_task, [("raise", "error"), ("return", 1)])
+        self.pool.close()
+        with self.assertRaises(ValueError):
+            self.pool.map(_test_task, [("return", 1)])
+
+    def tearDown(self) -> None:
+        self.pool.close()
+        self.pool.join()
+        shutil.rmtree(self.example_dir, ignore_errors=True)
+
+
+class _FakeDymolaInterface:
+    """Stand-in for the DymolaInterface of the TestDymolaInstancePool"""
+
+    def __init__(self, setup_time=0.0):
+        time.sleep(setup_time)
+        self.rss = 100e6
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestDymolaInstancePool(unittest.TestCase):
+    """Test-Class for the DymolaInstancePool class."""
+
+    def setUp(self) -> None:
+        self.instances = []
+
+    def _setup_instance(self, setup_time=0.0, fail=False):
+        if fail:
+            raise ConnectionError("No licence")
+        self.instances.append(_FakeDymolaInterface(setup_time=setup_time))
+        return self.instances[-1]
+
+    def _get_pool(self, **kwargs):
+        return dymola_pool.DymolaInstancePool(
+            setup_instance=self._setup_instance,
+            close_instance=lambda dymola: dymola.close(),
+            get_rss=lambda dymola: dymola.rss,
+            **kwargs
+        )
+
+    def test_max_simulations(self):
+        """Test replacing instances by warm spares after max_simulations"""
+        pool = self._get_pool(n_spares=1, max_simulations=2)
+        first = pool.acquire()
+        self.assertIs(pool.acquire(), first)
+        second = pool.acquire()
+        self.assertIsNot(second, first)
+        self.assertEqual(pool.n_replaced, 1)
+        # The spare was warmed before
+        self.assertIs(second, self.instances[1])
+        pool.close()
+        self.assertTrue(all(instance.closed for instance in self.instances))
+        with self.assertRaises(RuntimeError):
+            pool.acquire()
+
+    def test_max_rss_growth(self):
+        """Test replacing instances whose memory grows"""
+        pool = self._get_pool(max_rss_growth=50)
+        first = pool.acquire()
+        first.rss += 40e6
+        self.assertIs(pool.acquire(), first)
+        first.rss += 20e6
+        self.assertIsNot(pool.acquire(), first)
+        pool.close()
+
+    def test_failed_spare(self):
+        """Test setting up instances if a spare fails"""
+        pool = self._get_pool(max_simulations=1)
+        first = pool.acquire()
+        pool.n_spares = 1
+        pool.setup_instance = lambda: self._setup_instance(fail=True)
+        pool.reset_spares()
+        while pool._n_warming:
+            time.sleep(0.01)
+        pool.setup_instance = self._setup_instance
+        second = pool.acquire()
+        self.assertIsNot(second, first)
+        pool.close()
+        with self.assertRaises(ValueError):
+            self._get_pool(n_spares=-1)
+
+
+class TestTranslationCache(unittest.TestCase):
+    """Test-Class for the TranslationCache class."""
+
+    def setUp(self) -> None:
+        self.example_dir = Path(__file__).parent.joinpath("testzone", "translation_cache")
+        self.package_dir = self.example_dir.joinpath("MyLib")
+        self.translation_dir = self.example_dir.joinpath("translation")
+        os.makedirs(self.package_dir, exist_ok=True)
+        os.makedirs(self.translation_dir, exist_ok=True)
+        self.package = str(self.package_dir.joinpath("package.mo"))
+        with open(self.package, "w") as file:
+            file.write("package MyLib\nend MyLib;\n")
+        with open(self.package_dir.joinpath("Model.mo"), "w") as file:
+            file.write("within MyLib;\nmodel Model\nend Model;\n")
+        for artefact in ["dymosim", "dsin.txt"]:
+            with open(self.translation_dir.joinpath(artefact), "w") as file:
+                file.write(artefact)
+        self.cache = translation_cache.TranslationCache(
+            cache_dir=self.example_dir.joinpath("cache"), max_entries=2)
+        self.variables = {"parameters": {"a": simulationapi.Variable(value=1.0)},
+                          "inputs": {}, "outputs": {}, "states": {}}
+
+    def test_store_restore(self):
+        """Test storing and restoring a translation"""
+        key = self.cache.get_key("MyLib.Model(n=2)", [self.package])
+        self.assertNotEqual(key, self.cache.get_key("MyLib.Model(n=3)", [self.package]))
+        self.assertIsNone(self.cache.restore(key))
+        self.cache.store(key=key, model_name="MyLib.Model(n=2)",
+                         cd=self.translation_dir, variables=self.variables)
+        restore_dir = self.example_dir.joinpath("restore")
+        variables = self.cache.restore(key, cd=restore_dir)
+        self.assertEqual(variables["parameters"]["a"].value, 1.0)
+        self.assertEqual(sorted(os.listdir(restore_dir)), ["dsin.txt", "dymosim"])
+        self.assertIsNotNone(self.cache.get_artefact(key, "dymosim"))
+        self.assertIsNone(self.cache.get_artefact(key, "dymosim.exe"))
+
+    def test_concurrent_store(self):
+        """Test storing the same keys in several processes"""
+        with mp.Pool(4) as pool:
+            pool.starmap(_store_translations,
+                         [(str(self.cache.cache_dir), str(self.translation_dir))] * 4)
+        self.assertLessEqual(len(self.cache.keys), 2)
+        self.assertEqual(sorted(os.listdir(self.cache.cache_dir)), sorted(self.cache.keys))
+
+    def test_setup_change(self):
+        """Test that another Dymola or mos_script_pre invalidates the key"""
+        key = self.cache.get_key("MyLib.Model", [self.package])
+        self.assertNotEqual(key, self.cache.get_key("MyLib.Model", [self.package],
+                                                    dymola_path="Dymola 2023/bin/dymola"))
+        mos_script = self.example_dir.joinpath("pre.mos")
+        with open(mos_script, "w") as file:
+            file.write("Advanced.TranslationFlag = true;\n")
+        key_mos = self.cache.get_key("MyLib.Model", [self.package], mos_script_pre=mos_script)
+        self.assertNotEqual(key, key_mos)
+        with open(mos_script, "w") as file:
+            file.write("Advanced.TranslationFlag = false;\n")
+        self.assertNotEqual(key_mos, self.cache.get_key("MyLib.Model", [self.package],
+                                                        mos_script_pre=mos_script))
+
+    def test_package_change(self):
+        """Test that editing a package invalidates the key"""
+        key = self.cache.get_key("MyLib.Model", [self.package])
+        time.sleep(0.01)
+        with open(self.package_dir.joinpath("Model.mo"), "a") as file:
+            file.write("// Changed\n")
+        self.assertNotEqual(key, self.cache.get_key("MyLib.Model", [self.package]))
+
+    def test_eviction(self):
+        """Test that the least recently used entries are deleted"""
+        keys = [self.cache.get_key(f"MyLib.Model(n={n})", [self.package]) for n in range(3)]
+        for idx, key in enumerate(keys[:2]):
+            self.cache.store(key=key, model_name=str(idx),
+                             cd=self.translation_dir, variables=self.variables)
+            os.utime(self.example_dir.joinpath("cache", key), (idx, idx))
+        # Use the first entry, the second one is evicted
+        self.cache.restore(keys[0])
+        self.cache.store(key=keys[2], model_name="2",
+                         cd=self.translation_dir, variables=self.variables)
+        self.assertIn(keys[0], self.cache)
+        self.assertNotIn(keys[1], self.cache)
+        self.assertIn(keys[2], self.cache)
+        self.cache.clear()
+        self.assertEqual(self.cache.keys, [])
+        with self.assertRaises(ValueError):
+            translation_cache.TranslationCache(cache_dir=self.example_dir, max_entries=0)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.example_dir, ignore_errors=True)
+
+
+class TestDymosimAPI(unittest.TestCase):
+    """Test-Class for the DymosimAPI class using a stand-in for dymosim."""
+
+    def setUp(self) -> None:
+        if "win" in sys.platform:
+            self.skipTest("The stand-in for dymosim is not executable on windows")
+        self.data_dir = Path(__file__).parent.joinpath("data")
+        self.example_dir = Path(__file__).parent.joinpath("testzone", "dymosim")
+        os.makedirs(self.example_dir, exist_ok=True)
+        executable = self.example_dir.joinpath("dymosim")
+        with open(self.data_dir.joinpath("dymosim_stand_in.py"), "r") as file:
+            stand_in = file.read()
+        with open(executable, "w") as file:
+            file.write(f"#!{sys.executable}\n{stand_in}")
+        os.chmod(executable, 0o755)
+        shutil.copy(self.data_dir.joinpath("example_dsfinal.txt"),
+                    self.example_dir.joinpath("dsin.txt"))
+        self.sim_api = dymosim.DymosimAPI(cd=self.example_dir, model_name=executable)
+        self.sim_api.set_sim_setup({"start_time": 0, "stop_time": 100,
+                                    "output_interval": 10})
+        self.sim_api.result_names = ["sourceSideMassFlowSource.m_flow", "heatPump.senT_a2.T"]
+
+    def test_variables(self):
+        """Test the variables read from the dsin.txt"""
+        self.assertIn("sourceSideMassFlowSource.m_flow", self.sim_api.parameters)
+        self.assertEqual(self.sim_api.parameters["sourceSideMassFlowSource.m_flow"].max, 100000)
+
+    def test_simulate(self):
+        """Test simulations with changed parameters"""
+        res = self.sim_api.simulate(parameters={"sourceSideMassFlowSource.m_flow": 2.5})
+        self.assertIsInstance(res, TimeSeriesData)
+        np.testing.assert_allclose(res.index, np.arange(0, 101, 10))
+        self.assertTrue((res["sourceSideMassFlowSource.m_flow"] == 2.5).all().all())
+        res = self.sim_api.simulate(parameters=[{"sourceSideMassFlowSource.m_flow": value}
+                                                for value in [1, 2]],
+                                    return_option="last_point")
+        self.assertEqual([_res["sourceSideMassFlowSource.m_flow"] for _res in res], [1, 2])
+        with self.assertRaises(KeyError):
+            self.sim_api.simulate(parameters={"not_a_parameter": 1})
+
+    def test_savepath(self):
+        """Test moving the results to the savepath"""
+        savepath = self.example_dir.joinpath("results")
+        filepath = self.sim_api.simulate(return_option="savepath",
+                                         savepath=savepath,
+                                         result_file_name="my_result")
+        self.assertEqual(filepath, os.path.join(savepath, "my_result.mat"))
+        self.assertTrue(os.path.isfile(savepath.joinpath("dslog.txt")))
+        tsd = TimeSeriesData(filepath)
+        self.assertIn("heatPump.senT_a2.T", tsd.get_variable_names())
+
+    def test_array(self):
+        """Test returning only the result_names as array"""
+        res = self.sim_api.simulate(parameters={"sourceSideMassFlowSource.m_flow": 2.5},
+                                    return_option="array")
+        self.assertIsInstance(res, np.ndarray)
+        self.assertEqual(res.shape, (11, 3))
+        np.testing.assert_allclose(res[:, 0], np.arange(0, 101, 10))
+        np.testing.assert_allclose(res[:, 1], 2.5)
+
+    def test_error(self):
+        """Test failing simulations"""
+        self.sim_api.set_sim_setup({"start_time": 100, "stop_time": 50})
+        with self.assertRaises(Exception):
+            self.sim_api.simulate()
+        self.assertIsNone(self.sim_api.simulate(fail_on_error=False))
+        with self.assertRaises(FileNotFoundError):
+            dymosim.DymosimAPI(cd=self.example_dir, model_name="not_a_file")
+
+    def test_inputs(self):
+        """Test writing the input tables only if the inputs change"""
+        inputs = pd.DataFrame({"u": np.linspace(0, 1, 11)}, index=np.linspace(0, 10, 11))
+        kwargs = {"inputs": inputs, "table_name": "u", "file_name": "inputs.mat"}
+        self.sim_api.simulate(**kwargs)
+        filepath = os.path.join(self.example_dir, "worker_0", "inputs.mat")
+        table = spio.loadmat(filepath)["u"]
+        np.testing.assert_array_equal(table, np.column_stack([inputs.index, inputs["u"]]))
+        mtime = os.stat(filepath).st_mtime_ns
+        self.sim_api.simulate(**kwargs)
+        self.assertEqual(os.stat(filepath).st_mtime_ns, mtime)
+        kwargs["inputs"] = inputs * 2
+        self.sim_api.simulate(**kwargs)
+        np.testing.assert_array_equal(spio.loadmat(filepath)["u"][:, 1], inputs["u"] * 2)
+
+    def test_inputs_multi_core(self):
+        """Test that the workers keep the hashes of their input tables between tasks"""
+        if mp.cpu_count() < 2:
+            self.skipTest("Multiple workers require at least two cpus")
+        sim_api = dymosim.DymosimAPI(cd=self.example_dir, n_cpu=2,
+                                     model_name=self.sim_api.model_name)
+        sim_api.result_names = self.sim_api.result_names
+        inputs = pd.DataFrame({"u": np.linspace(0, 1, 11)}, index=np.linspace(0, 10, 11))
+        kwargs = {"inputs": inputs, "table_name": "u", "file_name": "inputs.mat",
+                  "parameters": [{"sourceSideMassFlowSource.m_flow": value}
+                                 for value in range(4)]}
+        sim_api.simulate(**kwargs)
+        filepaths = glob.glob(os.path.join(self.example_dir, "worker_*", "inputs.mat"))
+        self.assertGreater(len(filepaths), 0)
+        mtimes = {filepath: os.stat(filepath).st_mtime_ns for filepath in filepaths}
+        for _ in range(2):
+            sim_api.simulate(**kwargs)
+        for filepath, mtime in mtimes.items():
+            self.assertEqual(os.stat(filepath).st_mtime_ns, mtime)
+        sim_api.close()
+
+    def test_model_change_multi_core(self):
+        """Test that running workers receive the variables of a new model"""
+        if mp.cpu_count() < 2:
+            self.skipTest("Multiple workers require at least two cpus")
+        # Another model with a different default of the parameter
+        other_dir = self.example_dir.joinpath("other")
+        os.makedirs(other_dir)
+        shutil.copy(self.sim_api.model_name, other_dir.joinpath("dymosim"))
+        with open(self.example_dir.joinpath("dsin.txt"), "r") as file:
+            lines = file.readlines()
+        idx = next(idx for idx, line in enumerate(lines)
+                   if line.rstrip().endswith("# sourceSideMassFlowSource.m_flow"))
+        lines[idx - 1] = lines[idx - 1].replace(" 1 ", " 3 ", 1)
+        with open(other_dir.joinpath("dsin.txt"), "w") as file:
+            file.writelines(lines)
+        sim_api = dymosim.DymosimAPI(cd=self.example_dir, n_cpu=2,
+                                     model_name=self.sim_api.model_name)
+        sim_api.result_names = self.sim_api.result_names
+        parameters = [{"heatPump.senT_a2.T": 300.0 + i} for i in range(4)]
+        sim_api.simulate(parameters=parameters)
+        pool = sim_api.pool
+        sim_api.dsin_path = str(other_dir.joinpath("dsin.txt"))
+        sim_api.model_name = str(other_dir.joinpath("dymosim"))
+        sim_api.result_names = self.sim_api.result_names
+        self.assertEqual(sim_api.parameters["sourceSideMassFlowSource.m_flow"].value, 3)
+        results = sim_api.simulate(parameters=parameters, return_option="last_point")
+        self.assertIs(sim_api.pool, pool)
+        self.assertEqual([res["sourceSideMassFlowSource.m_flow"] for res in results], [3] * 4)
+        sim_api.close()
+
+    def tearDown(self) -> None:
+        self.sim_api.close()
+        shutil.rmtree(self.example_dir, ignore_errors=True)
+
 
 class TestFMUAPISingleCore(TestFMUAPI):
     """Test-Class for the FMU_API class on single core"""
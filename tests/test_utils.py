@@ -74,6 +74,33 @@ class TestConversion(unittest.TestCase):
                 table_name="dummy",
                 columns=columns[0])
 
+    def test_conversion_to_modelica_table(self):
+        """Test function conversion.convert_tsd_to_modelica_table()."""
+        for file_name in ["table.mat", "table.txt"]:
+            save_path = self.example_dir.joinpath(file_name)
+            filepath = conversion.convert_tsd_to_modelica_table(
+                tsd=self.tsd,
+                table_name="dummy",
+                save_path_file=save_path,
+                offset=10
+            )
+            self.assertEqual(filepath, str(save_path))
+            if file_name.endswith(".mat"):
+                table = spio.loadmat(filepath)["dummy"]
+            else:
+                table = np.loadtxt(filepath, skiprows=3)
+            self.assertEqual(table.shape, (len(self.tsd), len(self.tsd.columns) + 1))
+            self.assertEqual(table[0, 0], 10)
+            np.testing.assert_array_almost_equal(table[:, 1:], self.tsd.to_numpy())
+            os.remove(filepath)
+        # No temporary files are left
+        self.assertFalse([name for name in os.listdir(self.example_dir) if ".tmp" in name])
+        with self.assertRaises(ValueError):
+            conversion.convert_tsd_to_modelica_table(
+                tsd=self.tsd,
+                table_name="dummy",
+                save_path_file="not_a_table.csv")
+
     def test_conversion_hdf_to_clustering_txt(self):
         """Test function conversion.convert_hdf_to_clustering_txt().
         For an example, see the doctest in the function."""